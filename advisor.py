@@ -0,0 +1,288 @@
+"""Slow-query advisor: EXPLAIN statements that cross a latency threshold
+
+Plans are captured with EXPLAIN FORMAT=JSON on a background thread, checked
+for full table scans, filesorts and temporary tables, given a suggested
+index where the plan shows one would help, and stored per deploy in a local
+SQLite file so regressions can be diffed across releases.
+"""
+import json
+import os
+import re
+import sqlite3
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import mysql.connector
+
+import db
+import metrics
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Statements slower than this are EXPLAINed
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get("SLOW_QUERY_THRESHOLD_MS", "250"))
+# Where captured plans are kept
+ADVISOR_DB_PATH = os.environ.get("ADVISOR_DB_PATH", os.path.join(BASE_DIR, "slow_queries.sqlite3"))
+# A fingerprint is re-EXPLAINed at most this often
+ADVISOR_REEXPLAIN_SECONDS = float(os.environ.get("ADVISOR_REEXPLAIN_SECONDS", "600"))
+# Full scans of tables smaller than this are reported but get no index suggestion
+ADVISOR_MIN_SCAN_ROWS = 1000
+
+_TABLE_ALIAS = re.compile(
+    r"\b(?:FROM|JOIN)\s+`?(\w+)`?(?:\s+(?:AS\s+)?(?!(?:ON|WHERE|JOIN|LEFT|RIGHT|INNER|CROSS|GROUP|ORDER|LIMIT|USING|HAVING)\b)(\w+))?",
+    re.IGNORECASE,
+)
+_ORDER_BY = re.compile(r"\bORDER\s+BY\s+(.+?)(?:\bLIMIT\b|\)|$)", re.IGNORECASE | re.DOTALL)
+# `schema`.`alias`.`column` = <constant>
+_EQUALITY = re.compile(r"`\w+`\.`(\w+)`\.`(\w+)`\s*=\s*(?!`)")
+_COLUMN = re.compile(r"`\w+`\.`(\w+)`\.`(\w+)`")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS slow_query (
+    deploy TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    statement TEXT NOT NULL,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    occurrences INTEGER NOT NULL,
+    worst_ms REAL NOT NULL,
+    last_ms REAL NOT NULL,
+    full_scans TEXT NOT NULL,
+    filesort INTEGER NOT NULL,
+    temporary INTEGER NOT NULL,
+    suggested_index TEXT,
+    plan_json TEXT NOT NULL,
+    PRIMARY KEY (deploy, fingerprint)
+)
+"""
+
+
+def current_deploy():
+    """Identifier of the running release: $DEPLOY_ID, else the git commit, else 'dev'"""
+    if os.environ.get("DEPLOY_ID"):
+        return os.environ["DEPLOY_ID"]
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True,
+                              text=True, timeout=5, check=True).stdout.strip() or "dev"
+    except (OSError, subprocess.SubprocessError):
+        return "dev"
+
+
+# ==================== PLAN ANALYSIS ====================
+def _walk(node):
+    if isinstance(node, dict):
+        yield node
+        for value in node.values():
+            yield from _walk(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _walk(value)
+
+
+def table_aliases(sql):
+    """alias -> table name for every FROM/JOIN in a statement"""
+    aliases = {}
+    for table, alias in _TABLE_ALIAS.findall(sql):
+        aliases[alias or table] = table
+        aliases.setdefault(table, table)
+    return aliases
+
+
+def order_by_columns(sql):
+    """(alias, column) pairs of the outermost ORDER BY, alias None when unqualified"""
+    matches = _ORDER_BY.findall(sql)
+    if not matches:
+        return []
+    columns = []
+    for term in matches[-1].split(","):
+        expression = re.sub(r"\s+(ASC|DESC)\s*$", "", term.strip(), flags=re.IGNORECASE)
+        match = re.fullmatch(r"(?:(\w+)\.)?(\w+)", expression)
+        if match:
+            columns.append((match.group(1), match.group(2)))
+    return columns
+
+
+def _suggest_index(table, alias, condition, sort_columns):
+    """CREATE INDEX for one table: equality columns, then other filtered columns, then sort columns"""
+    equality = [column for a, column in _EQUALITY.findall(condition or "") if a == alias]
+    filtered = [column for a, column in _COLUMN.findall(condition or "") if a == alias]
+    columns = []
+    for column in equality + filtered + sort_columns:
+        if column not in columns:
+            columns.append(column)
+    columns = columns[:3]
+    if not columns:
+        return None
+    return f"CREATE INDEX idx_{table.lower()}_{'_'.join(columns)} ON {table} ({', '.join(columns)});"
+
+
+def analyze_plan(plan, sql):
+    """Flags and an index suggestion for an EXPLAIN FORMAT=JSON plan"""
+    aliases = table_aliases(sql)
+    sort_keys = order_by_columns(sql)
+    nodes = list(_walk(plan))
+    tables = [node for node in nodes if "table_name" in node]
+    filesort = any(node.get("using_filesort") for node in nodes)
+    temporary = any(node.get("using_temporary_table") for node in nodes)
+
+    full_scans, suggestions = [], []
+    for node in tables:
+        alias = node["table_name"]
+        table = aliases.get(alias, alias)
+        if node.get("access_type") not in ("ALL", "index"):
+            continue
+        rows = node.get("rows_examined_per_scan") or 0
+        full_scans.append({"table": table, "alias": alias, "access_type": node["access_type"], "rows": rows})
+        if rows >= ADVISOR_MIN_SCAN_ROWS:
+            sort_columns = [column for a, column in sort_keys if a in (alias, None)] if filesort else []
+            suggestion = _suggest_index(table, alias, node.get("attached_condition"), sort_columns)
+            if suggestion:
+                suggestions.append(suggestion)
+
+    # A filesort on an indexed lookup: extend the driving table's index with the sort columns
+    if filesort and not suggestions and tables and sort_keys:
+        driving = tables[0]
+        alias = driving["table_name"]
+        sort_columns = [column for a, column in sort_keys if a in (alias, None)]
+        if sort_columns:
+            suggestion = _suggest_index(aliases.get(alias, alias), alias,
+                                        driving.get("attached_condition"), sort_columns)
+            if suggestion:
+                suggestions.append(suggestion)
+
+    return {
+        "full_scans": full_scans,
+        "filesort": filesort,
+        "temporary": temporary,
+        "suggested_index": "\n".join(suggestions) or None,
+    }
+
+
+# ==================== STORAGE ====================
+class SlowQueryStore:
+    """SQLite file of captured plans, one row per (deploy, fingerprint)"""
+
+    def __init__(self, path=ADVISOR_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def save(self, deploy, fingerprint, statement, latency_ms, analysis, plan):
+        now = datetime.now().isoformat(timespec="seconds")
+        with self._lock, self._connect() as conn:
+            conn.execute("""
+                INSERT INTO slow_query (deploy, fingerprint, statement, first_seen, last_seen, occurrences,
+                                        worst_ms, last_ms, full_scans, filesort, temporary, suggested_index, plan_json)
+                VALUES (?, ?, ?, ?, ?, 1, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (deploy, fingerprint) DO UPDATE SET
+                    last_seen = excluded.last_seen,
+                    occurrences = occurrences + 1,
+                    worst_ms = MAX(worst_ms, excluded.worst_ms),
+                    last_ms = excluded.last_ms,
+                    full_scans = excluded.full_scans,
+                    filesort = excluded.filesort,
+                    temporary = excluded.temporary,
+                    suggested_index = excluded.suggested_index,
+                    plan_json = excluded.plan_json
+            """, (deploy, fingerprint, statement, now, now, latency_ms, latency_ms,
+                  json.dumps(analysis["full_scans"]), int(analysis["filesort"]), int(analysis["temporary"]),
+                  analysis["suggested_index"], json.dumps(plan)))
+
+    def count(self, deploy, fingerprint, latency_ms):
+        """Record a slow call of an already captured fingerprint without replacing its plan"""
+        now = datetime.now().isoformat(timespec="seconds")
+        with self._lock, self._connect() as conn:
+            conn.execute("""
+                UPDATE slow_query
+                SET last_seen = ?, occurrences = occurrences + 1, worst_ms = MAX(worst_ms, ?), last_ms = ?
+                WHERE deploy = ? AND fingerprint = ?
+            """, (now, latency_ms, latency_ms, deploy, fingerprint))
+
+    def records(self, deploy):
+        with self._connect() as conn:
+            rows = conn.execute("SELECT * FROM slow_query WHERE deploy = ? ORDER BY worst_ms DESC", (deploy,))
+            return [dict(row) for row in rows]
+
+    def deploys(self):
+        """Deploys with captured plans, most recently active first"""
+        with self._connect() as conn:
+            rows = conn.execute("""
+                SELECT deploy, COUNT(*) as queries, MAX(last_seen) as last_seen
+                FROM slow_query GROUP BY deploy ORDER BY last_seen DESC
+            """)
+            return [dict(row) for row in rows]
+
+    def diff(self, old_deploy, new_deploy):
+        """Fingerprints that became slow, stopped being slow, or changed plan between two deploys"""
+        old = {row["fingerprint"]: row for row in self.records(old_deploy)}
+        new = {row["fingerprint"]: row for row in self.records(new_deploy)}
+
+        def flags(row):
+            return (row["full_scans"], row["filesort"], row["temporary"])
+
+        return {
+            "new": [new[key] for key in new.keys() - old.keys()],
+            "resolved": [old[key] for key in old.keys() - new.keys()],
+            "changed": [
+                {"fingerprint": key, "statement": new[key]["statement"],
+                 "old_worst_ms": old[key]["worst_ms"], "new_worst_ms": new[key]["worst_ms"],
+                 "old_flags": flags(old[key]), "new_flags": flags(new[key])}
+                for key in new.keys() & old.keys()
+                if flags(old[key]) != flags(new[key])
+            ],
+        }
+
+
+# ==================== ADVISOR ====================
+class SlowQueryAdvisor:
+    """Watches query latencies and EXPLAINs the slow ones in the background"""
+
+    def __init__(self, pool, store=None, threshold_ms=SLOW_QUERY_THRESHOLD_MS, deploy=None,
+                 reexplain_seconds=ADVISOR_REEXPLAIN_SECONDS):
+        self.pool = pool
+        self.store = store or SlowQueryStore()
+        self.threshold_ms = threshold_ms
+        self.deploy = deploy or current_deploy()
+        self.reexplain_seconds = reexplain_seconds
+        self._last_explained = {}  # fingerprint id -> monotonic time
+        self._lock = threading.Lock()
+        # One worker: EXPLAINs are cheap but should never pile up on the pool
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-advisor")
+
+    def observe(self, sql, params, seconds):
+        """Queue an EXPLAIN if a SELECT was slow and its fingerprint wasn't explained recently.
+
+        Slow calls in between only count towards the stored occurrences and
+        latencies.
+        """
+        latency_ms = seconds * 1000
+        if latency_ms < self.threshold_ms or not sql.lstrip().upper().startswith(("SELECT", "WITH")):
+            return False
+        statement = metrics.fingerprint(sql)
+        fingerprint = metrics.fingerprint_id(statement)
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_explained.get(fingerprint, float("-inf")) < self.reexplain_seconds:
+                # Queued behind any pending capture of the same fingerprint, on the one worker
+                self._executor.submit(self.store.count, self.deploy, fingerprint, latency_ms)
+                return False
+            self._last_explained[fingerprint] = now
+        self._executor.submit(self._capture, sql, params, fingerprint, statement, latency_ms)
+        return True
+
+    def _capture(self, sql, params, fingerprint, statement, latency_ms):
+        try:
+            rows = db.run_query(self.pool, "EXPLAIN FORMAT=JSON " + sql, params)
+            plan = json.loads(next(iter(rows[0].values())))
+        except (mysql.connector.Error, ValueError, IndexError):
+            return
+        self.store.save(self.deploy, fingerprint, statement, latency_ms, analyze_plan(plan, sql), plan)
@@ -0,0 +1,343 @@
+"""Columnar analytics snapshot: Parquet files queried with DuckDB
+
+With ANALYTICS_ENGINE=duckdb, the analytics tabs and the reports run on a
+local Parquet copy of the nine tables, through an embedded DuckDB engine,
+instead of on the MySQL primary that takes the assignment and payment
+writes. The snapshot lags MySQL by up to ANALYTICS_REFRESH_SECONDS and the
+pages show its age.
+
+Refreshes are incremental:
+- Repair_Request, Service_Assignment and Payment are stored one file per
+  month of their date column. A refresh rewrites the last
+  ANALYTICS_RELOAD_MONTHS months, plus any older month that gained rows
+  with new ids. Each month is read with a date range, so MySQL only scans
+  that month's partition.
+- Review only grows: rows past the last exported review_id are added as a
+  new file.
+- Location, Service_Category, User, Technician and
+  Technician_Specialization are small and rewritten whole.
+Edits to older rows, such as a request cancelled months later or a deleted
+review, are picked up by the full refresh that runs every
+ANALYTICS_FULL_REFRESH_SECONDS.
+
+Each refresh writes a new generation directory, hard-linking the files it
+doesn't rewrite from the previous one, and then points manifest.json at it.
+No file is replaced or deleted under a running query: a generation is only
+removed by the refresh after the one that replaced it.
+
+The report SQL is written for MySQL. to_duckdb() translates the few
+MySQL-only constructs it uses.
+"""
+import glob
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from datetime import datetime
+
+import db
+import exporter
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# "duckdb" runs analytics on the snapshot; anything else keeps them on MySQL
+ANALYTICS_ENGINE = os.environ.get("ANALYTICS_ENGINE", "mysql").lower()
+ANALYTICS_SNAPSHOT_DIR = os.environ.get("ANALYTICS_SNAPSHOT_DIR", os.path.join(BASE_DIR, "analytics_snapshot"))
+# Seconds between incremental refreshes, and between full ones
+ANALYTICS_REFRESH_SECONDS = float(os.environ.get("ANALYTICS_REFRESH_SECONDS", "600"))
+ANALYTICS_FULL_REFRESH_SECONDS = float(os.environ.get("ANALYTICS_FULL_REFRESH_SECONDS", str(24 * 3600)))
+# Months before the current one that every incremental refresh re-reads
+ANALYTICS_RELOAD_MONTHS = int(os.environ.get("ANALYTICS_RELOAD_MONTHS", "2"))
+
+# table -> (auto-increment id, refresh mode); "monthly" tables use db.PARTITIONED_TABLES
+SNAPSHOT_TABLES = {
+    "Location": ("location_id", "whole"),
+    "Service_Category": ("category_id", "whole"),
+    "User": ("user_id", "whole"),
+    "Technician": ("technician_id", "whole"),
+    "Technician_Specialization": ("tech_spec_id", "whole"),
+    "Repair_Request": ("request_id", "monthly"),
+    "Service_Assignment": ("assignment_id", "monthly"),
+    "Payment": ("payment_id", "monthly"),
+    "Review": ("review_id", "append"),
+}
+
+_PLACEHOLDER = re.compile(r"%([%s])")
+_DATE_FORMAT = re.compile(r"\bDATE_FORMAT\(", re.IGNORECASE)
+_DATEDIFF = re.compile(r"\bDATEDIFF\(\s*([^,()]+?)\s*,\s*([^,()]+?)\s*\)", re.IGNORECASE)
+
+
+class SnapshotError(Exception):
+    """A query on the snapshot failed (DuckDB error, or a table not exported yet)"""
+
+
+def available():
+    """Whether the optional duckdb package is installed"""
+    try:
+        import duckdb  # noqa: F401  (optional: pip install duckdb)
+    except ImportError:
+        return False
+    return True
+
+
+def to_duckdb(query):
+    """Translate report SQL from MySQL to DuckDB: %s placeholders, DATE_FORMAT and DATEDIFF"""
+    query = _PLACEHOLDER.sub(lambda match: "?" if match.group(1) == "s" else "%", query)
+    # strftime takes the same arguments and %Y/%m/%d codes
+    query = _DATE_FORMAT.sub("strftime(", query)
+    # MySQL's DATEDIFF(a, b) counts days from b to a and ignores the time of day
+    return _DATEDIFF.sub(r"date_diff('day', CAST(\2 AS DATE), CAST(\1 AS DATE))", query)
+
+
+def _month_starts(first, last):
+    """First days of every month from first's month through last's"""
+    months = []
+    month = first.year * 12 + first.month - 1
+    while month <= last.year * 12 + last.month - 1:
+        months.append(datetime(month // 12, month % 12 + 1, 1))
+        month += 1
+    return months
+
+
+def _add_months(day, months):
+    month = day.year * 12 + day.month - 1 + months
+    return datetime(month // 12, month % 12 + 1, 1)
+
+
+class Snapshot:
+    """Parquet copy of the database under `path`, refreshed from MySQL and queried with DuckDB"""
+
+    def __init__(self, path=ANALYTICS_SNAPSHOT_DIR):
+        self.path = path
+        self.last_error = None
+        self._lock = threading.Lock()
+
+    def _manifest_path(self):
+        return os.path.join(self.path, "manifest.json")
+
+    def manifest(self):
+        try:
+            with open(self._manifest_path(), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def refreshed_at(self):
+        """When the data in the snapshot was read from MySQL, or None before the first refresh"""
+        refreshed = self.manifest().get("refreshed_at")
+        return datetime.fromisoformat(refreshed) if refreshed else None
+
+    def age(self):
+        """Seconds since the last refresh, or None"""
+        refreshed = self.refreshed_at()
+        return (datetime.now() - refreshed).total_seconds() if refreshed else None
+
+    def data_path(self):
+        """Directory of the current generation, or None before the first refresh"""
+        generation = self.manifest().get("generation")
+        return os.path.join(self.path, generation) if generation else None
+
+    # ---------- refresh ----------
+    def _write(self, pool, query, params, target):
+        """Export a query to the Parquet file `target`, replacing it; returns the row count"""
+        export = exporter.export_query(pool, query, params, file_format="Parquet", preview_rows=0)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.move(export["path"], target + ".tmp")
+        os.replace(target + ".tmp", target)
+        return export["rows"]
+
+    def _refresh_monthly(self, pool, table_dir, table, id_column, last_id, max_id, full):
+        column = db.PARTITIONED_TABLES[table]
+        bounds = db.run_query(pool, f"SELECT MIN({column}) as first, MAX({column}) as last FROM {table}")[0]
+        if bounds["first"] is None:
+            months = []
+        elif full:
+            months = _month_starts(bounds["first"], bounds["last"])
+        else:
+            now = datetime.now()
+            reload_from = _add_months(now, -ANALYTICS_RELOAD_MONTHS)
+            months = set(_month_starts(max(reload_from, bounds["first"]), max(now, bounds["last"])))
+            # Older months that received new rows, e.g. from a bulk import
+            new_rows = db.run_query(pool, f"""
+                SELECT DISTINCT DATE_FORMAT({column}, '%%Y-%%m-01') as month
+                FROM {table}
+                WHERE {id_column} > %s AND {id_column} <= %s
+            """, (last_id, max_id))
+            months.update(datetime.strptime(row["month"], "%Y-%m-%d") for row in new_rows)
+            months = sorted(months)
+
+        rows = 0
+        for month in months:
+            target = os.path.join(table_dir, month.strftime("%Y%m") + ".parquet")
+            rows += self._write(pool, f"SELECT * FROM {table} WHERE {column} >= %s AND {column} < %s",
+                                (month, _add_months(month, 1)), target)
+        if full and not months:
+            # DuckDB needs at least one file to know the columns
+            self._write(pool, f"SELECT * FROM {table} LIMIT 0", None, os.path.join(table_dir, "empty.parquet"))
+        return rows
+
+    def _refresh_append(self, pool, table_dir, table, id_column, last_id, max_id, full):
+        if full:
+            last_id = 0
+        elif max_id <= last_id:
+            return 0
+        target = os.path.join(table_dir, f"part-{max_id:012d}.parquet")
+        return self._write(pool, f"SELECT * FROM {table} WHERE {id_column} > %s AND {id_column} <= %s",
+                           (last_id, max_id), target)
+
+    def _link_generation(self, source, target):
+        """Start a generation with hard links to every file of `source`"""
+        for table in SNAPSHOT_TABLES:
+            os.makedirs(os.path.join(target, table))
+            for path in glob.glob(os.path.join(source, table, "*.parquet")):
+                os.link(path, os.path.join(target, table, os.path.basename(path)))
+
+    def _remove_generations(self, older_than):
+        """Delete the generations named before `older_than`, and table directories of the old flat layout.
+
+        Newer ones are left alone: another process, such as manage.py, may
+        still be writing one.
+        """
+        for entry in os.listdir(self.path):
+            if entry in SNAPSHOT_TABLES or (re.fullmatch(r"v\d{20}", entry) and entry < older_than):
+                shutil.rmtree(os.path.join(self.path, entry), ignore_errors=True)
+
+    def refresh(self, pool, full=False):
+        """Bring the snapshot up to date with MySQL; returns {table: rows written}.
+
+        Escalates to a full refresh on first use and once the last full one
+        is older than ANALYTICS_FULL_REFRESH_SECONDS.
+
+        The data is written to a new generation directory and manifest.json
+        is switched to it last. Queries opened on the previous generation
+        keep reading it until the next refresh deletes it.
+        """
+        with self._lock:
+            manifest = self.manifest()
+            started = datetime.now()
+            last_full = manifest.get("full_refreshed_at")
+            previous = manifest.get("generation")
+            if (not last_full or not previous
+                    or (started - datetime.fromisoformat(last_full)).total_seconds() > ANALYTICS_FULL_REFRESH_SECONDS):
+                full = True
+            generation = started.strftime("v%Y%m%d%H%M%S%f")
+            generation_dir = os.path.join(self.path, generation)
+            try:
+                if full:
+                    os.makedirs(generation_dir)
+                else:
+                    self._link_generation(os.path.join(self.path, previous), generation_dir)
+                last_ids = {} if full else manifest.get("max_ids", {})
+                max_ids = {}
+                written = {}
+                for table, (id_column, mode) in SNAPSHOT_TABLES.items():
+                    table_dir = os.path.join(generation_dir, table)
+                    # Rows past this id are left for the next refresh, so none is exported twice
+                    max_ids[table] = db.run_query(pool, f"SELECT COALESCE(MAX({id_column}), 0) as max_id FROM {table}")[0]["max_id"]
+                    last_id = last_ids.get(table, 0)
+                    if mode == "monthly":
+                        written[table] = self._refresh_monthly(pool, table_dir, table, id_column, last_id,
+                                                               max_ids[table], full)
+                    elif mode == "append":
+                        written[table] = self._refresh_append(pool, table_dir, table, id_column, last_id,
+                                                              max_ids[table], full)
+                    else:
+                        written[table] = self._write(pool, f"SELECT * FROM {table}", None,
+                                                     os.path.join(table_dir, "all.parquet"))
+            except BaseException:
+                shutil.rmtree(generation_dir, ignore_errors=True)
+                raise
+
+            manifest = {
+                "generation": generation,
+                "refreshed_at": started.isoformat(timespec="seconds"),
+                "full_refreshed_at": started.isoformat(timespec="seconds") if full else last_full,
+                "max_ids": max_ids,
+            }
+            with open(self._manifest_path() + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2)
+            os.replace(self._manifest_path() + ".tmp", self._manifest_path())
+            # The previous generation stays for queries that globbed it before the switch
+            self._remove_generations(previous or generation)
+            self.last_error = None
+            return written
+
+    def start_refresher(self, pool, interval=ANALYTICS_REFRESH_SECONDS):
+        """Refresh now and then every `interval` seconds on a daemon thread"""
+        def loop():
+            while True:
+                try:
+                    self.refresh(pool)
+                except Exception as err:  # keep refreshing; the pages show the error and the age
+                    self.last_error = str(err)
+                time.sleep(interval)
+
+        threading.Thread(target=loop, name="analytics-snapshot", daemon=True).start()
+
+    # ---------- queries ----------
+    def connect(self):
+        """In-memory DuckDB connection with one view per snapshot table"""
+        import duckdb  # optional: pip install duckdb
+
+        conn = duckdb.connect()
+        # MySQL sorts NULLs first in ascending and last in descending order
+        conn.execute("SET default_null_order = 'nulls_first_on_asc_last_on_desc'")
+        data_path = self.data_path()
+        for table in SNAPSHOT_TABLES if data_path else ():
+            files = os.path.join(data_path, table, "*.parquet")
+            if glob.glob(files):
+                escaped = files.replace("'", "''")
+                conn.execute(f"CREATE VIEW {table} AS SELECT * FROM read_parquet('{escaped}', union_by_name = true)")
+        return conn
+
+    def query(self, query, params=None):
+        """Run MySQL report SQL on the snapshot and return a list of dicts, like db.run_query"""
+        import duckdb
+
+        conn = self.connect()
+        try:
+            cursor = conn.execute(to_duckdb(query), list(params or ()))
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        except duckdb.Error as err:
+            raise SnapshotError(str(err)) from err
+        finally:
+            conn.close()
+
+    def export(self, query, params=None, file_format="CSV", batch_rows=exporter.EXPORT_BATCH_ROWS,
+               preview_rows=exporter.EXPORT_PREVIEW_ROWS):
+        """exporter.export_query on the snapshot: streams the result to a temporary CSV or Parquet file"""
+        import pyarrow as pa  # in requirements.txt
+        import pyarrow.csv as pa_csv
+        import pyarrow.parquet as pq
+
+        import duckdb
+
+        path = exporter.new_export_path(file_format)
+        row_count = 0
+        preview = []
+        conn = self.connect()
+        try:
+            reader = conn.execute(to_duckdb(query), list(params or ())).fetch_record_batch(batch_rows)
+            if file_format == "Parquet":
+                writer = pq.ParquetWriter(path, reader.schema)
+            else:
+                writer = pa_csv.CSVWriter(path, reader.schema)
+            with writer:
+                for batch in reader:
+                    writer.write_batch(batch)
+                    row_count += batch.num_rows
+                    kept = sum(part.num_rows for part in preview)
+                    if kept < preview_rows:
+                        preview.append(batch.slice(0, preview_rows - kept))
+        except BaseException as err:
+            os.remove(path)
+            if isinstance(err, duckdb.Error):
+                raise SnapshotError(str(err)) from err
+            raise
+        finally:
+            conn.close()
+        return {"path": path, "rows": row_count,
+                "preview": pa.Table.from_batches(preview, schema=reader.schema).to_pandas()}
@@ -1,10 +1,25 @@
 import streamlit as st
 import mysql.connector
 import pandas as pd
-from datetime import datetime, date
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, date, timedelta
 import plotly.express as px
 import plotly.graph_objects as go
 
+import advisor
+import analytics
+import db
+import dispatch
+import exporter
+import importer
+import jobs
+import metrics
+import reports
+
 # Page configuration
 st.set_page_config(
     page_title="Repair Service Management System",
@@ -42,69 +57,539 @@ st.markdown("""
     </style>
     """, unsafe_allow_html=True)
 
-# Database connection function
-def get_database_connection():
-    """Create and return database connection"""
-    try:
-        conn = mysql.connector.connect(
-            host="localhost",
-            user="root",  # Change this to your MySQL username
-            password="Mysql@2025",  # Change this to your MySQL password
-            database="repair_service_db",
-            autocommit=True
-        )
-        return conn
-    except mysql.connector.Error as err:
-        st.error(f"Database connection error: {err}")
-        return None
+# Database connection pool
+@st.cache_resource
+def get_connection_pool():
+    """Create the process-wide connection pool, shared across reruns and sessions"""
+    return db.ConnectionPool()
+
+# Read routing between the primary and the optional replica
+@st.cache_resource
+def get_replica_router():
+    """Create the process-wide router that sends reads to the replica while it keeps up"""
+    replica = db.ConnectionPool(db.REPLICA_CONFIG) if db.REPLICA_CONFIG else None
+    return db.ReplicaRouter(get_connection_pool(), replica)
+
+def read_pool():
+    """Pool this session reads through: the primary for a few seconds after it wrote, else the router"""
+    return get_replica_router().reader(st.session_state.get("_last_write_at"))
+
+def mark_write():
+    """Forget this session's picker lookups and read its own writes back from the primary"""
+    st.session_state.pop("_picker_lru", None)
+    st.session_state["_last_write_at"] = time.monotonic()
+
+# Concurrent reads, shared by every session of this server process
+@st.cache_resource
+def get_query_executor():
+    """Create the process-wide thread pool that runs a page's independent reads at the same time"""
+    return db.QueryExecutor()
+
+# Query result cache, shared by every session of this server process
+@st.cache_resource
+def get_query_cache():
+    """Create the process-wide query result cache"""
+    return db.QueryCache()
+
+# Latency metrics, shared by every session of this server process
+@st.cache_resource
+def get_metrics():
+    """Create the process-wide metrics recorder (serving /metrics when METRICS_PORT is set)"""
+    recorder = metrics.MetricsRecorder()
+    if metrics.METRICS_PORT:
+        metrics.serve(recorder, metrics.METRICS_PORT)
+    return recorder
+
+# Slow-query advisor, shared by every session of this server process
+@st.cache_resource
+def get_advisor():
+    """Create the process-wide advisor that EXPLAINs queries slower than SLOW_QUERY_THRESHOLD_MS"""
+    return advisor.SlowQueryAdvisor(get_connection_pool())
 
-def execute_query(query, params=None, fetch=True):
-    """Execute a query and return results"""
-    conn = get_database_connection()
-    if conn is None:
+# Columnar analytics snapshot, shared by every session of this server process
+@st.cache_resource
+def get_snapshot():
+    """Create the DuckDB analytics snapshot and start refreshing it, or None when analytics run on MySQL"""
+    if analytics.ANALYTICS_ENGINE != "duckdb" or not analytics.available():
         return None
+    snapshot = analytics.Snapshot()
+    snapshot.start_refresher(get_replica_router())
+    return snapshot
+
+# Background report jobs, shared by every session of this server process
+@st.cache_resource
+def get_job_queue():
+    """Create the process-wide queue that runs reports off the script thread"""
+    return jobs.JobQueue(get_replica_router(), recorder=get_metrics(), snapshot=get_snapshot(),
+                         advisor=get_advisor())
+
+def execute_query(query, params=None, fetch=True, cached=False):
+    """Execute a query and return results.
     
+    Reads go to the replica when one is configured; writes (fetch=False) go
+    to the primary and invalidate every cached result that read an affected
+    table. Reads with cached=True are served from the shared result cache.
+    """
+    pool = get_connection_pool()
     try:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute(query, params or ())
-        
+        with get_metrics().timed_query(query) as timing:
+            if fetch and cached:
+                # Loaded from the primary: a lagging replica's rows would stay cached for the whole TTL
+                result = get_query_cache().get_or_load(query, params, lambda: db.run_query(pool, query, params))
+            elif fetch:
+                result = db.run_query(read_pool(), query, params)
+            else:
+                result = db.run_query(pool, query, params, fetch)
+            if isinstance(result, list):
+                timing["rows"] = len(result)
+                timing["bytes"] = metrics.approximate_size(result)
         if fetch:
-            result = cursor.fetchall()
+            get_advisor().observe(query, params, timing["seconds"])
         else:
-            conn.commit()
-            result = True
-        
-        cursor.close()
-        conn.close()
+            get_query_cache().invalidate(db.affected_tables(db.referenced_tables(query)))
+            mark_write()
         return result
     except mysql.connector.Error as err:
         st.error(f"Query execution error: {err}")
-        if conn and conn.is_connected():
-            conn.close()
         return None
 
+def call_procedure(name, args=()):
+    """Call a stored procedure and return its result sets.
+    
+    Read-only procedures may run on the replica; the rest run on the primary.
+    """
+    tables = db.procedure_tables(name)
+    pool = read_pool() if tables == set() else get_connection_pool()
+    try:
+        with get_metrics().timed("procedure", name) as timing:
+            result_sets = db.run_procedure(pool, name, args)
+            timing["rows"] = sum(len(rows) for rows in result_sets)
+            timing["bytes"] = sum(metrics.approximate_size(rows) for rows in result_sets)
+        return result_sets
+    except mysql.connector.Error as err:
+        st.error(f"Error: {err}")
+        return None
+    finally:
+        if tables is None:
+            get_query_cache().clear()
+        elif tables:
+            get_query_cache().invalidate(tables)
+        if tables is None or tables:
+            mark_write()
+
+def run_in_transaction(name, work, tables):
+    """Run work(cursor) as one transaction on one pooled connection and return its result.
+    
+    `tables` are the tables the work writes; their cached results are dropped
+    afterwards. On a database error nothing is committed and None is returned.
+    """
+    try:
+        with get_metrics().timed("transaction", name):
+            with db.transaction(get_connection_pool()) as cursor:
+                return work(cursor)
+    except mysql.connector.Error as err:
+        st.error(f"Error: {err}")
+        return None
+    finally:
+        get_query_cache().invalidate(db.affected_tables(tables))
+        mark_write()
+
+# ==================== CONCURRENT QUERIES ====================
+def run_concurrently(reads):
+    """Run zero-argument read functions at the same time and return their results in order.
+    
+    The functions run on worker threads, so they must not touch st.*. Their
+    database errors come back here and are shown as execute_query shows
+    them, with None in place of the rows.
+    """
+    results = get_query_executor().run_all(reads)
+    for index, result in enumerate(results):
+        if isinstance(result, mysql.connector.Error):
+            st.error(f"Query execution error: {result}")
+            results[index] = None
+        elif isinstance(result, analytics.SnapshotError):
+            st.error(f"Snapshot query error: {result}")
+            results[index] = None
+        elif isinstance(result, Exception):
+            raise result
+    return results
+
+def _batch_items(queries):
+    """(query, params) pairs from a batch of query strings or (query, params) tuples"""
+    return [(query, None) if isinstance(query, str) else query for query in queries]
+
+def execute_batch(queries):
+    """Run independent reads concurrently, each on its own pooled connection; returns their rows in order.
+    
+    `queries` holds query strings or (query, params) pairs. The batch takes
+    about as long as its slowest query rather than the sum of all of them.
+    """
+    pool, recorder, slow_queries = read_pool(), get_metrics(), get_advisor()
+    
+    def read(query, params):
+        with recorder.timed_query(query) as timing:
+            result = db.run_query(pool, query, params)
+            timing["rows"] = len(result)
+            timing["bytes"] = metrics.approximate_size(result)
+        slow_queries.observe(query, params, timing["seconds"])
+        return result
+    
+    return run_concurrently([lambda query=query, params=params: read(query, params)
+                             for query, params in _batch_items(queries)])
+
+# ==================== ANALYTICS SNAPSHOT ====================
+def snapshot_ready():
+    """The analytics snapshot, if analytics run on it and its first refresh has finished"""
+    snapshot = get_snapshot()
+    return snapshot if snapshot is not None and snapshot.refreshed_at() else None
+
+def analytics_query(query, params=None, snapshot_query=None, snapshot_params=None):
+    """Run an analytics read on the DuckDB snapshot when it is enabled, otherwise on MySQL.
+    
+    `snapshot_query` and `snapshot_params` replace the query on the snapshot
+    where the MySQL query reads a table the snapshot doesn't have.
+    """
+    snapshot = snapshot_ready()
+    if snapshot is None:
+        return execute_query(query, params)
+    if snapshot_query is not None:
+        query, params = snapshot_query, snapshot_params
+    try:
+        with get_metrics().timed_query(query, "snapshot") as timing:
+            result = snapshot.query(query, params)
+            timing["rows"] = len(result)
+            timing["bytes"] = metrics.approximate_size(result)
+        return result
+    except analytics.SnapshotError as err:
+        st.error(f"Snapshot query error: {err}")
+        return None
+
+def analytics_batch(queries):
+    """execute_batch for analytics reads: on the DuckDB snapshot when it is enabled, otherwise on MySQL"""
+    snapshot = snapshot_ready()
+    if snapshot is None:
+        return execute_batch(queries)
+    recorder = get_metrics()
+    
+    def read(query, params):
+        with recorder.timed_query(query, "snapshot") as timing:
+            result = snapshot.query(query, params)
+            timing["rows"] = len(result)
+            timing["bytes"] = metrics.approximate_size(result)
+        return result
+    
+    return run_concurrently([lambda query=query, params=params: read(query, params)
+                             for query, params in _batch_items(queries)])
+
+def snapshot_caption():
+    """Say whether a page's analytics come from the snapshot, and how old it is"""
+    snapshot = get_snapshot()
+    if snapshot is None:
+        return
+    refreshed_at = snapshot.refreshed_at()
+    if refreshed_at is None:
+        st.caption("The analytics snapshot is still being built; showing live data")
+    else:
+        st.caption(f"From the analytics snapshot of {refreshed_at:%Y-%m-%d %H:%M} "
+                   f"({snapshot.age() / 60:.0f} min old)")
+    if snapshot.last_error:
+        st.warning(f"Last snapshot refresh failed: {snapshot.last_error}")
+
+# ==================== PAGE SECTIONS ====================
+def page_sections(labels, key):
+    """Show a tab-style section picker and return the selected label.
+    
+    Unlike st.tabs, which runs every tab body on each rerun, pages only
+    execute the code (and queries) of the section that is on screen.
+    """
+    return st.radio("Section", labels, horizontal=True, key=key, label_visibility="collapsed")
+
+def shared_query(query, params=None, cached=False):
+    """Run a read query at most once per rerun and reuse its rows"""
+    rerun_cache = st.session_state.setdefault("_rerun_query_cache", {})
+    cache_key = (query, tuple(params or ()))
+    if cache_key not in rerun_cache:
+        rerun_cache[cache_key] = execute_query(query, params, cached=cached)
+    return rerun_cache[cache_key]
+
+def get_locations():
+    """All locations, fetched once per rerun and cached across sessions"""
+    return shared_query("SELECT * FROM Location ORDER BY location_id", cached=True)
+
+def get_technician_names():
+    """Technician ids with names, fetched once per rerun and cached across sessions"""
+    return shared_query("""
+        SELECT t.technician_id, u.first_name, u.last_name
+        FROM Technician t
+        JOIN User u ON t.user_id = u.user_id
+    """, cached=True)
+
+# ==================== PAGINATION ====================
+PAGE_SIZE_OPTIONS = [25, 50, 100, 250]
+
+def estimate_row_count(table):
+    """Approximate row count from table statistics, without a COUNT(*) scan.
+    
+    Only an estimate, so it is served from the shared cache for up to
+    db.QUERY_CACHE_TTL_SECONDS rather than re-read on every page turn.
+    """
+    result = shared_query("""
+        SELECT TABLE_ROWS as estimate
+        FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """, (table,), cached=True)
+    return result[0]['estimate'] if result else None
+
+def fetch_keyset_page(query, sort_keys, limit, after=None, filters=None, params=None):
+    """Fetch up to `limit` rows of a newest-first listing, starting after the `after` key.
+    
+    `query` is a SELECT ... FROM ... JOIN ... without WHERE/ORDER BY, and
+    `sort_keys` lists (sql_expression, result_column) pairs that together
+    form a unique descending key, e.g. (request_date, request_id).
+    """
+    conditions = list(filters or [])
+    params = list(params or [])
+    if after is not None:
+        # (k1 < v1) OR (k1 = v1 AND k2 < v2) ... stays index-friendly, unlike a row constructor
+        seek = []
+        for i, (expression, _) in enumerate(sort_keys):
+            terms = [f"{expr} = %s" for expr, _ in sort_keys[:i]] + [f"{expression} < %s"]
+            seek.append("(" + " AND ".join(terms) + ")")
+            params.extend(after[:i + 1])
+        conditions.append("(" + " OR ".join(seek) + ")")
+    
+    if conditions:
+        query += "\nWHERE " + " AND ".join(conditions)
+    query += "\nORDER BY " + ", ".join(f"{expr} DESC" for expr, _ in sort_keys)
+    query += "\nLIMIT %s"
+    params.append(limit)
+    return execute_query(query, tuple(params))
+
+def paginated_grid(key, query, sort_keys, count_table, filters=None, params=None):
+    """Show a newest-first grid one keyset page at a time and return the page's rows"""
+    stack_key = f"{key}_cursors"
+    next_key = f"{key}_next_cursor"
+    
+    def reset():
+        st.session_state[stack_key] = [None]
+    
+    def next_page():
+        st.session_state[stack_key].append(st.session_state[next_key])
+    
+    def previous_page():
+        st.session_state[stack_key].pop()
+    
+    col1, col2 = st.columns([3, 1])
+    with col2:
+        page_size = st.selectbox("Rows per page", PAGE_SIZE_OPTIONS, key=f"{key}_page_size", on_change=reset)
+    
+    cursors = st.session_state.setdefault(stack_key, [None])
+    # One extra row tells us whether another page follows
+    rows = fetch_keyset_page(query, sort_keys, page_size + 1, cursors[-1], filters, params) or []
+    has_next = len(rows) > page_size
+    rows = rows[:page_size]
+    st.session_state[next_key] = tuple(rows[-1][column] for _, column in sort_keys) if has_next else None
+    
+    with col1:
+        estimate = estimate_row_count(count_table)
+        first_row = (len(cursors) - 1) * page_size + 1
+        summary = f"Page {len(cursors)} · rows {first_row}–{first_row + len(rows) - 1}" if rows else f"Page {len(cursors)} · no rows"
+        if estimate is not None:
+            summary += f" of ≈{estimate:,}"
+        st.caption(summary)
+    
+    if rows:
+        df = pd.DataFrame(rows)
+        st.dataframe(df, use_container_width=True)
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.button("⏮ Newest", key=f"{key}_first", on_click=reset, disabled=len(cursors) == 1)
+    with col2:
+        st.button("◀ Previous", key=f"{key}_previous", on_click=previous_page, disabled=len(cursors) == 1)
+    with col3:
+        st.button("Next ▶", key=f"{key}_next", on_click=next_page, disabled=not has_next)
+    
+    return rows
+
+# ==================== DATE WINDOWS ====================
+# Repair_Request, Service_Assignment and Payment are partitioned by month
+# (migration 008). Newest-first lists are bounded below by a recent date so
+# MySQL only opens the last few partitions.
+RECENT_MONTHS = 3
+NO_LOWER_BOUND = datetime(1000, 1, 1)
+
+def recent_since(table):
+    """First day of the month RECENT_MONTHS before the newest row of a partitioned table"""
+    column = db.PARTITIONED_TABLES[table]
+    result = execute_query(f"SELECT MAX({column}) as latest FROM {table}")
+    latest = result[0]['latest'] if result else None
+    if latest is None:
+        return NO_LOWER_BOUND
+    month = latest.year * 12 + latest.month - 1 - RECENT_MONTHS
+    return datetime(month // 12, month % 12 + 1, 1)
+
+def newest_rows(query, table, limit):
+    """Run a newest-first query over the recent months of `table`, or over all rows if they hold fewer than `limit`.
+    
+    The query compares the table's date column with its first %s and ends
+    with LIMIT %s.
+    """
+    rows = execute_query(query, (recent_since(table), limit)) or []
+    if len(rows) < limit:
+        rows = execute_query(query, (NO_LOWER_BOUND, limit)) or []
+    return rows
+
+# ==================== SEARCH PICKERS ====================
+# Most options a type-ahead picker fetches per search
+PICKER_LIMIT = 50
+# Recent picker lookups kept per session, and for how long
+PICKER_LRU_SIZE = 32
+PICKER_LRU_SECONDS = 60
+
+def picker_lookup(query, params):
+    """Run a picker query through a small per-session LRU of recent lookups.
+    
+    Writes made by the session clear it (see execute_query); writes by other
+    sessions show up once an entry is PICKER_LRU_SECONDS old.
+    """
+    lru = st.session_state.setdefault("_picker_lru", OrderedDict())
+    cache_key = (query, params)
+    entry = lru.get(cache_key)
+    if entry and time.monotonic() - entry[0] < PICKER_LRU_SECONDS:
+        lru.move_to_end(cache_key)
+        return entry[1]
+    rows = execute_query(query, params)
+    if rows is not None:
+        lru[cache_key] = (time.monotonic(), rows)
+        lru.move_to_end(cache_key)
+        while len(lru) > PICKER_LRU_SIZE:
+            lru.popitem(last=False)
+    return rows
+
+def search_picker(label, key, query, search_columns, id_column, order_by, format_option,
+                  filters=None, params=None, empty_message="Nothing to select", fulltext=None):
+    """Type-ahead selectbox over one bounded page of rows matching the search box; returns the chosen row.
+    
+    `query` is a SELECT ... FROM ... JOIN without WHERE/ORDER BY and `filters`
+    are its eligibility conditions (see db.picker_query). Matches are fetched
+    PICKER_LIMIT at a time.
+    """
+    page_key = f"{key}_page"
+    
+    def reset():
+        st.session_state[page_key] = 0
+    
+    term = st.text_input(f"Search {label.lower().rstrip(' *')}", key=f"{key}_search", on_change=reset,
+                         placeholder="Type a name, email, phone or #id").strip()
+    page = st.session_state.setdefault(page_key, 0)
+    # One extra row tells us whether another page follows
+    query, params = db.picker_query(query, search_columns, id_column, order_by, term, PICKER_LIMIT + 1,
+                                    page * PICKER_LIMIT, filters, params, fulltext)
+    rows = picker_lookup(query, params) or []
+    has_next = len(rows) > PICKER_LIMIT
+    rows = rows[:PICKER_LIMIT]
+    
+    if not rows:
+        st.info(f"No matches for '{term}'" if term else empty_message)
+        return None
+    options = {format_option(row): row for row in rows}
+    selected = options[st.selectbox(label, options=list(options.keys()), key=f"{key}_select")]
+    
+    if has_next or page:
+        col1, col2, col3 = st.columns([1, 4, 1])
+        with col1:
+            st.button("◀", key=f"{key}_previous", disabled=page == 0,
+                      on_click=lambda: st.session_state.update({page_key: page - 1}))
+        with col2:
+            st.caption(f"Matches {page * PICKER_LIMIT + 1}–{page * PICKER_LIMIT + len(rows)}, type to narrow down")
+        with col3:
+            st.button("▶", key=f"{key}_next", disabled=not has_next,
+                      on_click=lambda: st.session_state.update({page_key: page + 1}))
+    return selected
+
+def user_picker(label, key, filters=None, empty_message="No users found"):
+    """Type-ahead picker over User rows (all columns)"""
+    return search_picker(
+        label, key, "SELECT u.* FROM User u",
+        ["u.first_name", "u.last_name", "u.email", "u.phone_number"], "u.user_id", "u.user_id DESC",
+        lambda u: f"{u['user_id']} - {u['first_name']} {u['last_name']} ({u['email']})",
+        filters=filters, empty_message=empty_message, fulltext="u.first_name, u.last_name, u.email"
+    )
+
+def technician_picker(label, key, filters=None, empty_message="No technicians found", format_option=None):
+    """Type-ahead picker over Technician rows joined to their user's name and email"""
+    return search_picker(
+        label, key, """
+        SELECT t.*, u.first_name, u.last_name, u.email
+        FROM Technician t
+        JOIN User u ON t.user_id = u.user_id
+        """,
+        ["u.first_name", "u.last_name", "u.email", "u.phone_number"], "t.technician_id", "t.technician_id",
+        format_option or (lambda t: f"{t['technician_id']} - {t['first_name']} {t['last_name']} ({t['email']})"),
+        filters=filters, empty_message=empty_message, fulltext="u.first_name, u.last_name, u.email"
+    )
+
+def request_picker(label, key, filters=None, empty_message="No repair requests found"):
+    """Type-ahead picker over repair requests, searched by customer or #id, newest first"""
+    return search_picker(
+        label, key, """
+        SELECT rr.request_id, rr.item_description, rr.status,
+               u.first_name, u.last_name, sc.category_name
+        FROM Repair_Request rr
+        JOIN User u ON rr.customer_id = u.user_id
+        JOIN Service_Category sc ON rr.category_id = sc.category_id
+        """,
+        ["u.first_name", "u.last_name", "u.email"], "rr.request_id", "rr.request_date DESC, rr.request_id DESC",
+        lambda req: f"Request #{req['request_id']} - {req['first_name']} {req['last_name']} - {req['category_name']} ({req['status']})",
+        filters=filters, empty_message=empty_message, fulltext="u.first_name, u.last_name, u.email"
+    )
+
 # ==================== DASHBOARD PAGE ====================
+# Seconds a dashboard snapshot is shared between all sessions before it is re-read
+DASHBOARD_CACHE_TTL = 30
+
+@st.cache_data(ttl=DASHBOARD_CACHE_TTL, show_spinner=False)
+def get_dashboard_data():
+    """Dashboard KPIs and chart data from one GetSystemDashboard call, cached across sessions"""
+    with get_metrics().timed("procedure", "GetSystemDashboard") as timing:
+        result_sets = db.run_procedure(get_replica_router(), 'GetSystemDashboard')
+        timing["rows"] = sum(len(rows) for rows in result_sets)
+    kpis, status_data, revenue_data, recent_requests = result_sets
+    return {
+        "kpis": kpis[0],
+        "status": status_data,
+        "revenue": revenue_data,
+        "recent": recent_requests,
+        "fetched_at": datetime.now(),
+    }
+
 def dashboard_page():
     st.title("Dashboard")
     st.markdown("### System Overview")
     
     # Fetch summary statistics
-    total_users = execute_query("SELECT COUNT(*) as count FROM User")[0]['count']
-    total_technicians = execute_query("SELECT COUNT(*) as count FROM Technician")[0]['count']
-    total_requests = execute_query("SELECT COUNT(*) as count FROM Repair_Request")[0]['count']
-    pending_requests = execute_query("SELECT COUNT(*) as count FROM Repair_Request WHERE status = 'pending'")[0]['count']
+    try:
+        data = get_dashboard_data()
+    except mysql.connector.Error as err:
+        st.error(f"Query execution error: {err}")
+        return
+    kpis = data["kpis"]
     
     # Display metrics
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("Total Users", total_users, delta=None)
+        st.metric("Total Users", kpis['total_users'], delta=None)
     with col2:
-        st.metric("Total Technicians", total_technicians, delta=None)
+        st.metric("Total Technicians", kpis['total_technicians'], delta=None)
     with col3:
-        st.metric("Total Requests", total_requests, delta=None)
+        st.metric("Total Requests", kpis['total_requests'], delta=None)
     with col4:
-        st.metric("Pending Requests", pending_requests, delta=None)
+        st.metric("Pending Requests", kpis['pending_requests'], delta=None)
+    
+    age = (datetime.now() - data["fetched_at"]).total_seconds()
+    st.caption(f"Updated {age:.0f}s ago · refreshes every {DASHBOARD_CACHE_TTL}s")
     
     st.markdown("---")
     
@@ -113,11 +598,7 @@ def dashboard_page():
     
     with col1:
         st.subheader("Requests by Status")
-        status_data = execute_query("""
-            SELECT status, COUNT(*) as count 
-            FROM Repair_Request 
-            GROUP BY status
-        """)
+        status_data = data["status"]
         if status_data:
             df_status = pd.DataFrame(status_data)
             fig = px.pie(df_status, values='count', names='status', 
@@ -126,15 +607,7 @@ def dashboard_page():
     
     with col2:
         st.subheader("Revenue by Service Category")
-        revenue_data = execute_query("""
-            SELECT sc.category_name, SUM(p.payment_amount) as total_revenue
-            FROM Payment p
-            JOIN Service_Assignment sa ON p.assignment_id = sa.assignment_id
-            JOIN Repair_Request rr ON sa.request_id = rr.request_id
-            JOIN Service_Category sc ON rr.category_id = sc.category_id
-            WHERE p.payment_status = 'completed'
-            GROUP BY sc.category_name
-        """)
+        revenue_data = data["revenue"]
         if revenue_data:
             df_revenue = pd.DataFrame(revenue_data)
             fig = px.bar(df_revenue, x='category_name', y='total_revenue',
@@ -144,15 +617,7 @@ def dashboard_page():
     
     # Recent activity
     st.subheader("Recent Repair Requests")
-    recent_requests = execute_query("""
-        SELECT rr.request_id, u.first_name, u.last_name, sc.category_name,
-               rr.status, rr.request_date
-        FROM Repair_Request rr
-        JOIN User u ON rr.customer_id = u.user_id
-        JOIN Service_Category sc ON rr.category_id = sc.category_id
-        ORDER BY rr.request_date DESC
-        LIMIT 10
-    """)
+    recent_requests = data["recent"]
     if recent_requests:
         df_recent = pd.DataFrame(recent_requests)
         st.dataframe(df_recent, use_container_width=True)
@@ -161,16 +626,16 @@ def dashboard_page():
 def location_management():
     st.title("Location Management")
     
-    tab1, tab2, tab3, tab4 = st.tabs(["View All", "Add New", "Update", "Delete"])
+    section = page_sections(["View All", "Add New", "Update", "Delete"], key="location_management_section")
     
-    with tab1:
+    if section == "View All":
         st.subheader("All Locations")
-        locations = execute_query("SELECT * FROM Location ORDER BY location_id")
+        locations = get_locations()
         if locations:
             df = pd.DataFrame(locations)
             st.dataframe(df, use_container_width=True)
     
-    with tab2:
+    elif section == "Add New":
         st.subheader("Add New Location")
         with st.form("add_location_form"):
             area_name = st.text_input("Area Name *")
@@ -189,9 +654,9 @@ def location_management():
                 else:
                     st.error("Please fill all required fields")
     
-    with tab3:
+    elif section == "Update":
         st.subheader("Update Location")
-        locations = execute_query("SELECT * FROM Location")
+        locations = get_locations()
         if locations:
             location_ids = [loc['location_id'] for loc in locations]
             selected_id = st.selectbox("Select Location ID", location_ids)
@@ -213,9 +678,9 @@ def location_management():
                             st.success("Location updated successfully!")
                             st.rerun()
     
-    with tab4:
+    elif section == "Delete":
         st.subheader("Delete Location")
-        locations = execute_query("SELECT * FROM Location")
+        locations = get_locations()
         if locations:
             location_ids = [loc['location_id'] for loc in locations]
             selected_id = st.selectbox("Select Location ID to Delete", location_ids)
@@ -230,9 +695,9 @@ def location_management():
 def user_management():
     st.title("User Management")
     
-    tab1, tab2, tab3, tab4 = st.tabs(["View All", "Add New", "Update", "Delete"])
+    section = page_sections(["View All", "Add New", "Update", "Delete"], key="user_management_section")
     
-    with tab1:
+    if section == "View All":
         st.subheader("All Users")
         users = execute_query("""
             SELECT u.*, l.city, l.state 
@@ -244,9 +709,9 @@ def user_management():
             df = pd.DataFrame(users)
             st.dataframe(df, use_container_width=True)
     
-    with tab2:
+    elif section == "Add New":
         st.subheader("Add New User")
-        locations = execute_query("SELECT location_id, area_name, city, state FROM Location")
+        locations = get_locations()
         
         with st.form("add_user_form"):
             col1, col2 = st.columns(2)
@@ -277,51 +742,43 @@ def user_management():
                 else:
                     st.error("Please fill all required fields")
     
-    with tab3:
+    elif section == "Update":
         st.subheader("Update User")
-        users = execute_query("SELECT * FROM User")
-        locations = execute_query("SELECT location_id, area_name, city, state FROM Location")
+        selected_user = user_picker("Select User", "update_user")
+        locations = get_locations()
         
-        if users:
-            user_ids = [user['user_id'] for user in users]
-            selected_id = st.selectbox("Select User ID", user_ids)
-            
-            selected_user = next((user for user in users if user['user_id'] == selected_id), None)
-            
-            if selected_user:
-                with st.form("update_user_form"):
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        first_name = st.text_input("First Name", value=selected_user['first_name'])
-                        last_name = st.text_input("Last Name", value=selected_user['last_name'])
-                        email = st.text_input("Email", value=selected_user['email'])
-                    with col2:
-                        phone = st.text_input("Phone Number", value=selected_user['phone_number'])
-                        street = st.text_input("Street", value=selected_user['street'] or "")
-                        if locations:
-                            location_options = {f"{loc['area_name']}, {loc['city']}, {loc['state']}": loc['location_id'] for loc in locations}
-                            current_loc_idx = list(location_options.values()).index(selected_user['location_id'])
-                            selected_location = st.selectbox("Location", 
-                                                            options=list(location_options.keys()),
-                                                            index=current_loc_idx)
-                            location_id = location_options[selected_location]
-                    
-                    submitted = st.form_submit_button("Update User")
-                    if submitted:
-                        query = """UPDATE User SET first_name=%s, last_name=%s, email=%s, 
-                                   phone_number=%s, street=%s, location_id=%s WHERE user_id=%s"""
-                        if execute_query(query, (first_name, last_name, email, phone, street, location_id, selected_id), fetch=False):
-                            st.success("User updated successfully!")
-                            st.rerun()
+        if selected_user:
+            selected_id = selected_user['user_id']
+            with st.form("update_user_form"):
+                col1, col2 = st.columns(2)
+                with col1:
+                    first_name = st.text_input("First Name", value=selected_user['first_name'])
+                    last_name = st.text_input("Last Name", value=selected_user['last_name'])
+                    email = st.text_input("Email", value=selected_user['email'])
+                with col2:
+                    phone = st.text_input("Phone Number", value=selected_user['phone_number'])
+                    street = st.text_input("Street", value=selected_user['street'] or "")
+                    if locations:
+                        location_options = {f"{loc['area_name']}, {loc['city']}, {loc['state']}": loc['location_id'] for loc in locations}
+                        current_loc_idx = list(location_options.values()).index(selected_user['location_id'])
+                        selected_location = st.selectbox("Location", 
+                                                        options=list(location_options.keys()),
+                                                        index=current_loc_idx)
+                        location_id = location_options[selected_location]
+                
+                submitted = st.form_submit_button("Update User")
+                if submitted:
+                    query = """UPDATE User SET first_name=%s, last_name=%s, email=%s, 
+                               phone_number=%s, street=%s, location_id=%s WHERE user_id=%s"""
+                    if execute_query(query, (first_name, last_name, email, phone, street, location_id, selected_id), fetch=False):
+                        st.success("User updated successfully!")
+                        st.rerun()
     
-    with tab4:
+    elif section == "Delete":
         st.subheader("Delete User")
-        users = execute_query("SELECT user_id, first_name, last_name, email FROM User")
-        if users:
-            user_options = {f"{user['user_id']} - {user['first_name']} {user['last_name']} ({user['email']})": 
-                          user['user_id'] for user in users}
-            selected_user = st.selectbox("Select User to Delete", options=list(user_options.keys()))
-            user_id = user_options[selected_user]
+        selected_user = user_picker("Select User to Delete", "delete_user")
+        if selected_user:
+            user_id = selected_user['user_id']
             
             if st.button("🗑️ Delete User", type="primary"):
                 query = "DELETE FROM User WHERE user_id = %s"
@@ -330,12 +787,31 @@ def user_management():
                     st.rerun()
 
 # ==================== TECHNICIAN MANAGEMENT ====================
+def onboard_technician(cursor, user_id, experience, certification, availability, specializations):
+    """Insert a technician and all their specializations; returns (technician_id, specialization ids).
+    
+    Meant to run inside run_in_transaction: the ids are read on the same
+    cursor, and the specializations go in as one multi-row INSERT.
+    """
+    cursor.execute("""INSERT INTO Technician (user_id, experience_years, certification_details, 
+                      availability_status, created_date) 
+                      VALUES (%s, %s, %s, %s, %s)""",
+                   (user_id, experience, certification, availability, date.today()))
+    technician_id = cursor.lastrowid
+    cursor.executemany("INSERT INTO Technician_Specialization (technician_id, specialization) VALUES (%s, %s)",
+                       [(technician_id, spec) for spec in specializations])
+    # Read back rather than counted up from lastrowid, which assumes auto_increment_increment = 1
+    cursor.execute("SELECT tech_spec_id FROM Technician_Specialization WHERE technician_id = %s ORDER BY tech_spec_id",
+                   (technician_id,))
+    spec_ids = [row["tech_spec_id"] for row in cursor.fetchall()]
+    return technician_id, spec_ids
+
 def technician_management():
     st.title("Technician Management")
     
-    tab1, tab2, tab3, tab4 = st.tabs(["View All", "Add New", "Update", "Delete"])
+    section = page_sections(["View All", "Add New", "Update", "Delete"], key="technician_management_section")
     
-    with tab1:
+    if section == "View All":
         st.subheader("All Technicians")
         technicians = execute_query("""
             SELECT t.technician_id, t.user_id, u.first_name, u.last_name, u.email, u.phone_number,
@@ -351,22 +827,22 @@ def technician_management():
             df = pd.DataFrame(technicians)
             st.dataframe(df, use_container_width=True)
     
-    with tab2:
+    elif section == "Add New":
         st.subheader("Add New Technician")
-        # Get users who are technicians but not yet in Technician table
-        available_users = execute_query("""
-            SELECT u.user_id, u.first_name, u.last_name, u.email 
-            FROM User u 
-            WHERE u.user_type = 'technician' 
-            AND u.user_id NOT IN (SELECT user_id FROM Technician)
-        """)
+        # Users who are technicians but not yet in Technician table
+        selected_user = search_picker(
+            "Select User *", "add_technician_user",
+            "SELECT u.user_id, u.first_name, u.last_name, u.email FROM User u",
+            ["u.first_name", "u.last_name", "u.email"], "u.user_id", "u.user_id DESC",
+            lambda u: f"{u['first_name']} {u['last_name']} ({u['email']})",
+            filters=["u.user_type = 'technician'",
+                     "NOT EXISTS (SELECT 1 FROM Technician t WHERE t.user_id = u.user_id)"],
+            empty_message="No available users with type 'technician'. Please add a user first with user_type='technician'."
+        )
         
-        if available_users:
+        if selected_user:
+            user_id = selected_user['user_id']
             with st.form("add_technician_form"):
-                user_options = {f"{u['first_name']} {u['last_name']} ({u['email']})": u['user_id'] for u in available_users}
-                selected_user = st.selectbox("Select User *", options=list(user_options.keys()))
-                user_id = user_options[selected_user]
-                
                 col1, col2 = st.columns(2)
                 with col1:
                     experience = st.number_input("Experience (years) *", min_value=0, max_value=50)
@@ -378,74 +854,51 @@ def technician_management():
                 
                 submitted = st.form_submit_button("Add Technician")
                 if submitted:
-                    if experience is not None and specializations:
-                        # Insert technician
-                        query = """INSERT INTO Technician (user_id, experience_years, certification_details, 
-                                   availability_status, created_date) 
-                                   VALUES (%s, %s, %s, %s, %s)"""
-                        if execute_query(query, (user_id, experience, certification, availability, date.today()), fetch=False):
-                            # Get the last inserted technician_id
-                            tech_id = execute_query("SELECT LAST_INSERT_ID() as id")[0]['id']
-                            
-                            # Insert specializations
-                            spec_list = [s.strip() for s in specializations.split(',')]
-                            for spec in spec_list:
-                                spec_query = "INSERT INTO Technician_Specialization (technician_id, specialization) VALUES (%s, %s)"
-                                execute_query(spec_query, (tech_id, spec), fetch=False)
-                            
-                            st.success("Technician added successfully!")
+                    spec_list = [spec.strip() for spec in specializations.split(',') if spec.strip()]
+                    if experience is not None and spec_list:
+                        onboarded = run_in_transaction(
+                            "onboard_technician",
+                            lambda cursor: onboard_technician(cursor, user_id, experience, certification,
+                                                              availability, spec_list),
+                            {"Technician", "Technician_Specialization"}
+                        )
+                        if onboarded:
+                            tech_id, spec_ids = onboarded
+                            st.success(f"Technician #{tech_id} added with {len(spec_ids)} specialization(s) "
+                                       f"(ids {', '.join(map(str, spec_ids))})")
                             st.rerun()
                     else:
                         st.error("Please fill all required fields")
-        else:
-            st.info("No available users with type 'technician'. Please add a user first with user_type='technician'.")
     
-    with tab3:
+    elif section == "Update":
         st.subheader("Update Technician")
-        technicians = execute_query("""
-            SELECT t.*, u.first_name, u.last_name 
-            FROM Technician t 
-            JOIN User u ON t.user_id = u.user_id
-        """)
+        selected_tech = technician_picker("Select Technician", "update_technician")
         
-        if technicians:
-            tech_options = {f"{t['technician_id']} - {t['first_name']} {t['last_name']}": t['technician_id'] for t in technicians}
-            selected_id = st.selectbox("Select Technician", list(tech_options.keys()))
-            tech_id = tech_options[selected_id]
-            
-            selected_tech = next((tech for tech in technicians if tech['technician_id'] == tech_id), None)
-            
-            if selected_tech:
-                with st.form("update_technician_form"):
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        experience = st.number_input("Experience (years)", value=selected_tech['experience_years'])
-                        certification = st.text_area("Certification Details", value=selected_tech['certification_details'] or "")
-                    with col2:
-                        current_avail_idx = ["available", "busy", "offline"].index(selected_tech['availability_status'])
-                        availability = st.selectbox("Availability", ["available", "busy", "offline"], 
-                                                   index=current_avail_idx)
-                    
-                    submitted = st.form_submit_button("Update Technician")
-                    if submitted:
-                        query = """UPDATE Technician SET experience_years=%s, certification_details=%s, 
-                                   availability_status=%s WHERE technician_id=%s"""
-                        if execute_query(query, (experience, certification, availability, tech_id), fetch=False):
-                            st.success("Technician updated successfully!")
-                            st.rerun()
+        if selected_tech:
+            tech_id = selected_tech['technician_id']
+            with st.form("update_technician_form"):
+                col1, col2 = st.columns(2)
+                with col1:
+                    experience = st.number_input("Experience (years)", value=selected_tech['experience_years'])
+                    certification = st.text_area("Certification Details", value=selected_tech['certification_details'] or "")
+                with col2:
+                    current_avail_idx = ["available", "busy", "offline"].index(selected_tech['availability_status'])
+                    availability = st.selectbox("Availability", ["available", "busy", "offline"], 
+                                               index=current_avail_idx)
+                
+                submitted = st.form_submit_button("Update Technician")
+                if submitted:
+                    query = """UPDATE Technician SET experience_years=%s, certification_details=%s, 
+                               availability_status=%s WHERE technician_id=%s"""
+                    if execute_query(query, (experience, certification, availability, tech_id), fetch=False):
+                        st.success("Technician updated successfully!")
+                        st.rerun()
     
-    with tab4:
+    elif section == "Delete":
         st.subheader("Delete Technician")
-        technicians = execute_query("""
-            SELECT t.technician_id, u.first_name, u.last_name, u.email 
-            FROM Technician t 
-            JOIN User u ON t.user_id = u.user_id
-        """)
-        if technicians:
-            tech_options = {f"{tech['technician_id']} - {tech['first_name']} {tech['last_name']} ({tech['email']})": 
-                          tech['technician_id'] for tech in technicians}
-            selected_tech = st.selectbox("Select Technician to Delete", options=list(tech_options.keys()))
-            tech_id = tech_options[selected_tech]
+        selected_tech = technician_picker("Select Technician to Delete", "delete_technician")
+        if selected_tech:
+            tech_id = selected_tech['technician_id']
             
             if st.button("Delete Technician", type="primary"):
                 query = "DELETE FROM Technician WHERE technician_id = %s"
@@ -457,9 +910,9 @@ def technician_management():
 def service_category_management():
     st.title("Service Category Management")
     
-    tab1, tab2, tab3, tab4 = st.tabs(["View All", "Add New", "Update", "Delete"])
+    section = page_sections(["View All", "Add New", "Update", "Delete"], key="service_category_management_section")
     
-    with tab1:
+    if section == "View All":
         st.subheader("All Service Categories")
         categories = execute_query("""
             SELECT sc.*, COUNT(DISTINCT rr.request_id) as request_count
@@ -472,7 +925,7 @@ def service_category_management():
             df = pd.DataFrame(categories)
             st.dataframe(df, use_container_width=True)
     
-    with tab2:
+    elif section == "Add New":
         st.subheader("Add New Service Category")
         with st.form("add_category_form"):
             category_name = st.text_input("Category Name *")
@@ -491,9 +944,9 @@ def service_category_management():
                 else:
                     st.error("Please fill all required fields")
     
-    with tab3:
+    elif section == "Update":
         st.subheader("Update Service Category")
-        categories = execute_query("SELECT * FROM Service_Category")
+        categories = execute_query("SELECT * FROM Service_Category", cached=True)
         if categories:
             category_ids = [cat['category_id'] for cat in categories]
             selected_id = st.selectbox("Select Category ID", category_ids)
@@ -515,9 +968,9 @@ def service_category_management():
                             st.success("Service category updated successfully!")
                             st.rerun()
     
-    with tab4:
+    elif section == "Delete":
         st.subheader("Delete Service Category")
-        categories = execute_query("SELECT category_id, category_name, base_service_charge FROM Service_Category")
+        categories = execute_query("SELECT category_id, category_name, base_service_charge FROM Service_Category", cached=True)
         if categories:
             cat_options = {f"{cat['category_id']} - {cat['category_name']} (₹{cat['base_service_charge']})": 
                          cat['category_id'] for cat in categories}
@@ -534,37 +987,29 @@ def service_category_management():
 def repair_request_management():
     st.title("Repair Request Management")
     
-    tab1, tab2, tab3, tab4 = st.tabs(["View All", "Add New", "Update Status", "Delete"])
+    section = page_sections(["View All", "Add New", "Update Status", "Delete"], key="repair_request_management_section")
     
-    with tab1:
+    if section == "View All":
         st.subheader("All Repair Requests")
-        requests = execute_query("""
+        paginated_grid("requests_grid", """
             SELECT rr.*, u.first_name, u.last_name, u.email, 
                    sc.category_name, l.city, l.state
             FROM Repair_Request rr
             JOIN User u ON rr.customer_id = u.user_id
             JOIN Service_Category sc ON rr.category_id = sc.category_id
             JOIN Location l ON u.location_id = l.location_id
-            ORDER BY rr.request_date DESC
-        """)
-        if requests:
-            df = pd.DataFrame(requests)
-            st.dataframe(df, use_container_width=True)
+        """, [("rr.request_date", "request_date"), ("rr.request_id", "request_id")], "Repair_Request")
     
-    with tab2:
+    elif section == "Add New":
         st.subheader("Add New Repair Request")
-        users = execute_query("SELECT user_id, first_name, last_name, email FROM User WHERE user_type = 'customer'")
-        categories = execute_query("SELECT category_id, category_name FROM Service_Category")
+        selected_customer = user_picker("Customer *", "add_request_customer", filters=["u.user_type = 'customer'"],
+                                        empty_message="No customers found")
+        customer_id = selected_customer['user_id'] if selected_customer else None
+        categories = execute_query("SELECT category_id, category_name FROM Service_Category", cached=True)
         
         with st.form("add_request_form"):
             col1, col2 = st.columns(2)
             with col1:
-                if users:
-                    user_options = {f"{user['first_name']} {user['last_name']} ({user['email']})": 
-                                  user['user_id'] for user in users}
-                    selected_user = st.selectbox("Customer *", options=list(user_options.keys()))
-                    customer_id = user_options[selected_user]
-                
                 if categories:
                     category_options = {cat['category_name']: cat['category_id'] for cat in categories}
                     selected_category = st.selectbox("Service Category *", options=list(category_options.keys()))
@@ -591,56 +1036,30 @@ def repair_request_management():
                 else:
                     st.error("Please fill all required fields")
     
-    with tab3:
+    elif section == "Update Status":
         st.subheader("Update Request Status")
-        requests = execute_query("""
-            SELECT rr.request_id, rr.item_description, rr.status,
-                   u.first_name, u.last_name, sc.category_name
-            FROM Repair_Request rr
-            JOIN User u ON rr.customer_id = u.user_id
-            JOIN Service_Category sc ON rr.category_id = sc.category_id
-            ORDER BY rr.request_date DESC
-        """)
+        selected_req = request_picker("Select Request", "update_request")
         
-        if requests:
-            request_options = {
-                f"Request #{req['request_id']} - {req['first_name']} {req['last_name']} - {req['category_name']} ({req['status']})": 
-                req['request_id'] for req in requests
-            }
-            selected_request = st.selectbox("Select Request", options=list(request_options.keys()))
-            request_id = request_options[selected_request]
-            
-            selected_req = next((req for req in requests if req['request_id'] == request_id), None)
-            
-            if selected_req:
-                with st.form("update_status_form"):
-                    current_status_idx = ["pending", "assigned", "in_progress", "completed", "cancelled"].index(selected_req['status'])
-                    new_status = st.selectbox("New Status", ["pending", "assigned", "in_progress", "completed", "cancelled"],
-                                            index=current_status_idx)
-                    
-                    submitted = st.form_submit_button("Update Status")
-                    if submitted:
-                        query = "UPDATE Repair_Request SET status = %s WHERE request_id = %s"
-                        if execute_query(query, (new_status, request_id), fetch=False):
-                            st.success("Request status updated successfully!")
-                            st.rerun()
+        if selected_req:
+            request_id = selected_req['request_id']
+            with st.form("update_status_form"):
+                current_status_idx = ["pending", "assigned", "in_progress", "completed", "cancelled"].index(selected_req['status'])
+                new_status = st.selectbox("New Status", ["pending", "assigned", "in_progress", "completed", "cancelled"],
+                                        index=current_status_idx)
+                
+                submitted = st.form_submit_button("Update Status")
+                if submitted:
+                    query = "UPDATE Repair_Request SET status = %s WHERE request_id = %s"
+                    if execute_query(query, (new_status, request_id), fetch=False):
+                        st.success("Request status updated successfully!")
+                        st.rerun()
     
-    with tab4:
+    elif section == "Delete":
         st.subheader("Delete Repair Request")
-        requests = execute_query("""
-            SELECT rr.request_id, rr.item_description, u.first_name, u.last_name, sc.category_name
-            FROM Repair_Request rr
-            JOIN User u ON rr.customer_id = u.user_id
-            JOIN Service_Category sc ON rr.category_id = sc.category_id
-        """)
+        selected_req = request_picker("Select Request to Delete", "delete_request")
         
-        if requests:
-            request_options = {
-                f"Request #{req['request_id']} - {req['first_name']} {req['last_name']} - {req['category_name']}": 
-                req['request_id'] for req in requests
-            }
-            selected_request = st.selectbox("Select Request to Delete", options=list(request_options.keys()))
-            request_id = request_options[selected_request]
+        if selected_req:
+            request_id = selected_req['request_id']
             
             if st.button("Delete Request", type="primary"):
                 query = "DELETE FROM Repair_Request WHERE request_id = %s"
@@ -649,14 +1068,83 @@ def repair_request_management():
                     st.rerun()
 
 # ==================== SERVICE ASSIGNMENT ====================
+def assign_technician(request_id, technician_id, service_cost, estimated_completion=None):
+    """Assign an available technician to a pending request in one transactional call.
+    
+    Returns the new assignment id, or None if the procedure refused (the
+    error is shown). estimated_completion defaults to three days from today.
+    """
+    results = call_procedure('AssignTechnicianToRequest',
+                             [request_id, technician_id, service_cost, estimated_completion])
+    if results and results[0]:
+        return results[0][0]['assignment_id']
+    return None
+
+def load_dispatch_inputs():
+    """Pending unassigned requests, available technicians and the specialization mappings, as DataFrames"""
+    requests = execute_query("""
+        SELECT rr.request_id, rr.category_id, rr.priority_level, rr.request_date,
+               u.location_id, l.city, sc.base_service_charge as service_cost
+        FROM Repair_Request rr
+        JOIN User u ON rr.customer_id = u.user_id
+        JOIN Location l ON u.location_id = l.location_id
+        JOIN Service_Category sc ON rr.category_id = sc.category_id
+        WHERE rr.status = 'pending'
+        AND NOT EXISTS (SELECT 1 FROM Service_Assignment sa WHERE sa.request_id = rr.request_id)
+    """)
+    technicians = execute_query("""
+        SELECT t.technician_id, t.experience_years, u.location_id, l.city
+        FROM Technician t
+        JOIN User u ON t.user_id = u.user_id
+        JOIN Location l ON u.location_id = l.location_id
+        WHERE t.availability_status = 'available'
+    """)
+    skills = execute_query("""
+        SELECT ts.technician_id, ts.specialization
+        FROM Technician_Specialization ts
+        JOIN Technician t ON ts.technician_id = t.technician_id
+        WHERE t.availability_status = 'available'
+    """)
+    category_skills = execute_query("SELECT category_id, specialization FROM Category_Specialization", cached=True)
+    if None in (requests, technicians, skills, category_skills):
+        return None
+    return (pd.DataFrame(requests, columns=["request_id", "category_id", "priority_level", "request_date",
+                                            "location_id", "city", "service_cost"]),
+            pd.DataFrame(technicians, columns=["technician_id", "experience_years", "location_id", "city"]),
+            pd.DataFrame(skills, columns=["technician_id", "specialization"]),
+            pd.DataFrame(category_skills, columns=["category_id", "specialization"]))
+
+def commit_dispatch(cursor, plan):
+    """Stage a dispatch plan in the session's Dispatch_Plan table and assign it with DispatchAssignments"""
+    cursor.execute("DROP TEMPORARY TABLE IF EXISTS Dispatch_Plan")
+    cursor.execute("""
+        CREATE TEMPORARY TABLE Dispatch_Plan (
+            plan_order INT PRIMARY KEY,
+            request_id INT NOT NULL,
+            technician_id INT NOT NULL,
+            service_cost DECIMAL(8,2) NOT NULL,
+            assignment_id INT NULL,
+            skipped_reason VARCHAR(255) NULL
+        )
+    """)
+    cursor.executemany(
+        "INSERT INTO Dispatch_Plan (plan_order, request_id, technician_id, service_cost) VALUES (%s, %s, %s, %s)",
+        [(i + 1, int(row.request_id), int(row.technician_id), float(row.service_cost))
+         for i, row in enumerate(plan.itertuples())]
+    )
+    cursor.callproc("DispatchAssignments")
+    results = [dict(zip(result.column_names, row)) for result in cursor.stored_results() for row in result.fetchall()]
+    cursor.execute("DROP TEMPORARY TABLE Dispatch_Plan")
+    return results
+
 def service_assignment():
     st.title("Service Assignment")
     
-    tab1, tab2 = st.tabs(["View Assignments", "Create Assignment"])
+    section = page_sections(["View Assignments", "Create Assignment", "Auto Dispatch"], key="service_assignment_section")
     
-    with tab1:
+    if section == "View Assignments":
         st.subheader("All Service Assignments")
-        assignments = execute_query("""
+        paginated_grid("assignments_grid", """
             SELECT sa.*, rr.item_description, rr.status as request_status,
                    t.technician_id, u1.first_name as tech_first_name, u1.last_name as tech_last_name,
                    u2.first_name as customer_first_name, u2.last_name as customer_last_name,
@@ -667,57 +1155,41 @@ def service_assignment():
             JOIN User u1 ON t.user_id = u1.user_id
             JOIN User u2 ON rr.customer_id = u2.user_id
             JOIN Service_Category sc ON rr.category_id = sc.category_id
-            ORDER BY sa.assignment_date DESC
-        """)
-        if assignments:
-            df = pd.DataFrame(assignments)
-            st.dataframe(df, use_container_width=True)
+        """, [("sa.assignment_date", "assignment_date"), ("sa.assignment_id", "assignment_id")], "Service_Assignment")
     
-    with tab2:
+    elif section == "Create Assignment":
         st.subheader("Create New Assignment")
         
-        # Get pending requests
-        pending_requests = execute_query("""
+        # Pending requests that have no assignment yet
+        selected_request = search_picker(
+            "Select Request *", "create_assignment_request", """
             SELECT rr.request_id, rr.item_description, u.first_name, u.last_name, 
                    sc.category_name, rr.status
             FROM Repair_Request rr
             JOIN User u ON rr.customer_id = u.user_id
             JOIN Service_Category sc ON rr.category_id = sc.category_id
-            WHERE rr.status = 'pending'
-            AND rr.request_id NOT IN (SELECT request_id FROM Service_Assignment)
-            ORDER BY rr.request_date DESC
-        """)
+            """,
+            # Searched by customer or #id: item_description is unindexed TEXT
+            ["u.first_name", "u.last_name", "u.email"], "rr.request_id", "rr.request_date DESC",
+            lambda req: f"Request #{req['request_id']} - {req['first_name']} {req['last_name']} - {req['category_name']}",
+            filters=["rr.status = 'pending'",
+                     "NOT EXISTS (SELECT 1 FROM Service_Assignment sa WHERE sa.request_id = rr.request_id)"],
+            empty_message="No pending requests available for assignment", fulltext="u.first_name, u.last_name, u.email"
+        )
         
-        # Get available technicians
-        available_techs = execute_query("""
-            SELECT t.technician_id, u.first_name, u.last_name, t.experience_years,
-                   GROUP_CONCAT(ts.specialization SEPARATOR ', ') as specializations
-            FROM Technician t
-            JOIN User u ON t.user_id = u.user_id
-            LEFT JOIN Technician_Specialization ts ON t.technician_id = ts.technician_id
-            WHERE t.availability_status = 'available'
-            GROUP BY t.technician_id
-        """)
+        # Available technicians
+        selected_tech = None
+        if selected_request:
+            selected_tech = technician_picker(
+                "Select Technician *", "create_assignment_technician",
+                filters=["t.availability_status = 'available'"], empty_message="No available technicians",
+                format_option=lambda tech: f"Tech #{tech['technician_id']} - {tech['first_name']} {tech['last_name']} ({tech['experience_years']} yrs)"
+            )
         
-        if pending_requests and available_techs:
+        if selected_request and selected_tech:
+            request_id = selected_request['request_id']
+            technician_id = selected_tech['technician_id']
             with st.form("create_assignment_form"):
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    request_options = {
-                        f"Request #{req['request_id']} - {req['first_name']} {req['last_name']} - {req['category_name']}": 
-                        req['request_id'] for req in pending_requests
-                    }
-                    selected_request = st.selectbox("Select Request *", options=list(request_options.keys()))
-                    request_id = request_options[selected_request]
-                
-                with col2:
-                    tech_options = {
-                        f"Tech #{tech['technician_id']} - {tech['first_name']} {tech['last_name']} ({tech['experience_years']} yrs)": 
-                        tech['technician_id'] for tech in available_techs
-                    }
-                    selected_tech = st.selectbox("Select Technician *", options=list(tech_options.keys()))
-                    technician_id = tech_options[selected_tech]
                 
                 service_cost = st.number_input("Service Cost (₹) *", min_value=0.0, step=100.0)
                 estimated_completion = st.date_input("Estimated Completion Date *", value=date.today())
@@ -725,37 +1197,75 @@ def service_assignment():
                 submitted = st.form_submit_button("Create Assignment")
                 if submitted:
                     if request_id and technician_id and service_cost > 0:
-                        query = """INSERT INTO Service_Assignment (request_id, technician_id, assignment_date, 
-                                   estimated_completion_date, assignment_status, service_cost) 
-                                   VALUES (%s, %s, %s, %s, %s, %s)"""
-                        if execute_query(query, (request_id, technician_id, datetime.now(), 
-                                              estimated_completion, 'assigned', service_cost), fetch=False):
-                            # Update request status
-                            execute_query("UPDATE Repair_Request SET status = 'assigned' WHERE request_id = %s", 
-                                        (request_id,), fetch=False)
-                            # Update technician availability
-                            execute_query("UPDATE Technician SET availability_status = 'busy' WHERE technician_id = %s", 
-                                        (technician_id,), fetch=False)
-                            
-                            st.success("Assignment created successfully!")
+                        assignment_id = assign_technician(request_id, technician_id, service_cost, estimated_completion)
+                        if assignment_id:
+                            st.success(f"Assignment #{assignment_id} created successfully!")
                             st.rerun()
                     else:
                         st.error("Please fill all required fields")
-        else:
-            if not pending_requests:
-                st.info("No pending requests available for assignment")
-            if not available_techs:
-                st.warning("No available technicians")
+    
+    elif section == "Auto Dispatch":
+        st.subheader("Auto Dispatch")
+        st.caption("Match every pending request to an available technician: most urgent first, preferring a "
+                   "technician specialised in the request's category in the customer's own area, then city.")
+        allow_unspecialised = st.checkbox("Fall back to unspecialised technicians in the customer's area",
+                                          key="dispatch_unspecialised")
+        
+        if st.button("Plan Dispatch", key="dispatch_plan_btn"):
+            inputs = load_dispatch_inputs()
+            if inputs is not None:
+                tiers = [tier for tier in dispatch.TIERS if tier[1] or allow_unspecialised]
+                started = time.perf_counter()
+                st.session_state["dispatch_plan"] = dispatch.plan_dispatch(*inputs, tiers=tiers)
+                st.session_state["dispatch_stats"] = {
+                    "pending": len(inputs[0]), "available": len(inputs[1]),
+                    "seconds": time.perf_counter() - started,
+                }
+        
+        plan = st.session_state.get("dispatch_plan")
+        if plan is not None:
+            stats = st.session_state["dispatch_stats"]
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Pending Requests", f"{stats['pending']:,}")
+            col2.metric("Available Technicians", f"{stats['available']:,}")
+            col3.metric("Planned Assignments", f"{len(plan):,}")
+            col4.metric("Planning Time", f"{stats['seconds'] * 1000:.0f} ms")
+            
+            if not plan.empty:
+                col1, col2 = st.columns(2)
+                with col1:
+                    fig = px.bar(plan.groupby("tier").size().reset_index(name="assignments"),
+                                 x="tier", y="assignments", title="Matches by Tier")
+                    st.plotly_chart(fig, use_container_width=True)
+                with col2:
+                    fig = px.bar(plan.groupby("priority_level").size().reset_index(name="assignments"),
+                                 x="priority_level", y="assignments", title="Matches by Priority")
+                    st.plotly_chart(fig, use_container_width=True)
+                st.dataframe(plan.head(1000), use_container_width=True, hide_index=True)
+                
+                if st.button(f"Commit {len(plan):,} Assignments", key="dispatch_commit_btn", type="primary"):
+                    results = run_in_transaction(
+                        "dispatch", lambda cursor: commit_dispatch(cursor, plan),
+                        db.PROCEDURE_WRITES["DispatchAssignments"]
+                    )
+                    if results is not None:
+                        assigned = sum(1 for row in results if row['assignment_id'])
+                        skipped = [row for row in results if not row['assignment_id']]
+                        st.success(f"{assigned:,} assignments created")
+                        if skipped:
+                            st.warning(f"{len(skipped):,} skipped (taken since the plan was made)")
+                            st.dataframe(pd.DataFrame(skipped), use_container_width=True, hide_index=True)
+                        del st.session_state["dispatch_plan"]
 
 # ==================== PAYMENT MANAGEMENT ====================
 def payment_management():
     st.title("Payment Management")
     
-    tab1, tab2, tab3 = st.tabs(["View Payments", "Add Payment", "Payment Analytics"])
+    section = page_sections(["View Payments", "Add Payment", "Payment Analytics"], key="payment_management_section")
     
-    with tab1:
+    if section == "View Payments":
         st.subheader("All Payments")
-        payments = execute_query("""
+        payments = paginated_grid("payments_grid", """
             SELECT p.*, sa.assignment_id, rr.item_description,
                    u1.first_name as customer_first_name, u1.last_name as customer_last_name,
                    u2.first_name as tech_first_name, u2.last_name as tech_last_name
@@ -765,18 +1275,21 @@ def payment_management():
             JOIN User u1 ON rr.customer_id = u1.user_id
             JOIN Technician t ON sa.technician_id = t.technician_id
             JOIN User u2 ON t.user_id = u2.user_id
-            ORDER BY p.payment_date DESC
-        """)
+        """, [("p.payment_date", "payment_date"), ("p.payment_id", "payment_id")], "Payment")
         if payments:
-            df = pd.DataFrame(payments)
-            st.dataframe(df, use_container_width=True)
-            
-            # Summary statistics
+            # Summary statistics (over all payments, not just this page)
             st.markdown("---")
             col1, col2, col3 = st.columns(3)
-            total_payments = sum(p['payment_amount'] for p in payments)
-            completed_payments = sum(p['payment_amount'] for p in payments if p['payment_status'] == 'completed')
-            pending_payments = sum(p['payment_amount'] for p in payments if p['payment_status'] == 'pending')
+            totals = execute_query("""
+                SELECT SUM(total_amount) as total,
+                       SUM(CASE WHEN payment_status = 'completed' THEN total_amount ELSE 0 END) as completed,
+                       SUM(CASE WHEN payment_status = 'pending' THEN total_amount ELSE 0 END) as pending
+                FROM Payment_Status_Totals
+            """)
+            totals = totals[0] if totals else {}
+            total_payments = totals.get('total') or 0
+            completed_payments = totals.get('completed') or 0
+            pending_payments = totals.get('pending') or 0
             
             with col1:
                 st.metric("Total Payments", f"₹{total_payments:,.2f}")
@@ -785,11 +1298,12 @@ def payment_management():
             with col3:
                 st.metric("Pending", f"₹{pending_payments:,.2f}")
     
-    with tab2:
+    elif section == "Add Payment":
         st.subheader("Add New Payment")
         
-        # Get assignments without payments
-        assignments = execute_query("""
+        # Assignments without payments
+        assignment_data = search_picker(
+            "Select Assignment *", "add_payment_assignment", """
             SELECT sa.assignment_id, rr.item_description, 
                    u1.first_name as customer_first_name, u1.last_name as customer_last_name,
                    u2.first_name as tech_first_name, u2.last_name as tech_last_name,
@@ -799,19 +1313,16 @@ def payment_management():
             JOIN User u1 ON rr.customer_id = u1.user_id
             JOIN Technician t ON sa.technician_id = t.technician_id
             JOIN User u2 ON t.user_id = u2.user_id
-            WHERE sa.assignment_id NOT IN (SELECT assignment_id FROM Payment)
-            ORDER BY sa.assignment_date DESC
-        """)
+            """,
+            ["u1.first_name", "u1.last_name", "u2.first_name", "u2.last_name"], "sa.assignment_id",
+            "sa.assignment_date DESC",
+            lambda asg: f"Assignment #{asg['assignment_id']} - {asg['customer_first_name']} {asg['customer_last_name']} (Tech: {asg['tech_first_name']} {asg['tech_last_name']}) - Cost: ₹{asg['service_cost']}",
+            filters=["NOT EXISTS (SELECT 1 FROM Payment p WHERE p.assignment_id = sa.assignment_id)"],
+            empty_message="No assignments available for payment"
+        )
         
-        if assignments:
+        if assignment_data:
             with st.form("add_payment_form"):
-                assignment_options = {
-                    f"Assignment #{asg['assignment_id']} - {asg['customer_first_name']} {asg['customer_last_name']} (Tech: {asg['tech_first_name']} {asg['tech_last_name']}) - Cost: ₹{asg['service_cost']}": 
-                    asg for asg in assignments
-                }
-                selected_assignment = st.selectbox("Select Assignment *", options=list(assignment_options.keys()))
-                assignment_data = assignment_options[selected_assignment]
-                
                 col1, col2 = st.columns(2)
                 with col1:
                     payment_amount = st.number_input("Payment Amount (₹) *", value=float(assignment_data['service_cost']), min_value=0.0, step=100.0)
@@ -829,14 +1340,29 @@ def payment_management():
                                            datetime.now(), payment_status, transaction_ref), fetch=False):
                         st.success("Payment added successfully!")
                         st.rerun()
-        else:
-            st.info("No assignments available for payment")
     
-    with tab3:
+    elif section == "Payment Analytics":
         st.subheader("Payment Analytics")
+        snapshot_caption()
+        
+        # Closed months come from the Revenue_Monthly rollup, the current month from Payment
+        this_month = reports.month_start(datetime.now())
         
         # Payment method distribution
-        method_data = execute_query("""
+        method_data = analytics_query("""
+            SELECT payment_method, SUM(transaction_count) as count, SUM(total_revenue) as total
+            FROM (
+                SELECT payment_method, transaction_count, total_revenue
+                FROM Revenue_Monthly
+                WHERE revenue_month < %s
+                UNION ALL
+                SELECT payment_method, 1, payment_amount
+                FROM Payment
+                WHERE payment_status = 'completed' AND payment_date >= %s
+            ) revenue
+            GROUP BY payment_method
+            HAVING SUM(transaction_count) > 0
+        """, (this_month, this_month), snapshot_query="""
             SELECT payment_method, COUNT(*) as count, SUM(payment_amount) as total
             FROM Payment
             WHERE payment_status = 'completed'
@@ -861,7 +1387,21 @@ def payment_management():
                 st.plotly_chart(fig, use_container_width=True)
         
         # Monthly revenue trend
-        monthly_data = execute_query("""
+        monthly_data = analytics_query("""
+            SELECT DATE_FORMAT(revenue_month, '%%Y-%%m') as month, 
+                   SUM(total_revenue) as revenue, SUM(transaction_count) as transaction_count
+            FROM Revenue_Monthly
+            WHERE revenue_month < %s
+            GROUP BY revenue_month
+            HAVING SUM(transaction_count) > 0
+            UNION ALL
+            SELECT DATE_FORMAT(payment_date, '%%Y-%%m') as month, 
+                   SUM(payment_amount) as revenue, COUNT(*) as transaction_count
+            FROM Payment
+            WHERE payment_status = 'completed' AND payment_date >= %s
+            GROUP BY month
+            ORDER BY month
+        """, (this_month, this_month), snapshot_query="""
             SELECT DATE_FORMAT(payment_date, '%%Y-%%m') as month, 
                    SUM(payment_amount) as revenue, COUNT(*) as transaction_count
             FROM Payment
@@ -882,11 +1422,11 @@ def payment_management():
 def review_management():
     st.title("Review Management")
     
-    tab1, tab2, tab3 = st.tabs(["View Reviews", "Add Review", "Analytics"])
+    section = page_sections(["View Reviews", "Add Review", "Analytics"], key="review_management_section")
     
-    with tab1:
+    if section == "View Reviews":
         st.subheader("All Reviews")
-        reviews = execute_query("""
+        paginated_grid("reviews_grid", """
             SELECT r.*, sa.assignment_id, rr.item_description,
                    u1.first_name as customer_first_name, u1.last_name as customer_last_name,
                    u2.first_name as tech_first_name, u2.last_name as tech_last_name
@@ -896,17 +1436,14 @@ def review_management():
             JOIN User u1 ON rr.customer_id = u1.user_id
             JOIN Technician t ON sa.technician_id = t.technician_id
             JOIN User u2 ON t.user_id = u2.user_id
-            ORDER BY r.review_date DESC
-        """)
-        if reviews:
-            df = pd.DataFrame(reviews)
-            st.dataframe(df, use_container_width=True)
+        """, [("r.review_date", "review_date"), ("r.review_id", "review_id")], "Review")
     
-    with tab2:
+    elif section == "Add Review":
         st.subheader("Add New Review")
         
-        # Get completed assignments without reviews
-        assignments = execute_query("""
+        # Completed assignments without reviews
+        selected_assignment = search_picker(
+            "Select Assignment *", "add_review_assignment", """
             SELECT sa.assignment_id, rr.item_description, 
                    u1.first_name as customer_first_name, u1.last_name as customer_last_name,
                    u2.first_name as tech_first_name, u2.last_name as tech_last_name
@@ -915,20 +1452,18 @@ def review_management():
             JOIN User u1 ON rr.customer_id = u1.user_id
             JOIN Technician t ON sa.technician_id = t.technician_id
             JOIN User u2 ON t.user_id = u2.user_id
-            WHERE sa.assignment_status = 'completed'
-            AND sa.assignment_id NOT IN (SELECT assignment_id FROM Review)
-            ORDER BY sa.actual_completion_date DESC
-        """)
+            """,
+            ["u1.first_name", "u1.last_name", "u2.first_name", "u2.last_name"], "sa.assignment_id",
+            "sa.actual_completion_date DESC",
+            lambda asg: f"Assignment #{asg['assignment_id']} - Customer: {asg['customer_first_name']} {asg['customer_last_name']} | Tech: {asg['tech_first_name']} {asg['tech_last_name']}",
+            filters=["sa.assignment_status = 'completed'",
+                     "NOT EXISTS (SELECT 1 FROM Review r WHERE r.assignment_id = sa.assignment_id)"],
+            empty_message="No completed assignments available for review"
+        )
         
-        if assignments:
+        if selected_assignment:
+            assignment_id = selected_assignment['assignment_id']
             with st.form("add_review_form"):
-                assignment_options = {
-                    f"Assignment #{asg['assignment_id']} - Customer: {asg['customer_first_name']} {asg['customer_last_name']} | Tech: {asg['tech_first_name']} {asg['tech_last_name']}": 
-                    asg['assignment_id'] for asg in assignments
-                }
-                selected_assignment = st.selectbox("Select Assignment *", options=list(assignment_options.keys()))
-                assignment_id = assignment_options[selected_assignment]
-                
                 col1, col2 = st.columns(2)
                 with col1:
                     customer_rating = st.slider("Customer Rating *", min_value=1, max_value=5, value=4)
@@ -945,14 +1480,14 @@ def review_management():
                                            review_text, datetime.now()), fetch=False):
                         st.success("Review added successfully!")
                         st.rerun()
-        else:
-            st.info("No completed assignments available for review")
     
-    with tab3:
+    elif section == "Analytics":
         st.subheader("Review Analytics")
+        snapshot_caption()
         
-        # Average ratings by technician
-        tech_ratings = execute_query("""
+        # Technician averages, rating distribution and overall figures, read concurrently
+        tech_ratings, rating_dist, avg_rows, count_rows = analytics_batch([
+            """
             SELECT t.technician_id, u.first_name, u.last_name,
                    AVG(r.technician_rating) as avg_rating, COUNT(r.review_id) as review_count
             FROM Technician t
@@ -962,7 +1497,16 @@ def review_management():
             GROUP BY t.technician_id, u.first_name, u.last_name
             HAVING review_count > 0
             ORDER BY avg_rating DESC
-        """)
+            """,
+            """
+            SELECT customer_rating as rating, COUNT(*) as count
+            FROM Review
+            GROUP BY customer_rating
+            ORDER BY customer_rating
+            """,
+            "SELECT AVG(customer_rating) as avg FROM Review",
+            "SELECT COUNT(*) as count FROM Review",
+        ])
         
         if tech_ratings:
             st.markdown("**Technician Ratings**")
@@ -978,13 +1522,6 @@ def review_management():
             st.dataframe(df_ratings[['technician', 'avg_rating', 'review_count']], use_container_width=True)
         
         # Rating distribution
-        rating_dist = execute_query("""
-            SELECT customer_rating as rating, COUNT(*) as count
-            FROM Review
-            GROUP BY customer_rating
-            ORDER BY customer_rating
-        """)
-        
         if rating_dist:
             col1, col2 = st.columns(2)
             with col1:
@@ -995,21 +1532,96 @@ def review_management():
                 st.plotly_chart(fig, use_container_width=True)
             
             with col2:
-                avg_rating = execute_query("SELECT AVG(customer_rating) as avg FROM Review")[0]['avg']
-                total_reviews = execute_query("SELECT COUNT(*) as count FROM Review")[0]['count']
+                avg_rating = avg_rows[0]['avg'] if avg_rows else None
+                total_reviews = count_rows[0]['count'] if count_rows else "N/A"
                 
                 st.metric("Average Customer Rating", f"{avg_rating:.2f} / 5.0" if avg_rating else "N/A")
                 st.metric("Total Reviews", total_reviews)
 
+# ==================== MATERIALIZED VIEWS ====================
+# Summary tables (migrations/004) hold only the aggregates; names are joined in here
+MATERIALIZED_VIEWS = {
+    "Technician_Rating_View": {
+        "title": "Technician Rating View",
+        "description": "Shows technician ratings with review counts and completed jobs",
+        "table": "MV_Technician_Rating",
+        "query": """
+            SELECT t.technician_id, u.first_name, u.last_name,
+                   mv.rating_average, mv.total_reviews, mv.total_jobs_completed
+            FROM MV_Technician_Rating mv
+            JOIN Technician t ON mv.technician_id = t.technician_id
+            JOIN User u ON t.user_id = u.user_id
+            ORDER BY mv.rating_average DESC
+        """,
+    },
+    "Popular_Categories_View": {
+        "title": "Popular Categories View",
+        "description": "Shows service categories ranked by request count and average rating",
+        "table": "MV_Popular_Categories",
+        "query": """
+            SELECT sc.category_id, sc.category_name,
+                   COALESCE(mv.total_requests, 0) as total_requests,
+                   ROUND(mv.rating_sum / NULLIF(mv.rating_count, 0), 2) as average_rating,
+                   sc.base_service_charge
+            FROM Service_Category sc
+            LEFT JOIN MV_Popular_Categories mv ON sc.category_id = mv.category_id
+            ORDER BY total_requests DESC
+        """,
+    },
+    "Customer_Service_History": {
+        "title": "Customer Service History",
+        "description": "Shows customer request history and total spending",
+        "table": "MV_Customer_Service_History",
+        "query": """
+            SELECT u.user_id, u.first_name, u.last_name, u.email,
+                   COALESCE(mv.total_requests, 0) as total_requests,
+                   COALESCE(mv.completed_requests, 0) as completed_requests,
+                   mv.total_spent
+            FROM User u
+            LEFT JOIN MV_Customer_Service_History mv ON u.user_id = mv.user_id
+            WHERE u.user_type = 'customer'
+            ORDER BY mv.total_spent DESC
+        """,
+    },
+    "Technician_Earnings_View": {
+        "title": "Technician Earnings View",
+        "description": "Shows technician job counts and earnings summary",
+        "table": "MV_Technician_Earnings",
+        "query": """
+            SELECT t.technician_id, u.first_name, u.last_name,
+                   COALESCE(mv.total_assignments, 0) as total_assignments,
+                   COALESCE(mv.completed_jobs, 0) as completed_jobs,
+                   COALESCE(mv.total_earnings, 0) as total_earnings,
+                   mv.avg_job_cost
+            FROM Technician t
+            JOIN User u ON t.user_id = u.user_id
+            LEFT JOIN MV_Technician_Earnings mv ON t.technician_id = mv.technician_id
+            ORDER BY total_earnings DESC
+        """,
+    },
+    "Pending_Requests_By_Location": {
+        "title": "Pending Requests By Location",
+        "description": "Shows pending request count grouped by location",
+        "table": "MV_Pending_Requests_By_Location",
+        "query": """
+            SELECT l.location_id, l.area_name, l.city, mv.pending_requests
+            FROM MV_Pending_Requests_By_Location mv
+            JOIN Location l ON mv.location_id = l.location_id
+            WHERE mv.pending_requests > 0
+            ORDER BY mv.pending_requests DESC
+        """,
+    },
+}
+
 # ==================== DATABASE FEATURES (NEW SECTION) ====================
 def database_features():
     st.title("Database Features Demonstration")
     st.markdown("### Showcasing Procedures, Functions, Triggers, and Views")
     
-    tab1, tab2, tab3, tab4 = st.tabs(["Stored Procedures", "Functions", "Triggers", "Views"])
+    section = page_sections(["Stored Procedures", "Functions", "Triggers", "Views"], key="database_features_section")
     
     # ========== TAB 1: STORED PROCEDURES ==========
-    with tab1:
+    if section == "Stored Procedures":
         st.subheader("Stored Procedures Implementation")
         
         # Procedure 1: AssignTechnicianToRequest
@@ -1018,39 +1630,42 @@ def database_features():
 PROCEDURE AssignTechnicianToRequest(
     IN p_request_id INT,
     IN p_technician_id INT,
-    IN p_service_cost DECIMAL(8,2)
+    IN p_service_cost DECIMAL(8,2),
+    IN p_estimated_completion DATE  -- NULL: three days from today
 )
--- Automatically:
--- 1. Creates Service Assignment
--- 2. Updates Repair Request status to 'assigned'
+-- In one transaction:
+-- 1. Locks the technician and the request (SELECT ... FOR UPDATE),
+--    refusing busy technicians and requests that are no longer pending
+-- 2. Creates Service Assignment (a trigger marks the request 'assigned')
 -- 3. Updates Technician status to 'busy'
             """, language="sql")
             
             st.markdown("**Test this Procedure:**")
             
             # Get pending requests
-            pending_requests = execute_query("""
+            pending_requests = newest_rows("""
                 SELECT rr.request_id, rr.item_description, u.first_name, u.last_name, 
                        sc.category_name, rr.status
                 FROM Repair_Request rr
                 JOIN User u ON rr.customer_id = u.user_id
                 JOIN Service_Category sc ON rr.category_id = sc.category_id
-                WHERE rr.status = 'pending'
-                AND rr.request_id NOT IN (SELECT request_id FROM Service_Assignment)
+                WHERE rr.request_date >= %s AND rr.status = 'pending'
+                AND NOT EXISTS (SELECT 1 FROM Service_Assignment sa WHERE sa.request_id = rr.request_id)
                 ORDER BY rr.request_date DESC
-                LIMIT 10
-            """)
+                LIMIT %s
+            """, "Repair_Request", 10)
             
-            # Get available technicians
-            available_techs = execute_query("""
-                SELECT t.technician_id, u.first_name, u.last_name, t.experience_years
-                FROM Technician t
-                JOIN User u ON t.user_id = u.user_id
-                WHERE t.availability_status = 'available'
-            """)
+            selected_tech = None
+            if pending_requests:
+                selected_tech = technician_picker(
+                    "Select Technician", "proc1_tech", filters=["t.availability_status = 'available'"],
+                    empty_message="No available technicians",
+                    format_option=lambda tech: f"Tech #{tech['technician_id']} - {tech['first_name']} {tech['last_name']}"
+                )
             
-            if pending_requests and available_techs:
-                col1, col2, col3 = st.columns(3)
+            if pending_requests and selected_tech:
+                technician_id = selected_tech['technician_id']
+                col1, col2 = st.columns(2)
                 
                 with col1:
                     request_options = {
@@ -1061,36 +1676,15 @@ PROCEDURE AssignTechnicianToRequest(
                     request_id = request_options[selected_request]
                 
                 with col2:
-                    tech_options = {
-                        f"Tech #{tech['technician_id']} - {tech['first_name']} {tech['last_name']}": 
-                        tech['technician_id'] for tech in available_techs
-                    }
-                    selected_tech = st.selectbox("Select Technician", options=list(tech_options.keys()), key="proc1_tech")
-                    technician_id = tech_options[selected_tech]
-                
-                with col3:
                     service_cost = st.number_input("Service Cost (₹)", min_value=100.0, value=1500.0, step=100.0, key="proc1_cost")
                 
                 if st.button("Execute Procedure", key="proc1_btn", type="primary"):
-                    conn = get_database_connection()
-                    try:
-                        cursor = conn.cursor()
-                        cursor.callproc('AssignTechnicianToRequest', [request_id, technician_id, service_cost])
-                        conn.commit()
-                        
-                        # Fetch results
-                        for result in cursor.stored_results():
-                            rows = result.fetchall()
-                            for row in rows:
-                                st.success(f"{row[0]}")
-                        
-                        cursor.close()
-                        conn.close()
+                    assignment_id = assign_technician(request_id, technician_id, service_cost)
+                    if assignment_id:
+                        st.success(f"Assignment created successfully (assignment #{assignment_id})")
                         st.balloons()
-                    except mysql.connector.Error as err:
-                        st.error(f"Error: {err}")
-            else:
-                st.info("No pending requests or available technicians to test this procedure.")
+            elif not pending_requests:
+                st.info("No pending requests to test this procedure.")
         
         st.markdown("---")
         
@@ -1122,7 +1716,7 @@ PROCEDURE CompleteServiceAndPayment(
                 JOIN Technician t ON sa.technician_id = t.technician_id
                 JOIN User u2 ON t.user_id = u2.user_id
                 WHERE sa.assignment_status IN ('assigned', 'in_progress')
-                AND sa.assignment_id NOT IN (SELECT assignment_id FROM Payment)
+                AND NOT EXISTS (SELECT 1 FROM Payment p WHERE p.assignment_id = sa.assignment_id)
                 LIMIT 10
             """)
             
@@ -1144,24 +1738,13 @@ PROCEDURE CompleteServiceAndPayment(
                     transaction_ref = st.text_input("Transaction Ref", value=f"TXN{datetime.now().strftime('%Y%m%d%H%M')}", key="proc2_ref")
                 
                 if st.button("Execute Procedure", key="proc2_btn", type="primary"):
-                    conn = get_database_connection()
-                    try:
-                        cursor = conn.cursor()
-                        cursor.callproc('CompleteServiceAndPayment', 
-                                      [assignment_data['assignment_id'], payment_method, transaction_ref])
-                        conn.commit()
-                        
-                        # Fetch results
-                        for result in cursor.stored_results():
-                            rows = result.fetchall()
+                    results = call_procedure('CompleteServiceAndPayment', 
+                                             [assignment_data['assignment_id'], payment_method, transaction_ref])
+                    if results is not None:
+                        for rows in results:
                             for row in rows:
-                                st.success(f"{row[0]}")
-                        
-                        cursor.close()
-                        conn.close()
+                                st.success(f"{row['message']}")
                         st.balloons()
-                    except mysql.connector.Error as err:
-                        st.error(f"Error: {err}")
             else:
                 st.info("No active assignments available to test this procedure.")
         
@@ -1180,11 +1763,7 @@ PROCEDURE GetTechnicianDashboard(IN p_technician_id INT)
             st.markdown("**Test this Procedure:**")
             
             # Get all technicians
-            technicians = execute_query("""
-                SELECT t.technician_id, u.first_name, u.last_name
-                FROM Technician t
-                JOIN User u ON t.user_id = u.user_id
-            """)
+            technicians = get_technician_names()
             
             if technicians:
                 tech_options = {
@@ -1195,15 +1774,11 @@ PROCEDURE GetTechnicianDashboard(IN p_technician_id INT)
                 tech_id = tech_options[selected_tech]
                 
                 if st.button("Execute Procedure", key="proc3_btn", type="primary"):
-                    conn = get_database_connection()
-                    try:
-                        cursor = conn.cursor(dictionary=True)
-                        cursor.callproc('GetTechnicianDashboard', [tech_id])
-                        
+                    results = call_procedure('GetTechnicianDashboard', [tech_id])
+                    if results is not None:
                         result_num = 0
-                        for result in cursor.stored_results():
+                        for rows in results:
                             result_num += 1
-                            rows = result.fetchall()
                             
                             if result_num == 1:
                                 st.markdown("**Basic Info:**")
@@ -1217,14 +1792,9 @@ PROCEDURE GetTechnicianDashboard(IN p_technician_id INT)
                                 st.markdown("**Recent Assignments:**")
                                 df = pd.DataFrame(rows)
                                 st.dataframe(df, use_container_width=True)
-                        
-                        cursor.close()
-                        conn.close()
-                    except mysql.connector.Error as err:
-                        st.error(f"Error: {err}")
     
     # ========== TAB 2: FUNCTIONS ==========
-    with tab2:
+    elif section == "Functions":
         st.subheader("User-Defined Functions")
         
         # Function 1: GetTechnicianRating
@@ -1237,11 +1807,7 @@ RETURNS DECIMAL(3,2)
             
             st.markdown("**Test this Function:**")
             
-            technicians = execute_query("""
-                SELECT t.technician_id, u.first_name, u.last_name
-                FROM Technician t
-                JOIN User u ON t.user_id = u.user_id
-            """)
+            technicians = get_technician_names()
             
             if technicians:
                 tech_options = {
@@ -1311,7 +1877,7 @@ FUNCTION GetTechnicianEarnings(
                         st.info(f"Period: {start_date} to {end_date}")
     
     # ========== TAB 3: TRIGGERS ==========
-    with tab3:
+    elif section == "Triggers":
         st.subheader("Database Triggers")
         st.info("Triggers execute automatically on INSERT, UPDATE, or DELETE operations")
         
@@ -1333,15 +1899,16 @@ FOR EACH ROW
             """)
             
             # Show recent trigger activations
-            recent = execute_query("""
+            recent = newest_rows("""
                 SELECT sa.assignment_id, sa.assignment_date, rr.request_id, 
                        rr.status, u.first_name, u.last_name
                 FROM Service_Assignment sa
                 JOIN Repair_Request rr ON sa.request_id = rr.request_id
                 JOIN User u ON rr.customer_id = u.user_id
+                WHERE sa.assignment_date >= %s
                 ORDER BY sa.assignment_date DESC
-                LIMIT 5
-            """)
+                LIMIT %s
+            """, "Service_Assignment", 5)
             
             if recent:
                 st.markdown("**Recent Trigger Activations:**")
@@ -1410,7 +1977,7 @@ FOR EACH ROW
             """)
             
             # Show payment validation examples
-            validations = execute_query("""
+            validations = newest_rows("""
                 SELECT p.payment_id, p.payment_amount, sa.service_cost,
                        CASE 
                            WHEN p.payment_amount = sa.service_cost THEN 'Valid'
@@ -1418,9 +1985,10 @@ FOR EACH ROW
                        END as validation_status
                 FROM Payment p
                 JOIN Service_Assignment sa ON p.assignment_id = sa.assignment_id
+                WHERE p.payment_date >= %s
                 ORDER BY p.payment_date DESC
-                LIMIT 10
-            """)
+                LIMIT %s
+            """, "Payment", 10)
             
             if validations:
                 st.markdown("**Recent Payment Validations:**")
@@ -1429,52 +1997,34 @@ FOR EACH ROW
                 st.caption("All payments passed trigger validation")
     
     # ========== TAB 4: VIEWS ==========
-    with tab4:
+    elif section == "Views":
         st.subheader("Database Views")
-        st.info("Views are virtual tables that simplify complex queries")
+        st.info("Views are virtual tables that simplify complex queries; these are served from trigger-maintained summary tables")
         
-        view_choice = st.selectbox("Select a View to Display", [
-            "Technician_Rating_View",
-            "Popular_Categories_View", 
-            "Customer_Service_History",
-            "Technician_Earnings_View",
-            "Pending_Requests_By_Location"
-        ])
+        view_choice = st.selectbox("Select a View to Display", list(MATERIALIZED_VIEWS))
         
-        if view_choice == "Technician_Rating_View":
-            st.markdown("**Technician Rating View**")
-            st.code("""
-VIEW: Shows technician ratings with review counts and completed jobs
-            """, language="sql")
-            data = execute_query("SELECT * FROM Technician_Rating_View ORDER BY rating_average DESC")
-            
-        elif view_choice == "Popular_Categories_View":
-            st.markdown("**Popular Categories View**")
-            st.code("""
-VIEW: Shows service categories ranked by request count and average rating
+        view = MATERIALIZED_VIEWS[view_choice]
+        st.markdown(f"**{view['title']}**")
+        st.code(f"""
+VIEW: {view['description']}
+MATERIALIZED AS: {view['table']} (kept current by triggers)
             """, language="sql")
-            data = execute_query("SELECT * FROM Popular_Categories_View")
-            
-        elif view_choice == "Customer_Service_History":
-            st.markdown("**Customer Service History**")
-            st.code("""
-VIEW: Shows customer request history and total spending
-            """, language="sql")
-            data = execute_query("SELECT * FROM Customer_Service_History ORDER BY total_spent DESC")
-            
-        elif view_choice == "Technician_Earnings_View":
-            st.markdown("**Technician Earnings View**")
-            st.code("""
-VIEW: Shows technician job counts and earnings summary
-            """, language="sql")
-            data = execute_query("SELECT * FROM Technician_Earnings_View ORDER BY total_earnings DESC")
-            
-        else:  # Pending_Requests_By_Location
-            st.markdown("**Pending Requests By Location**")
-            st.code("""
-VIEW: Shows pending request count grouped by location
-            """, language="sql")
-            data = execute_query("SELECT * FROM Pending_Requests_By_Location")
+        data = execute_query(view['query'])
+        
+        refresh = execute_query(f"""
+            SELECT MAX(mv.refreshed_at) as last_refreshed, MAX(log.last_full_refresh) as last_full_refresh
+            FROM {view['table']} mv
+            LEFT JOIN MV_Refresh_Log log ON log.view_name = %s
+        """, (view_choice,))
+        col1, col2 = st.columns([3, 1])
+        if refresh:
+            col1.caption(f"Last refreshed: {refresh[0]['last_refreshed'] or 'never'} · "
+                         f"last full rebuild: {refresh[0]['last_full_refresh'] or 'never'}")
+        if col2.button("Rebuild All", key="rebuild_views_btn"):
+            results = call_procedure('RefreshMaterializedViews')
+            if results:
+                st.success(results[-1][0]['message'])
+                st.rerun()
         
         if data:
             df = pd.DataFrame(data)
@@ -1496,29 +2046,19 @@ VIEW: Shows pending request count grouped by location
 def advanced_operations():
     st.title("Advanced Operations")
     
-    tab1, tab2 = st.tabs(["Complex Queries", "Reports"])
+    section = page_sections(["Complex Queries", "Reports"], key="advanced_operations_section")
     
-    with tab1:
+    if section == "Complex Queries":
         st.subheader("Complex Queries & Analytics")
+        snapshot_caption()
+        
+        # The three aggregates are independent, so they are read concurrently
+        top_techs, category_stats, location_stats = analytics_batch([
+            reports.TOP_TECHNICIANS, reports.CATEGORY_STATS, reports.LOCATION_STATS,
+        ])
         
         # Top Performing Technicians
         st.markdown("**Top Performing Technicians (by revenue & rating)**")
-        top_techs = execute_query("""
-            SELECT t.technician_id, u.first_name, u.last_name,
-                   COUNT(DISTINCT sa.assignment_id) as total_jobs,
-                   SUM(p.payment_amount) as total_revenue,
-                   AVG(r.technician_rating) as avg_rating
-            FROM Technician t
-            JOIN User u ON t.user_id = u.user_id
-            JOIN Service_Assignment sa ON t.technician_id = sa.technician_id
-            LEFT JOIN Payment p ON sa.assignment_id = p.assignment_id AND p.payment_status = 'completed'
-            LEFT JOIN Review r ON sa.assignment_id = r.assignment_id
-            WHERE sa.assignment_status = 'completed'
-            GROUP BY t.technician_id, u.first_name, u.last_name
-            HAVING total_revenue IS NOT NULL
-            ORDER BY total_revenue DESC, avg_rating DESC
-            LIMIT 10
-        """)
         if top_techs:
             df_top = pd.DataFrame(top_techs)
             st.dataframe(df_top, use_container_width=True)
@@ -1527,19 +2067,6 @@ def advanced_operations():
         
         # Most Requested Service Categories
         st.markdown("**Most Requested Service Categories**")
-        category_stats = execute_query("""
-            SELECT sc.category_name,
-                   COUNT(rr.request_id) as total_requests,
-                   SUM(CASE WHEN rr.status = 'completed' THEN 1 ELSE 0 END) as completed,
-                   SUM(CASE WHEN rr.status = 'pending' THEN 1 ELSE 0 END) as pending,
-                   AVG(p.payment_amount) as avg_payment
-            FROM Service_Category sc
-            LEFT JOIN Repair_Request rr ON sc.category_id = rr.category_id
-            LEFT JOIN Service_Assignment sa ON rr.request_id = sa.request_id
-            LEFT JOIN Payment p ON sa.assignment_id = p.assignment_id AND p.payment_status = 'completed'
-            GROUP BY sc.category_id, sc.category_name
-            ORDER BY total_requests DESC
-        """)
         if category_stats:
             df_cat = pd.DataFrame(category_stats)
             st.dataframe(df_cat, use_container_width=True)
@@ -1548,111 +2075,250 @@ def advanced_operations():
         
         # Location-wise Analysis
         st.markdown("**Location-wise Service Analysis**")
-        location_stats = execute_query("""
-            SELECT l.area_name, l.city, l.state,
-                   COUNT(DISTINCT rr.request_id) as total_requests,
-                   COUNT(DISTINCT t.technician_id) as technicians_in_area,
-                   SUM(p.payment_amount) as total_revenue
-            FROM Location l
-            LEFT JOIN User u ON l.location_id = u.location_id
-            LEFT JOIN Repair_Request rr ON u.user_id = rr.customer_id
-            LEFT JOIN Technician t ON l.location_id = (SELECT location_id FROM User WHERE user_id = t.user_id)
-            LEFT JOIN Service_Assignment sa ON rr.request_id = sa.request_id
-            LEFT JOIN Payment p ON sa.assignment_id = p.assignment_id AND p.payment_status = 'completed'
-            GROUP BY l.location_id, l.area_name, l.city, l.state
-            ORDER BY total_revenue DESC
-        """)
         if location_stats:
             df_loc = pd.DataFrame(location_stats)
             st.dataframe(df_loc, use_container_width=True)
     
-    with tab2:
+    elif section == "Reports":
         st.subheader("Reports")
         
-        report_type = st.selectbox("Select Report Type", 
-                                   ["Service Completion Report", 
-                                    "Technician Performance Report",
-                                    "Revenue Analysis Report",
-                                    "Customer Satisfaction Report"])
+        report_type = st.selectbox("Select Report Type", list(reports.REPORTS.keys()))
+        report = reports.REPORTS[report_type]
+        
+        params = None
+        if report["dated"]:
+            col1, col2 = st.columns(2)
+            with col1:
+                start_date = st.date_input("From", value=date.today() - timedelta(days=365),
+                                           key="report_from")
+            with col2:
+                end_date = st.date_input("To", value=date.today(), key="report_to")
+            params = (datetime.combine(start_date, datetime.min.time()),
+                      datetime.combine(end_date + timedelta(days=1), datetime.min.time()))
+        file_format = st.radio("File Format", list(exporter.FORMATS.keys()), horizontal=True)
+        snapshot_caption()
+        
+        # On the snapshot, reports read the raw tables; on MySQL some have their own parameters
+        if snapshot_ready():
+            engine, query = "duckdb", report.get("snapshot_query", report["query"])
+        else:
+            engine, query = "mysql", report["query"]
+            if params and "params" in report:
+                params = report["params"](*params)
         
+        job_queue = get_job_queue()
+        # Jobs are remembered per report, dates, format and engine: changing one hides the old result
+        session_key = jobs.job_key(report_type, params, file_format, engine)
         if st.button("Generate Report"):
-            if report_type == "Service Completion Report":
-                data = execute_query("""
-                    SELECT rr.request_id, u.first_name, u.last_name, sc.category_name,
-                           rr.status, rr.request_date, sa.actual_completion_date,
-                           DATEDIFF(sa.actual_completion_date, rr.request_date) as days_to_complete
-                    FROM Repair_Request rr
-                    JOIN User u ON rr.customer_id = u.user_id
-                    JOIN Service_Category sc ON rr.category_id = sc.category_id
-                    LEFT JOIN Service_Assignment sa ON rr.request_id = sa.request_id
-                    WHERE rr.status = 'completed'
-                    ORDER BY rr.request_date DESC
-                """)
-                
-            elif report_type == "Technician Performance Report":
-                data = execute_query("""
-                    SELECT t.technician_id, u.first_name, u.last_name,
-                           COUNT(sa.assignment_id) as total_assignments,
-                           SUM(CASE WHEN sa.assignment_status = 'completed' THEN 1 ELSE 0 END) as completed,
-                           AVG(r.technician_rating) as avg_rating,
-                           SUM(p.payment_amount) as total_earnings
-                    FROM Technician t
-                    JOIN User u ON t.user_id = u.user_id
-                    LEFT JOIN Service_Assignment sa ON t.technician_id = sa.technician_id
-                    LEFT JOIN Review r ON sa.assignment_id = r.assignment_id
-                    LEFT JOIN Payment p ON sa.assignment_id = p.assignment_id AND p.payment_status = 'completed'
-                    GROUP BY t.technician_id, u.first_name, u.last_name
-                    ORDER BY total_earnings DESC
-                """)
-                
-            elif report_type == "Revenue Analysis Report":
-                data = execute_query("""
-                    SELECT DATE_FORMAT(p.payment_date, '%%Y-%%m') as month,
-                           sc.category_name,
-                           COUNT(p.payment_id) as transaction_count,
-                           SUM(p.payment_amount) as total_revenue,
-                           AVG(p.payment_amount) as avg_transaction
-                    FROM Payment p
-                    JOIN Service_Assignment sa ON p.assignment_id = sa.assignment_id
-                    JOIN Repair_Request rr ON sa.request_id = rr.request_id
-                    JOIN Service_Category sc ON rr.category_id = sc.category_id
-                    WHERE p.payment_status = 'completed'
-                    GROUP BY month, sc.category_name
-                    ORDER BY month DESC, total_revenue DESC
-                """)
-                
-            else:  # Customer Satisfaction Report
-                data = execute_query("""
-                    SELECT u.user_id, u.first_name, u.last_name,
-                           COUNT(rr.request_id) as total_requests,
-                           AVG(r.customer_rating) as avg_rating_given,
-                           SUM(p.payment_amount) as total_spent
-                    FROM User u
-                    LEFT JOIN Repair_Request rr ON u.user_id = rr.customer_id
-                    LEFT JOIN Service_Assignment sa ON rr.request_id = sa.request_id
-                    LEFT JOIN Review r ON sa.assignment_id = r.assignment_id
-                    LEFT JOIN Payment p ON sa.assignment_id = p.assignment_id AND p.payment_status = 'completed'
-                    WHERE u.user_type = 'customer'
-                    GROUP BY u.user_id, u.first_name, u.last_name
-                    HAVING total_requests > 0
-                    ORDER BY avg_rating_given DESC
-                """)
+            # Runs on the job pool; an identical report already running or just finished is reused
+            job_id = job_queue.submit(report_type, query, params, file_format, engine)
+            st.session_state.setdefault("report_jobs", {})[session_key] = job_id
+        
+        job_id = st.session_state.get("report_jobs", {}).get(session_key)
+        job = job_queue.get(job_id) if job_id else None
+        if job_id and (job is None or job["status"] == "done" and not os.path.exists(job["result_path"])):
+            # Purged after JOB_RETENTION_SECONDS
+            st.warning("This report's result has expired; generate it again")
+        elif job and job["status"] in jobs.ACTIVE:
+            # No sleep-and-rerun loop: that would hold the script thread for the whole job
+            st.info(f"{report_type} is {job['status']} (submitted {job['submitted_at']}); "
+                    f"refresh to see the result once it finishes")
+            st.button("Refresh Status", key="report_job_refresh")
+        elif job and job["status"] == "failed":
+            st.error(f"Report failed: {job['error']}")
+        elif job and job["status"] == "done":
+            preview = job_queue.preview(job)
+            st.caption(f"Generated {job['finished_at']}")
+            st.dataframe(preview, use_container_width=True)
+            if job["row_count"] > len(preview):
+                st.caption(f"Showing the first {len(preview):,} of {job['row_count']:,} rows; "
+                           f"the download has them all")
             
-            if data:
-                df_report = pd.DataFrame(data)
-                st.dataframe(df_report, use_container_width=True)
-                
-                # Download option
-                csv = df_report.to_csv(index=False)
+            # Download option
+            fmt = exporter.FORMATS[job["file_format"]]
+            with open(job["result_path"], "rb") as f:
                 st.download_button(
-                    label="Download Report as CSV",
-                    data=csv,
-                    file_name=f"{report_type.replace(' ', '_').lower()}_{datetime.now().strftime('%Y%m%d')}.csv",
-                    mime="text/csv"
+                    label=f"Download Report as {job['file_format']}",
+                    data=f,
+                    file_name=f"{report_type.replace(' ', '_').lower()}_{datetime.now().strftime('%Y%m%d')}{fmt['suffix']}",
+                    mime=fmt["mime"]
                 )
+        
+        with st.expander("Recent Report Jobs"):
+            recent = job_queue.recent()
+            if recent:
+                st.dataframe(pd.DataFrame(recent)[["report", "params", "file_format", "engine", "status", "submitted_at",
+                                                   "finished_at", "row_count", "error"]],
+                             use_container_width=True, hide_index=True)
+            else:
+                st.info("No report jobs yet")
+
+# ==================== BULK IMPORT ====================
+def bulk_import_page():
+    st.title("Bulk Import")
+    
+    entity = st.selectbox("Import", list(importer.ENTITIES.keys()), key="bulk_import_entity")
+    spec = importer.ENTITIES[entity]["columns"]
+    st.caption("Columns (required in bold): " + ", ".join(
+        f"**{name}**" if column.get("required") else name for name, column in spec.items()))
+    
+    uploaded = st.file_uploader("CSV or Parquet file", type=["csv", "parquet"], key="bulk_import_file")
+    chunk_rows = st.number_input("Rows per transaction", min_value=100, max_value=50000,
+                                 value=importer.IMPORT_CHUNK_ROWS, step=500)
+    
+    if uploaded and st.button("Import"):
+        progress_bar = st.progress(0.0, text="Reading file...")
+        counts = {"rows": 0, "loaded": 0, "rejected": 0}
+        
+        def report(rows, loaded, rejected, fraction):
+            counts.update(rows=rows, loaded=loaded, rejected=rejected)
+            progress_bar.progress(fraction or 0.0,
+                                  text=f"{rows:,} rows read, {loaded:,} loaded, {rejected:,} rejected")
+        
+        try:
+            with get_metrics().timed("transaction", f"Import {importer.ENTITIES[entity]['table']}"):
+                loaded, rejects = importer.import_file(get_connection_pool(), entity, uploaded, uploaded.name,
+                                                       int(chunk_rows), progress=report)
+            progress_bar.progress(1.0, text=f"{counts['rows']:,} rows read")
+            st.session_state["bulk_import_result"] = (entity, uploaded.name, loaded, rejects)
+        except importer.ImportFileError as err:
+            st.error(f"Cannot import {uploaded.name}: {err}")
+        except (mysql.connector.Error, ValueError) as err:
+            # Chunks before the failing one are already committed
+            st.error(f"Import stopped after {counts['rows']:,} rows ({counts['loaded']:,} loaded): {err}")
+        finally:
+            get_query_cache().invalidate(db.affected_tables([importer.ENTITIES[entity]["table"]]))
+            mark_write()
+    
+    result = st.session_state.get("bulk_import_result")
+    if result and result[0] == entity:
+        _, filename, loaded, rejects = result
+        st.subheader(f"Last Import: {filename}")
+        col1, col2 = st.columns(2)
+        col1.metric("Rows Loaded", f"{loaded:,}")
+        col2.metric("Rows Rejected", f"{len(rejects):,}")
+        if not rejects.empty:
+            st.dataframe(rejects.head(1000), use_container_width=True, hide_index=True)
+            if len(rejects) > 1000:
+                st.caption(f"Showing the first 1,000 of {len(rejects):,} rejected rows")
+            st.download_button("Download Rejects", data=rejects.to_csv(index=False),
+                               file_name=f"{filename.rsplit('.', 1)[0]}_rejects.csv", mime="text/csv")
+
+# ==================== PERFORMANCE ====================
+def performance_page():
+    st.title("Performance")
+    
+    recorder = get_metrics()
+    st.caption(f"Latency of the last {len(recorder.samples):,} timed calls in this server process "
+               f"(ring buffer of {recorder.samples.maxlen:,})")
+    
+    section = page_sections(["Queries", "Slow Queries", "Pages", "Prometheus"], key="performance_page_section")
+    
+    if section == "Queries":
+        st.subheader("Slowest Query Fingerprints")
+        query_stats = (recorder.summary("query") + recorder.summary("snapshot") + recorder.summary("procedure")
+                       + recorder.summary("transaction"))
+        if query_stats:
+            df = pd.DataFrame(query_stats).sort_values("p95_ms", ascending=False)
+            fig = px.bar(df.head(10), x="p95_ms", y="name", orientation="h",
+                         hover_data=["statement", "calls", "p50_ms", "p99_ms"],
+                         title="p95 latency (ms), top 10")
+            fig.update_yaxes(autorange="reversed")
+            st.plotly_chart(fig, use_container_width=True)
+            st.dataframe(df[["name", "statement", "calls", "p50_ms", "p95_ms", "p99_ms", "max_ms",
+                             "avg_rows", "avg_kib", "errors"]].round(2),
+                         use_container_width=True, hide_index=True)
+        else:
+            st.info("No queries recorded yet")
+    
+    elif section == "Slow Queries":
+        st.subheader("Slow Query Advisor")
+        slow_advisor = get_advisor()
+        st.caption(f"Reads slower than {slow_advisor.threshold_ms:.0f} ms are EXPLAINed in the background "
+                   f"and stored in {slow_advisor.store.path} (deploy {slow_advisor.deploy})")
+        deploys = [row["deploy"] for row in slow_advisor.store.deploys()]
+        if slow_advisor.deploy not in deploys:
+            deploys.insert(0, slow_advisor.deploy)
+        
+        deploy = st.selectbox("Deploy", deploys, key="slow_query_deploy")
+        records = slow_advisor.store.records(deploy)
+        if records:
+            df = pd.DataFrame(records)
+            df["full_scans"] = df["full_scans"].apply(
+                lambda scans: ", ".join(f"{scan['table']} ({scan['rows']:,} rows)" for scan in json.loads(scans)))
+            df["filesort"] = df["filesort"].astype(bool)
+            df["temporary"] = df["temporary"].astype(bool)
+            st.dataframe(df[["fingerprint", "statement", "occurrences", "worst_ms", "last_ms", "full_scans",
+                             "filesort", "temporary", "suggested_index", "last_seen"]].round(1),
+                         use_container_width=True, hide_index=True)
+            
+            suggestions = df["suggested_index"].dropna().unique()
+            if len(suggestions):
+                st.markdown("**Suggested indexes**")
+                st.code("\n".join(suggestions), language="sql")
+            
+            selected = st.selectbox("Plan", df["fingerprint"], key="slow_query_plan",
+                                    format_func=lambda key: f"{key} · {df.set_index('fingerprint').at[key, 'statement'][:80]}")
+            st.json(json.loads(df.set_index("fingerprint").at[selected, "plan_json"]), expanded=False)
+        else:
+            st.info("No slow queries captured for this deploy")
+        
+        if len(deploys) > 1:
+            st.markdown("---")
+            st.subheader("Compare Deploys")
+            col1, col2 = st.columns(2)
+            with col1:
+                old_deploy = st.selectbox("Baseline", deploys, index=1, key="slow_query_old")
+            with col2:
+                new_deploy = st.selectbox("Compare to", deploys, index=0, key="slow_query_new")
+            changes = slow_advisor.store.diff(old_deploy, new_deploy)
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Newly slow", len(changes["new"]))
+            col2.metric("Resolved", len(changes["resolved"]))
+            col3.metric("Plan changed", len(changes["changed"]))
+            for title, rows in (("Newly slow", changes["new"]), ("Resolved", changes["resolved"])):
+                if rows:
+                    st.markdown(f"**{title}**")
+                    st.dataframe(pd.DataFrame(rows)[["fingerprint", "statement", "worst_ms", "suggested_index"]],
+                                 use_container_width=True, hide_index=True)
+            if changes["changed"]:
+                st.markdown("**Plan changed** (full scans, filesort, temporary)")
+                st.dataframe(pd.DataFrame(changes["changed"]).astype(str), use_container_width=True, hide_index=True)
+    
+    elif section == "Pages":
+        st.subheader("Page Render Times")
+        page_stats = recorder.summary("page")
+        if page_stats:
+            df = pd.DataFrame(page_stats)
+            fig = go.Figure()
+            for column in ("p50_ms", "p95_ms", "p99_ms"):
+                fig.add_trace(go.Bar(name=column.split("_")[0], x=df["name"], y=df[column]))
+            fig.update_layout(barmode="group", title="Page latency (ms)")
+            st.plotly_chart(fig, use_container_width=True)
+            st.dataframe(df[["name", "calls", "p50_ms", "p95_ms", "p99_ms", "max_ms", "errors"]].round(2),
+                         use_container_width=True, hide_index=True)
+        else:
+            st.info("No pages recorded yet")
+    
+    elif section == "Prometheus":
+        st.subheader("Prometheus Export")
+        text = recorder.prometheus_text()
+        if metrics.METRICS_PORT:
+            st.caption(f"Also served at http://<host>:{metrics.METRICS_PORT}/metrics")
+        else:
+            st.caption("Set METRICS_PORT to serve this at /metrics for scraping")
+        st.download_button("Download metrics.txt", data=text, file_name="metrics.txt", mime="text/plain")
+        st.code(text if len(text) < 20000 else text[:20000] + "\n...", language="text")
+    
+    if st.button("Reset Metrics"):
+        recorder.reset()
+        st.rerun()
 
 # ==================== MAIN APP ====================
 def main():
+    # Per-rerun query memo used by shared_query
+    st.session_state["_rerun_query_cache"] = {}
+    
     # Sidebar navigation
     st.sidebar.title("Repair Service System")
     st.sidebar.markdown("---")
@@ -1668,7 +2334,9 @@ def main():
         "Payments": payment_management,
         "Reviews": review_management,
         "Database Features": database_features,
-        "Advanced Operations": advanced_operations
+        "Advanced Operations": advanced_operations,
+        "Bulk Import": bulk_import_page,
+        "Performance": performance_page
     }
     
     choice = st.sidebar.radio("Navigation", list(menu_options.keys()))
@@ -1685,8 +2353,38 @@ def main():
     - Analytics & Reports
     """)
     
+    with st.sidebar.expander("Connection Pool"):
+        pool_stats = get_connection_pool().stats()
+        st.caption(f"{pool_stats['in_use']} in use / {pool_stats['open']} open (max {pool_stats['size']})")
+        st.dataframe(pd.DataFrame([
+            {"counter": name, "value": pool_stats[name]}
+            for name in ("hits", "misses", "waits", "timeouts", "reconnects", "discarded")
+        ]), hide_index=True, use_container_width=True)
+    
+    router_stats = get_replica_router().stats()
+    if router_stats["replica"]:
+        with st.sidebar.expander("Read Replica"):
+            if router_stats["lag"] is None:
+                st.caption("Replica unreachable or not replicating; reading from the primary")
+            else:
+                st.caption(f"Replica {router_stats['lag']:.0f}s behind (max {db.REPLICA_MAX_LAG_SECONDS:.0f}s)")
+            st.dataframe(pd.DataFrame([
+                {"counter": name, "value": router_stats[name]}
+                for name in ("replica_reads", "primary_reads", "sticky_reads", "fallbacks")
+            ]), hide_index=True, use_container_width=True)
+    
+    with st.sidebar.expander("Query Cache"):
+        cache_stats = get_query_cache().stats()
+        st.caption(f"{cache_stats['entries']} entries, {cache_stats['bytes'] / 1024:.0f} KiB "
+                   f"(max {cache_stats['max_entries']} / {cache_stats['max_bytes'] / 1024 / 1024:.0f} MiB)")
+        st.dataframe(pd.DataFrame([
+            {"counter": name, "value": cache_stats[name]}
+            for name in ("hits", "misses", "evictions", "invalidations")
+        ]), hide_index=True, use_container_width=True)
+    
     # Call selected page function
-    menu_options[choice]()
+    with get_metrics().timed("page", choice):
+        menu_options[choice]()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
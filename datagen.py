@@ -0,0 +1,510 @@
+"""Deterministic synthetic data for load-testing the repair service database
+
+Fills every table to a configurable scale (10k to 10M repair requests) with
+referentially consistent rows and realistic status, payment and rating mixes:
+
+    python manage.py generate-data --requests 1000000 --seed 42 --end-date 2025-06-30
+
+The same seed, sizes and end date always produce the same rows. Ids are
+assigned by the generator, rows are written in batches with multi-row
+INSERTs (or LOAD DATA LOCAL INFILE), and the summary-table triggers are
+switched off for the load; counters and materialized views are rebuilt
+once at the end.
+"""
+import os
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+import db
+
+# Rows generated per step. Fixed, so the output does not depend on --batch-size.
+GENERATION_CHUNK = 100_000
+
+TABLES = [
+    "Review", "Payment", "Service_Assignment", "Repair_Request", "Technician_Specialization",
+    "Technician", "User", "Service_Category", "Location",
+]
+
+# (name, description, base charge, estimated hours, popularity, specialization, items, issues)
+CATEGORIES = [
+    ("Smartphone Screen Repair", "Repair cracked or damaged smartphone screens", 1500, 2, 4.5, "Smartphone Repair",
+     ["iPhone 13", "Samsung Galaxy S21", "OnePlus 11", "Redmi Note 12"], ["Screen cracked after drop", "Touch not responding"]),
+    ("Laptop Hardware Repair", "Fix laptop hardware issues including motherboard, RAM, etc.", 2500, 4, 4.3, "Laptop Repair",
+     ["Dell XPS 15", "HP Pavilion", "Lenovo ThinkPad"], ["Laptop not turning on", "Overheating and shutting down"]),
+    ("Clothing Alteration", "Resize and alter clothing items", 300, 1, 4.2, "Clothing Alteration",
+     ["Blue Jeans", "Formal Trousers", "Cotton Shirt"], ["Need to shorten length", "Waist adjustment needed"]),
+    ("Furniture Restoration", "Restore old furniture to new condition", 3000, 8, 4.0, "Furniture Restoration",
+     ["Wooden Dining Table", "Teak Wardrobe"], ["Surface scratched, needs restoration", "Joints loose"]),
+    ("Mobile Battery Replacement", "Replace worn-out mobile phone batteries", 800, 1, 4.6, "Smartphone Repair",
+     ["Samsung Galaxy S21", "iPhone 12", "Xiaomi Redmi Note 12"], ["Battery draining very fast", "Battery swollen"]),
+    ("Laptop Screen Replacement", "Replace broken laptop screens", 3500, 3, 4.4, "Laptop Repair",
+     ["HP Pavilion", "MacBook Air", "Asus VivoBook"], ["Screen has dead pixels and lines", "Display flickering"]),
+    ("Sofa Upholstery", "Re-upholster sofas and couches", 5000, 12, 3.9, "Sofa Repair",
+     ["3-Seater Sofa", "Recliner"], ["Fabric torn, needs re-upholstery", "Cushions sagging"]),
+    ("Dress Tailoring", "Custom tailoring and stitching of dresses", 1000, 3, 4.1, "Tailoring",
+     ["Silk Dress", "Lehenga"], ["Need custom stitching", "Fitting adjustment"]),
+    ("TV Repair", "Repair LED/LCD TV issues", 2000, 3, 4.0, "TV Repair",
+     ["Samsung QLED TV", "LG OLED TV", "Sony Bravia"], ["No display but audio working", "No power"]),
+    ("Refrigerator Repair", "Fix refrigerator cooling and other issues", 1800, 2, 4.2, "Refrigerator Repair",
+     ["Whirlpool Refrigerator", "LG Double Door Fridge"], ["Not cooling properly", "Water leaking"]),
+    ("Washing Machine Repair", "Repair washing machine faults", 1500, 2, 4.3, "Washing Machine Repair",
+     ["Bosch Front Load", "IFB Top Load"], ["Drum not spinning", "Water not draining"]),
+    ("Chair Repair", "Fix broken chairs and replace parts", 800, 2, 3.8, "Chair Upholstery",
+     ["Office Chair", "Dining Chair"], ["Broken leg", "Hydraulic not working"]),
+    ("Tablet Repair", "Repair tablet screens and hardware", 2000, 3, 4.0, "Tablet Repair",
+     ["iPad Air", "Samsung Galaxy Tab"], ["Screen cracked", "Charging port loose"]),
+    ("Smartwatch Repair", "Fix smartwatch display and battery issues", 1200, 2, 3.7, "Smartwatch Repair",
+     ["Apple Watch", "Galaxy Watch"], ["Battery not holding charge", "Display not turning on"]),
+    ("Gaming Console Repair", "Repair PlayStation, Xbox, and other consoles", 2500, 4, 4.1, "Gaming Console Repair",
+     ["PlayStation 5", "Xbox Series X"], ["Disc not reading", "Overheating"]),
+    ("Curtain Stitching", "Stitch and alter curtains", 500, 2, 3.9, "Tailoring",
+     ["Living Room Curtains", "Blackout Curtains"], ["Need hemming", "Hooks torn"]),
+    ("Wood Furniture Polishing", "Polish and refinish wooden furniture", 2000, 6, 4.0, "Wood Polishing",
+     ["Teak Cabinet", "Rosewood Table"], ["Polish faded", "Water stains on surface"]),
+    ("Headphone Repair", "Fix headphone wiring and audio issues", 500, 1, 3.6, "Headphone Repair",
+     ["Sony WH-1000XM4", "JBL Tune 760"], ["One side not working", "Bluetooth not pairing"]),
+    ("Desktop PC Repair", "Repair desktop computer hardware", 1800, 3, 4.2, "Desktop Repair",
+     ["Custom Gaming PC", "Dell OptiPlex"], ["Not booting", "Random restarts"]),
+    ("Blouse Stitching", "Custom blouse stitching and fitting", 600, 2, 4.3, "Tailoring",
+     ["Silk Saree Blouse", "Cotton Blouse"], ["Need custom stitching", "Fitting adjustment"]),
+]
+
+AREAS = [
+    ("Koramangala", "560034"), ("Indiranagar", "560038"), ("Whitefield", "560066"), ("Jayanagar", "560041"),
+    ("HSR Layout", "560102"), ("Marathahalli", "560037"), ("Electronic City", "560100"), ("BTM Layout", "560076"),
+    ("Malleshwaram", "560003"), ("Rajajinagar", "560010"), ("JP Nagar", "560078"), ("Banashankari", "560070"),
+    ("Yelahanka", "560064"), ("Hebbal", "560024"), ("MG Road", "560001"), ("Brigade Road", "560025"),
+    ("Basavanagudi", "560004"), ("RT Nagar", "560032"), ("Bellandur", "560103"), ("Sarjapur Road", "560035"),
+]
+CITIES = [("Bangalore", "Karnataka"), ("Mysore", "Karnataka"), ("Chennai", "Tamil Nadu"),
+          ("Hyderabad", "Telangana"), ("Pune", "Maharashtra")]
+
+FIRST_NAMES = ["Rahul", "Priya", "Amit", "Sneha", "Vikram", "Anjali", "Rajesh", "Kavya", "Suresh", "Meera",
+               "Arjun", "Divya", "Karthik", "Pooja", "Naveen", "Lakshmi", "Rohan", "Nisha", "Sanjay", "Asha"]
+LAST_NAMES = ["Sharma", "Patel", "Kumar", "Reddy", "Singh", "Iyer", "Nair", "Rao", "Gupta", "Joshi",
+              "Menon", "Das", "Pillai", "Verma", "Shetty", "Hegde", "Kulkarni", "Bhat", "Mehta", "Desai"]
+
+REQUEST_STATUSES = np.array(["pending", "assigned", "in_progress", "completed", "cancelled"], dtype=object)
+# Requests older than two weeks are mostly settled; recent ones are still moving through the pipeline
+SETTLED_STATUS_P = [0.04, 0.02, 0.04, 0.78, 0.12]
+RECENT_STATUS_P = [0.35, 0.25, 0.20, 0.12, 0.08]
+PRIORITIES = np.array(["low", "medium", "high", "urgent"], dtype=object)
+PRIORITY_P = [0.30, 0.40, 0.20, 0.10]
+PAYMENT_METHODS = np.array(["upi", "card", "cash", "wallet"], dtype=object)
+PAYMENT_METHOD_P = [0.45, 0.30, 0.15, 0.10]
+PAYMENT_STATUSES = np.array(["completed", "pending", "failed", "refunded"], dtype=object)
+PAYMENT_STATUS_P = [0.92, 0.04, 0.02, 0.02]
+RATING_P = [0.05, 0.07, 0.13, 0.30, 0.45]  # 1..5 stars
+REVIEW_TEXTS = {
+    1: "Very disappointed with the service.",
+    2: "Issue not fully resolved.",
+    3: "Service was okay but took longer than expected.",
+    4: "Good service, technician was professional.",
+    5: "Excellent work! Highly recommended.",
+}
+AVAILABILITY = np.array(["available", "busy", "offline"], dtype=object)
+AVAILABILITY_P = [0.6, 0.3, 0.1]
+
+
+def plan_sizes(requests, customers=None, technicians=None, locations=None):
+    """Row counts for each generated entity, derived from the number of requests"""
+    return {
+        "requests": requests,
+        "customers": customers or max(100, requests // 8),
+        "technicians": technicians or max(20, requests // 400),
+        "locations": locations or max(len(AREAS), min(500, requests // 20_000)),
+        "categories": len(CATEGORIES),
+    }
+
+
+def _rng(seed, *stream):
+    """Independent, reproducible random stream for one table/chunk"""
+    return np.random.default_rng([seed, *stream])
+
+
+def _chunks(total, size=GENERATION_CHUNK):
+    for start in range(0, total, size):
+        yield start, min(total, start + size)
+
+
+def _datetimes(values):
+    """numpy datetime64[s] array -> 'YYYY-MM-DD HH:MM:SS' strings"""
+    return [text.replace("T", " ") for text in np.datetime_as_string(values, unit="s").tolist()]
+
+
+def _dates(values):
+    return np.datetime_as_string(values.astype("datetime64[D]"), unit="D").tolist()
+
+
+def _nullable(mask, values):
+    return [value if keep else None for keep, value in zip(mask.tolist(), values)]
+
+
+# ==================== WRITERS ====================
+class BatchWriter:
+    """Writes generated rows with multi-row INSERTs, committing every batch"""
+
+    def __init__(self, conn, batch_size):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.batch_size = batch_size
+
+    def write(self, table, columns, rows):
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+        for start in range(0, len(rows), self.batch_size):
+            # executemany folds an INSERT ... VALUES into a single multi-row statement
+            self.cursor.executemany(sql, rows[start:start + self.batch_size])
+            self.conn.commit()
+
+
+class LoadDataWriter(BatchWriter):
+    """Writes generated rows through tab-separated files and LOAD DATA LOCAL INFILE"""
+
+    def write(self, table, columns, rows):
+        for start in range(0, len(rows), self.batch_size):
+            with tempfile.NamedTemporaryFile("w", suffix=".tsv", delete=False, encoding="utf-8") as f:
+                for row in rows[start:start + self.batch_size]:
+                    f.write("\t".join("\\N" if value is None else str(value) for value in row) + "\n")
+                path = f.name
+            try:
+                self.cursor.execute(
+                    f"LOAD DATA LOCAL INFILE %s INTO TABLE {table} "
+                    f"FIELDS TERMINATED BY '\\t' LINES TERMINATED BY '\\n' ({', '.join(columns)})",
+                    (path,),
+                )
+                self.conn.commit()
+            finally:
+                os.remove(path)
+
+
+# ==================== GENERATORS ====================
+def location_details(location_id):
+    """(area, pincode, city, state) of a generated location"""
+    i = location_id - 1
+    if i < len(AREAS):
+        return AREAS[i] + CITIES[0]
+    city, state = CITIES[i % len(CITIES)]
+    return f"{city} Sector {i}", str(500000 + i), city, state
+
+
+def generate_locations(sizes, seed):
+    rng = _rng(seed, 1)
+    charges = rng.choice([50, 60, 75, 80, 100], size=sizes["locations"])
+    return [
+        (location_id, *location_details(location_id), 1, int(charge))
+        for location_id, charge in zip(range(1, sizes["locations"] + 1), charges.tolist())
+    ]
+
+
+def generate_categories():
+    return [
+        (i + 1, name, description, base, hours, popularity)
+        for i, (name, description, base, hours, popularity, *_) in enumerate(CATEGORIES)
+    ]
+
+
+def generate_category_specializations():
+    """Each category served by its own name and by the specialization its technicians are given"""
+    return sorted({
+        (i + 1, skill)
+        for i, (name, _, _, _, _, specialization, *_) in enumerate(CATEGORIES)
+        for skill in (name, specialization)
+    })
+
+
+def generate_users(sizes, seed, start_date, end_date, location_p, start, stop, chunk_index):
+    """User rows for ids start+1..stop; customers first, then technicians"""
+    rng = _rng(seed, 2, chunk_index)
+    n = stop - start
+    user_ids = np.arange(start + 1, stop + 1)
+    first = rng.integers(len(FIRST_NAMES), size=n)
+    last = rng.integers(len(LAST_NAMES), size=n)
+    location_ids = rng.choice(len(location_p), size=n, p=location_p) + 1
+    span_days = (end_date - start_date).days + 365
+    registered = np.datetime64(end_date) - rng.integers(0, span_days, size=n).astype("timedelta64[D]")
+    rows = []
+    for user_id, f, l, location_id, registration in zip(user_ids.tolist(), first.tolist(), last.tolist(),
+                                                       location_ids.tolist(), _dates(registered)):
+        first_name, last_name = FIRST_NAMES[f], LAST_NAMES[l]
+        user_type = "customer" if user_id <= sizes["customers"] else "technician"
+        area, pincode, city, state = location_details(location_id)
+        rows.append((
+            user_id, first_name, last_name,
+            f"{first_name.lower()}.{last_name.lower()}.{user_id}@example.com",
+            str(9000000000 + user_id % 1000000000),
+            f"{user_id % 200 + 1} {area} Main Road", city, state, pincode,
+            registration, user_type, location_id,
+        ))
+    return rows
+
+
+def generate_technicians(sizes, seed, start_date, category_p):
+    """Technician rows, their specializations, and each technician's primary category"""
+    rng = _rng(seed, 3)
+    n = sizes["technicians"]
+    technician_ids = np.arange(1, n + 1)
+    primary = rng.choice(len(CATEGORIES), size=n, p=category_p)
+    experience = np.minimum(rng.gamma(2.0, 3.0, size=n).astype(int), 30)
+    availability = rng.choice(AVAILABILITY, size=n, p=AVAILABILITY_P)
+    created = np.datetime64(start_date) - rng.integers(0, 730, size=n).astype("timedelta64[D]")
+    technicians, specializations = [], []
+    for technician_id, category, years, status, created_date in zip(
+            technician_ids.tolist(), primary.tolist(), experience.tolist(), availability.tolist(), _dates(created)):
+        technicians.append((technician_id, sizes["customers"] + technician_id, years,
+                            f"{CATEGORIES[category][5]} Specialist", status, created_date))
+        skills = {CATEGORIES[category][5]}
+        for extra in rng.choice(len(CATEGORIES), size=int(rng.integers(0, 3)), p=category_p).tolist():
+            skills.add(CATEGORIES[extra][5])
+        specializations.extend((technician_id, skill) for skill in sorted(skills))
+    specialization_rows = [(i + 1, technician_id, skill) for i, (technician_id, skill) in enumerate(specializations)]
+    return technicians, specialization_rows, primary
+
+
+def generate_request_chunk(sizes, seed, start_date, end_date, customer_p, category_p, technicians_by_category,
+                           start, stop, chunk_index, next_ids):
+    """Requests start+1..stop with their assignments, payments and reviews"""
+    rng = _rng(seed, 4, chunk_index)
+    n = stop - start
+    request_ids = np.arange(start + 1, stop + 1)
+
+    # Request dates grow with the id, like a live system's insert order
+    span = int((datetime.combine(end_date, datetime.min.time()) - datetime.combine(start_date, datetime.min.time())).total_seconds())
+    offsets = ((request_ids - 1 + rng.random(n)) / sizes["requests"] * span).astype(np.int64)
+    requested = np.datetime64(start_date, "s") + offsets.astype("timedelta64[s]")
+    age_days = (np.datetime64(end_date, "s") - requested).astype("timedelta64[D]").astype(int)
+
+    customers = rng.choice(sizes["customers"], size=n, p=customer_p) + 1
+    categories = rng.choice(len(CATEGORIES), size=n, p=category_p)
+    priorities = rng.choice(PRIORITIES, size=n, p=PRIORITY_P)
+    status = np.where(age_days > 14,
+                      rng.choice(REQUEST_STATUSES, size=n, p=SETTLED_STATUS_P),
+                      rng.choice(REQUEST_STATUSES, size=n, p=RECENT_STATUS_P))
+    preferred = requested + (rng.integers(1, 8, size=n) * 86400).astype("timedelta64[s]")
+    item_pick = rng.integers(0, 1000, size=n)
+    issue_pick = rng.integers(0, 1000, size=n)
+
+    requests = [
+        (request_id, customer, category + 1, CATEGORIES[category][6][item % len(CATEGORIES[category][6])],
+         CATEGORIES[category][7][issue % len(CATEGORIES[category][7])], priority, requested_at, preferred_on, state)
+        for request_id, customer, category, item, issue, priority, requested_at, preferred_on, state in zip(
+            request_ids.tolist(), customers.tolist(), categories.tolist(), item_pick.tolist(), issue_pick.tolist(),
+            priorities.tolist(), _datetimes(requested), _dates(preferred), status.tolist())
+    ]
+
+    # Assignments: every request past 'pending', except half of the cancelled ones
+    assigned = np.isin(status, ["assigned", "in_progress", "completed"]) | ((status == "cancelled") & (rng.random(n) < 0.5))
+    idx = np.flatnonzero(assigned)
+    m = len(idx)
+    assignment_ids = np.arange(next_ids["assignment"], next_ids["assignment"] + m)
+    next_ids["assignment"] += m
+    assigned_categories = categories[idx]
+
+    # 80% go to a technician whose primary category matches, the rest to anyone
+    technicians = rng.integers(1, sizes["technicians"] + 1, size=m)
+    matched = rng.random(m) < 0.8
+    for category, pool in technicians_by_category.items():
+        pick = matched & (assigned_categories == category)
+        if len(pool) and pick.any():
+            technicians[pick] = pool[rng.integers(0, len(pool), size=int(pick.sum()))]
+
+    assignment_status = status[idx]
+    assigned_at = requested[idx] + np.minimum(rng.exponential(6 * 3600, size=m), 72 * 3600).astype("timedelta64[s]")
+    hours = np.array([CATEGORIES[c][3] for c in assigned_categories.tolist()], dtype=np.int64)
+    estimated = assigned_at + ((hours // 8 + 1) * 86400).astype("timedelta64[s]")
+    completed = assignment_status == "completed"
+    completed_at = assigned_at + (np.minimum(rng.gamma(1.5, 1.5, size=m), 14) * 86400).astype("timedelta64[s]")
+    base = np.array([CATEGORIES[c][2] for c in assigned_categories.tolist()], dtype=float)
+    cost = np.maximum(np.round(base * rng.lognormal(0.0, 0.25, size=m) / 10) * 10, 100)
+
+    assignments = [
+        (assignment_id, request_id, technician, assigned_on, estimated_on, completed_on, state, cost_value)
+        for assignment_id, request_id, technician, assigned_on, estimated_on, completed_on, state, cost_value in zip(
+            assignment_ids.tolist(), request_ids[idx].tolist(), technicians.tolist(), _datetimes(assigned_at),
+            _dates(estimated), _nullable(completed, _dates(completed_at)), assignment_status.tolist(),
+            [f"{value:.2f}" for value in cost.tolist()])
+    ]
+
+    # Payments: nearly every completed job, a quarter of jobs in progress (amount always equals service_cost)
+    paid = (completed & (rng.random(m) < 0.96)) | ((assignment_status == "in_progress") & (rng.random(m) < 0.25))
+    pidx = np.flatnonzero(paid)
+    p = len(pidx)
+    payment_ids = np.arange(next_ids["payment"], next_ids["payment"] + p)
+    next_ids["payment"] += p
+    payment_status = np.where(completed[pidx], rng.choice(PAYMENT_STATUSES, size=p, p=PAYMENT_STATUS_P), "pending")
+    methods = rng.choice(PAYMENT_METHODS, size=p, p=PAYMENT_METHOD_P)
+    paid_from = np.where(completed[pidx], completed_at[pidx], assigned_at[pidx])
+    paid_at = paid_from + rng.integers(0, 2 * 86400, size=p).astype("timedelta64[s]")
+    payments = [
+        (payment_id, assignment_id, f"{amount:.2f}", method, paid_on, state, f"{method.upper()}{payment_id:010d}")
+        for payment_id, assignment_id, amount, method, paid_on, state in zip(
+            payment_ids.tolist(), assignment_ids[pidx].tolist(), cost[pidx].tolist(), methods.tolist(),
+            _datetimes(paid_at), payment_status.tolist())
+    ]
+
+    # Reviews: a little over half of the completed jobs
+    reviewed = completed & (rng.random(m) < 0.55)
+    ridx = np.flatnonzero(reviewed)
+    r = len(ridx)
+    review_ids = np.arange(next_ids["review"], next_ids["review"] + r)
+    next_ids["review"] += r
+    customer_rating = rng.choice(5, size=r, p=RATING_P) + 1
+    technician_rating = np.clip(customer_rating + rng.choice([-1, 0, 0, 0, 1], size=r), 1, 5)
+    reviewed_at = completed_at[ridx] + rng.integers(3600, 5 * 86400, size=r).astype("timedelta64[s]")
+    helpfulness = rng.poisson(6, size=r)
+    reviews = [
+        (review_id, assignment_id, rating, tech_rating, REVIEW_TEXTS[rating], reviewed_on, helpful)
+        for review_id, assignment_id, rating, tech_rating, reviewed_on, helpful in zip(
+            review_ids.tolist(), assignment_ids[ridx].tolist(), customer_rating.tolist(),
+            technician_rating.tolist(), _datetimes(reviewed_at), helpfulness.tolist())
+    ]
+    return requests, assignments, payments, reviews
+
+
+# ==================== LOADER ====================
+def _existing_rows(cursor):
+    counts = {}
+    for table in TABLES:
+        cursor.execute(f"SELECT COUNT(*) FROM {table}")
+        counts[table] = cursor.fetchone()[0]
+    return {table: count for table, count in counts.items() if count}
+
+
+def _table_exists(cursor, name):
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """, (name,))
+    return cursor.fetchone()[0] > 0
+
+
+def _procedure_exists(cursor, name):
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.ROUTINES
+        WHERE ROUTINE_SCHEMA = DATABASE() AND ROUTINE_NAME = %s
+    """, (name,))
+    return cursor.fetchone()[0] > 0
+
+
+def _call(cursor, name):
+    cursor.callproc(name)
+    for result in cursor.stored_results():
+        result.fetchall()
+
+
+def generate(requests, seed=42, end_date=None, years=2, customers=None, technicians=None, locations=None,
+             batch_size=5000, load_data=False, reset=False, log=print):
+    """Fill an empty database (or wipe it first with reset=True) with generated rows"""
+    sizes = plan_sizes(requests, customers, technicians, locations)
+    end_date = end_date or date.today()
+    start_date = end_date - timedelta(days=365 * years)
+    config = dict(db.DB_CONFIG, allow_local_infile=True) if load_data else None
+    conn = db.connect(config)
+    conn.autocommit = False
+    cursor = conn.cursor()
+    writer = (LoadDataWriter if load_data else BatchWriter)(conn, batch_size)
+    started = time.perf_counter()
+
+    def progress(message):
+        log(f"[{time.perf_counter() - started:7.1f}s] {message}")
+
+    existing = _existing_rows(cursor)
+    if existing and not reset:
+        raise RuntimeError(f"Database is not empty ({existing}); pass reset=True / --reset to wipe it first")
+    if reset:
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+        for table in TABLES:
+            cursor.execute(f"TRUNCATE TABLE {table}")
+        # Revenue rollup (migration 009); its rebuild keeps months older than the oldest payment
+        if _table_exists(cursor, "Revenue_Monthly"):
+            cursor.execute("TRUNCATE TABLE Revenue_Monthly")
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+        progress("Emptied existing tables")
+
+    # One partition per generated month (migration 008), set up while the tables are empty
+    if _procedure_exists(cursor, "PartitionByMonth"):
+        for table, column in db.PARTITIONED_TABLES.items():
+            cursor.callproc("PartitionByMonth", (table, column, start_date, end_date + timedelta(days=92)))
+        progress("Partitioned fact tables by month")
+
+    # Summary tables are rebuilt once at the end instead of row by row
+    cursor.execute("SET @disable_summary_triggers = 1")
+    try:
+        base_rng = _rng(seed, 0)
+        location_p = 1 / np.arange(1, sizes["locations"] + 1) ** 0.8
+        location_p = base_rng.permutation(location_p / location_p.sum())
+        category_p = np.array([c[4] for c in CATEGORIES]) ** 4
+        category_p = category_p / category_p.sum()
+        # Heavy-tailed: a few customers file many requests, most file one or two
+        customer_p = base_rng.lognormal(0.0, 1.0, size=sizes["customers"])
+        customer_p = customer_p / customer_p.sum()
+
+        writer.write("Location", ["location_id", "area_name", "pincode", "city", "state",
+                                  "service_availability", "delivery_charge"], generate_locations(sizes, seed))
+        writer.write("Service_Category", ["category_id", "category_name", "category_description",
+                                          "base_service_charge", "estimated_time_hours", "popularity_score"],
+                     generate_categories())
+        # Dispatch mapping (migration 007); TRUNCATE of Service_Category does not cascade to it
+        if _table_exists(cursor, "Category_Specialization"):
+            cursor.execute("DELETE FROM Category_Specialization")
+            writer.write("Category_Specialization", ["category_id", "specialization"],
+                         generate_category_specializations())
+        progress(f"{sizes['locations']:,} locations, {sizes['categories']} categories")
+
+        total_users = sizes["customers"] + sizes["technicians"]
+        for chunk_index, (start, stop) in enumerate(_chunks(total_users)):
+            writer.write("User", ["user_id", "first_name", "last_name", "email", "phone_number", "street", "city",
+                                  "state", "pincode", "registration_date", "user_type", "location_id"],
+                         generate_users(sizes, seed, start_date, end_date, location_p, start, stop, chunk_index))
+        progress(f"{total_users:,} users")
+
+        technician_rows, specialization_rows, primary = generate_technicians(sizes, seed, start_date, category_p)
+        writer.write("Technician", ["technician_id", "user_id", "experience_years", "certification_details",
+                                    "availability_status", "created_date"], technician_rows)
+        writer.write("Technician_Specialization", ["tech_spec_id", "technician_id", "specialization"],
+                     specialization_rows)
+        technicians_by_category = {c: np.flatnonzero(primary == c) + 1 for c in range(len(CATEGORIES))}
+        progress(f"{sizes['technicians']:,} technicians, {len(specialization_rows):,} specializations")
+
+        next_ids = {"assignment": 1, "payment": 1, "review": 1}
+        for chunk_index, (start, stop) in enumerate(_chunks(sizes["requests"])):
+            request_rows, assignment_rows, payment_rows, review_rows = generate_request_chunk(
+                sizes, seed, start_date, end_date, customer_p, category_p, technicians_by_category,
+                start, stop, chunk_index, next_ids)
+            writer.write("Repair_Request", ["request_id", "customer_id", "category_id", "item_description",
+                                            "issue_description", "priority_level", "request_date",
+                                            "preferred_date", "status"], request_rows)
+            writer.write("Service_Assignment", ["assignment_id", "request_id", "technician_id", "assignment_date",
+                                                "estimated_completion_date", "actual_completion_date",
+                                                "assignment_status", "service_cost"], assignment_rows)
+            # after_assignment_insert marks every assigned request 'assigned'; put the real status back
+            cursor.execute("""
+                UPDATE Repair_Request rr
+                JOIN Service_Assignment sa ON rr.request_id = sa.request_id
+                SET rr.status = sa.assignment_status
+                WHERE rr.request_id BETWEEN %s AND %s AND sa.assignment_status <> 'assigned'
+            """, (start + 1, stop))
+            conn.commit()
+            writer.write("Payment", ["payment_id", "assignment_id", "payment_amount", "payment_method",
+                                     "payment_date", "payment_status", "transaction_reference"], payment_rows)
+            writer.write("Review", ["review_id", "assignment_id", "customer_rating", "technician_rating",
+                                    "review_text", "review_date", "helpfulness_score"], review_rows)
+            progress(f"{stop:,} / {sizes['requests']:,} requests")
+    finally:
+        cursor.execute("SET @disable_summary_triggers = 0")
+
+    for procedure in ("ReconcileCounters", "RefreshMaterializedViews", "RebuildRevenueMonthly"):
+        if _procedure_exists(cursor, procedure):
+            _call(cursor, procedure)
+            conn.commit()
+            progress(f"Ran {procedure}")
+    for table in TABLES:
+        cursor.execute(f"ANALYZE TABLE {table}")
+        cursor.fetchall()
+    progress("Analyzed tables")
+
+    cursor.close()
+    conn.close()
+    return sizes
@@ -0,0 +1,618 @@
+"""Database access layer shared by the Streamlit app and maintenance scripts"""
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+
+import mysql.connector
+from mysql.connector import errors
+
+# Connection settings (override with environment variables)
+DB_CONFIG = {
+    "host": os.environ.get("DB_HOST", "localhost"),
+    "port": int(os.environ.get("DB_PORT", "3306")),
+    "user": os.environ.get("DB_USER", "root"),  # Change this to your MySQL username
+    "password": os.environ.get("DB_PASSWORD", "Mysql@2025"),  # Change this to your MySQL password
+    "database": os.environ.get("DB_NAME", "repair_service_db"),
+}
+
+# Optional read replica (same credentials and schema as the primary); unset sends every read to the primary
+REPLICA_CONFIG = dict(
+    DB_CONFIG,
+    host=os.environ["DB_REPLICA_HOST"],
+    port=int(os.environ.get("DB_REPLICA_PORT", "3306")),
+) if os.environ.get("DB_REPLICA_HOST") else None
+# Reads go back to the primary while the replica is further behind than this
+REPLICA_MAX_LAG_SECONDS = float(os.environ.get("REPLICA_MAX_LAG_SECONDS", "5"))
+# Seconds between two measurements of the replica's lag
+REPLICA_LAG_CHECK_SECONDS = float(os.environ.get("REPLICA_LAG_CHECK_SECONDS", "2"))
+# A session reads from the primary for this long after it wrote something
+READ_YOUR_WRITES_SECONDS = float(os.environ.get("READ_YOUR_WRITES_SECONDS", "5"))
+
+# Maximum number of open connections held by one pool
+POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "8"))
+# Seconds to wait for a free connection before giving up
+POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "10"))
+# Connections idle for longer than this are pinged before being handed out
+POOL_HEALTH_CHECK_SECONDS = float(os.environ.get("DB_POOL_HEALTH_CHECK_SECONDS", "30"))
+
+# Reads of one page that run at the same time (each holds a pooled connection while it runs)
+QUERY_EXECUTOR_WORKERS = int(os.environ.get("QUERY_EXECUTOR_WORKERS", "4"))
+
+# Fact tables partitioned by month on these columns (migration 008)
+PARTITIONED_TABLES = {
+    "Repair_Request": "request_date",
+    "Service_Assignment": "assignment_date",
+    "Payment": "payment_date",
+}
+
+# Query result cache limits
+QUERY_CACHE_TTL_SECONDS = float(os.environ.get("QUERY_CACHE_TTL_SECONDS", "300"))
+QUERY_CACHE_MAX_ENTRIES = int(os.environ.get("QUERY_CACHE_MAX_ENTRIES", "512"))
+QUERY_CACHE_MAX_BYTES = int(float(os.environ.get("QUERY_CACHE_MAX_MB", "64")) * 1024 * 1024)
+
+
+def connect(config=None):
+    """Open a new autocommit connection"""
+    return mysql.connector.connect(**(config or DB_CONFIG), autocommit=True)
+
+
+class ConnectionPool:
+    """Thread-safe pool of reusable autocommit connections"""
+
+    def __init__(self, config=None, size=POOL_SIZE, timeout=POOL_TIMEOUT,
+                 health_check_seconds=POOL_HEALTH_CHECK_SECONDS):
+        self.config = dict(config or DB_CONFIG)
+        self.size = size
+        self.timeout = timeout
+        self.health_check_seconds = health_check_seconds
+        # LIFO keeps the most recently used (warmest) connections in play
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._open = 0
+        self._stats = {
+            "hits": 0,        # served from an idle connection
+            "misses": 0,      # had to open a new connection
+            "waits": 0,       # pool was full, caller blocked for a release
+            "timeouts": 0,    # gave up waiting
+            "reconnects": 0,  # stale handle revived by the health check
+            "discarded": 0,   # broken connection dropped from the pool
+        }
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _reserve_slot(self):
+        with self._lock:
+            if self._open >= self.size:
+                return False
+            self._open += 1
+            self._stats["misses"] += 1
+            return True
+
+    def _free_slot(self):
+        with self._lock:
+            self._open -= 1
+
+    def acquire(self):
+        """Check out a healthy connection, opening or waiting for one as needed"""
+        try:
+            conn, last_used = self._idle.get_nowait()
+            self._count("hits")
+        except queue.Empty:
+            if self._reserve_slot():
+                try:
+                    return connect(self.config)
+                except mysql.connector.Error:
+                    self._free_slot()
+                    raise
+            self._count("waits")
+            try:
+                conn, last_used = self._idle.get(timeout=self.timeout)
+            except queue.Empty:
+                self._count("timeouts")
+                raise errors.PoolError(
+                    f"No free database connection after {self.timeout:.0f}s (pool size {self.size})"
+                )
+        return self._ensure_healthy(conn, last_used)
+
+    def _ensure_healthy(self, conn, last_used):
+        if time.monotonic() - last_used < self.health_check_seconds:
+            return conn
+        try:
+            conn.ping(reconnect=False)
+        except mysql.connector.Error:
+            self._count("reconnects")
+            try:
+                conn.reconnect(attempts=2, delay=1)
+            except mysql.connector.Error:
+                self._discard(conn)
+                raise
+        return conn
+
+    def _discard(self, conn):
+        self._count("discarded")
+        self._free_slot()
+        try:
+            conn.close()
+        except mysql.connector.Error:
+            pass
+
+    def release(self, conn, broken=False):
+        """Return a connection to the pool, dropping it if it is no longer usable"""
+        if not broken:
+            try:
+                conn.consume_results()
+                if conn.in_transaction:
+                    conn.rollback()
+            except mysql.connector.Error:
+                broken = True
+        if broken:
+            self._discard(conn)
+        else:
+            self._idle.put((conn, time.monotonic()))
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of a with-block"""
+        conn = self.acquire()
+        broken = False
+        try:
+            yield conn
+        except (errors.OperationalError, errors.InterfaceError):
+            broken = True
+            raise
+        finally:
+            self.release(conn, broken=broken)
+
+    def stats(self):
+        """Snapshot of the pool counters and current occupancy"""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["open"] = self._open
+        snapshot["idle"] = self._idle.qsize()
+        snapshot["in_use"] = snapshot["open"] - snapshot["idle"]
+        snapshot["size"] = self.size
+        return snapshot
+
+    def close_all(self):
+        """Close every idle connection"""
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+
+def run_query(pool, query, params=None, fetch=True):
+    """Execute a query on a pooled connection and return its rows (or True for writes)"""
+    with pool.connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute(query, params or ())
+            if fetch:
+                return cursor.fetchall()
+            conn.commit()
+            return True
+        finally:
+            cursor.close()
+
+
+def run_procedure(pool, name, args=()):
+    """Call a stored procedure and return each of its result sets as a list of dicts"""
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.callproc(name, list(args))
+            result_sets = [
+                [dict(zip(result.column_names, row)) for row in result.fetchall()]
+                for result in cursor.stored_results()
+            ]
+            conn.commit()
+            return result_sets
+        finally:
+            cursor.close()
+
+
+@contextmanager
+def stream_query(pool, query, params=None, batch_rows=5000):
+    """Run a read on an unbuffered cursor, yielding (cursor.description, iterator of row batches).
+    
+    Rows stay on the server until fetched, so a large result is never held
+    in memory as a whole. Rows left unread when the block ends are drained
+    before the connection goes back to the pool.
+    """
+    with pool.connection() as conn:
+        cursor = conn.cursor(buffered=False)
+        try:
+            cursor.execute(query, params or ())
+
+            def batches():
+                while True:
+                    rows = cursor.fetchmany(batch_rows)
+                    if not rows:
+                        return
+                    yield rows
+
+            yield cursor.description, batches()
+        finally:
+            if conn.unread_result:
+                conn.consume_results()
+            cursor.close()
+
+
+@contextmanager
+def transaction(pool):
+    """Run a with-block as one transaction on one pooled connection, yielding a dict cursor.
+    
+    Commits when the block finishes; if it raises, the connection is rolled
+    back as it goes back to the pool.
+    """
+    with pool.connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        try:
+            conn.start_transaction()
+            yield cursor
+            conn.commit()
+        finally:
+            cursor.close()
+
+
+class QueryExecutor:
+    """Thread pool that runs independent reads at the same time, each on its own pooled connection"""
+
+    def __init__(self, workers=QUERY_EXECUTOR_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="query")
+
+    def run_all(self, calls):
+        """Call every zero-argument function concurrently and return their results in order.
+    
+        A call that raised returns its exception instead of a result, so the
+        caller can report each failure on its own thread.
+        """
+        futures = [self._executor.submit(call) for call in calls]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as err:
+                results.append(err)
+        return results
+
+
+# ==================== READ REPLICA ====================
+class ReplicaRouter:
+    """Sends reads to a replica pool while it is caught up, and to the primary otherwise.
+    
+    Has the same connection() as ConnectionPool, so run_query, run_procedure
+    and stream_query can read through it. Writes must use the primary pool.
+    The replica's lag is measured with SHOW REPLICA STATUS at most every
+    `check_interval` seconds; an unreachable replica, one whose replication
+    threads are stopped, or one more than `max_lag` seconds behind is left
+    alone until a later measurement finds it caught up.
+    """
+
+    def __init__(self, primary, replica=None, max_lag=REPLICA_MAX_LAG_SECONDS,
+                 check_interval=REPLICA_LAG_CHECK_SECONDS, sticky_seconds=READ_YOUR_WRITES_SECONDS):
+        self.primary = primary
+        self.replica = replica
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.sticky_seconds = sticky_seconds
+        self._lock = threading.Lock()
+        self._lag = None
+        self._checked_at = None
+        self._stats = {
+            "replica_reads": 0,  # served by the replica
+            "primary_reads": 0,  # served by the primary
+            "sticky_reads": 0,   # sent to the primary because the session wrote recently
+            "fallbacks": 0,      # sent to the primary because the replica lagged or failed
+        }
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _measure_lag(self):
+        """Seconds the replica is behind, or None when it is unreachable or not replicating"""
+        try:
+            with self.replica.connection() as conn:
+                cursor = conn.cursor(dictionary=True)
+                try:
+                    try:
+                        cursor.execute("SHOW REPLICA STATUS")
+                    except errors.ProgrammingError:  # MySQL before 8.0.22
+                        cursor.execute("SHOW SLAVE STATUS")
+                    channels = cursor.fetchall()
+                finally:
+                    cursor.close()
+        except mysql.connector.Error:
+            return None
+        lags = [channel.get("Seconds_Behind_Source", channel.get("Seconds_Behind_Master")) for channel in channels]
+        # No channels: not a replica. NULL: a replication thread is stopped.
+        if not lags or None in lags:
+            return None
+        return float(max(lags))
+
+    def lag(self):
+        """The replica's last measured lag in seconds (None: unusable), re-measured when due"""
+        with self._lock:
+            due = self._checked_at is None or time.monotonic() - self._checked_at >= self.check_interval
+            if due:
+                # Claimed before measuring, so concurrent readers don't all measure at once
+                self._checked_at = time.monotonic()
+        if due:
+            lag = self._measure_lag()
+            with self._lock:
+                self._lag = lag
+        return self._lag
+
+    def _mark_down(self):
+        with self._lock:
+            self._lag = None
+            self._checked_at = time.monotonic()
+
+    def replica_usable(self):
+        if self.replica is None:
+            return False
+        lag = self.lag()
+        return lag is not None and lag <= self.max_lag
+
+    def reader(self, last_write=None):
+        """Pool a session should read through, given its last write as a time.monotonic() value.
+    
+        The primary for sticky_seconds after the write, so the session sees
+        its own changes; this router otherwise.
+        """
+        if self.replica is not None and last_write is not None and time.monotonic() - last_write < self.sticky_seconds:
+            self._count("sticky_reads")
+            return self.primary
+        return self
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for a read, from the replica when it is usable"""
+        with ExitStack() as stack:
+            pool = self.primary
+            conn = None
+            if self.replica_usable():
+                try:
+                    conn = stack.enter_context(self.replica.connection())
+                    pool = self.replica
+                except mysql.connector.Error:
+                    self._mark_down()
+            if conn is None:
+                if self.replica is not None:
+                    self._count("fallbacks")
+                conn = stack.enter_context(self.primary.connection())
+            self._count("replica_reads" if pool is self.replica else "primary_reads")
+            try:
+                yield conn
+            except (errors.OperationalError, errors.InterfaceError):
+                if pool is self.replica:
+                    self._mark_down()
+                raise
+
+    def stats(self):
+        """Snapshot of the routing counters and the last measured lag"""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["lag"] = self._lag
+        snapshot["replica"] = self.replica is not None
+        return snapshot
+
+
+# ==================== QUERY RESULT CACHE ====================
+_TABLE_REFERENCE = re.compile(r"\b(?:FROM|JOIN|INTO|UPDATE)\s+`?(\w+)`?", re.IGNORECASE)
+
+DASHBOARD_SUMMARY_TABLES = {"System_Counters", "Request_Status_Counts", "Payment_Status_Totals"}
+MATERIALIZED_VIEW_TABLES = {
+    "MV_Technician_Rating", "MV_Technician_Earnings", "MV_Customer_Service_History",
+    "MV_Popular_Categories", "MV_Pending_Requests_By_Location",
+}
+REVENUE_ROLLUP_TABLES = {"Revenue_Monthly"}
+_SUMMARY_TABLES = DASHBOARD_SUMMARY_TABLES | MATERIALIZED_VIEW_TABLES | REVENUE_ROLLUP_TABLES
+
+# Tables whose rows can change when a statement writes to the key table,
+# through ON DELETE CASCADE or triggers (followed transitively)
+WRITE_SIDE_EFFECTS = {
+    "User": {"Technician", "Repair_Request"} | _SUMMARY_TABLES,
+    "Technician": {"Technician_Specialization"} | _SUMMARY_TABLES,
+    "Repair_Request": {"Service_Assignment"} | _SUMMARY_TABLES,
+    "Service_Assignment": {"Repair_Request", "Payment", "Review"} | _SUMMARY_TABLES,
+    "Payment": _SUMMARY_TABLES,
+    "Review": _SUMMARY_TABLES,
+}
+
+# Tables written by stored procedures (side effects are added on top);
+# procedures missing from this map are assumed to write anything
+PROCEDURE_WRITES = {
+    "AssignTechnicianToRequest": {"Service_Assignment", "Repair_Request", "Technician"},
+    "DispatchAssignments": {"Service_Assignment", "Repair_Request", "Technician"},
+    "CompleteServiceAndPayment": {"Service_Assignment", "Payment", "Technician", "Repair_Request"},
+    "ReconcileCounters": DASHBOARD_SUMMARY_TABLES,
+    "RefreshMaterializedViews": MATERIALIZED_VIEW_TABLES,
+    "RebuildRevenueMonthly": REVENUE_ROLLUP_TABLES,
+    "GetSystemDashboard": set(),
+    "GetTechnicianDashboard": set(),
+}
+
+
+def referenced_tables(query):
+    """Lower-cased names of the tables a statement reads from or writes to"""
+    return {name.lower() for name in _TABLE_REFERENCE.findall(query)}
+
+
+def affected_tables(tables):
+    """The given tables plus everything their writes can cascade or trigger into"""
+    side_effects = {table.lower(): {t.lower() for t in targets} for table, targets in WRITE_SIDE_EFFECTS.items()}
+    affected = set()
+    pending = [table.lower() for table in tables]
+    while pending:
+        table = pending.pop()
+        if table not in affected:
+            affected.add(table)
+            pending.extend(side_effects.get(table, ()))
+    return affected
+
+
+def procedure_tables(name):
+    """Tables a stored procedure may change, or None when that is unknown"""
+    tables = PROCEDURE_WRITES.get(name)
+    return None if tables is None else affected_tables(tables)
+
+
+def _estimate_size(value):
+    """Rough deep size in bytes of a result set (lists/dicts of scalars)"""
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_estimate_size(k) + _estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_estimate_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class QueryCache:
+    """Thread-safe LRU + TTL cache of query results, invalidated by table name.
+    
+    Only writes made through this process invalidate entries; changes made
+    elsewhere (other app servers, the mysql shell) show up once the TTL lapses.
+    """
+
+    def __init__(self, ttl=QUERY_CACHE_TTL_SECONDS, max_entries=QUERY_CACHE_MAX_ENTRIES,
+                 max_bytes=QUERY_CACHE_MAX_BYTES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (rows, tables, expires_at, size)
+        self._generations = defaultdict(int)  # table -> number of invalidations
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def _remove(self, key):
+        _, _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] > time.monotonic():
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return True, entry[0]
+            if entry is not None:
+                self._remove(key)
+            self._stats["misses"] += 1
+            return False, None
+
+    def _store(self, key, rows, tables, generation):
+        size = _estimate_size(rows)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            # A write invalidated one of the tables while we were reading: drop the result
+            if generation != tuple(self._generations[table] for table in tables):
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (rows, tables, time.monotonic() + self.ttl, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def get_or_load(self, query, params, loader):
+        """Return cached rows for (query, params), calling loader() on a miss"""
+        key = (query, tuple(params or ()))
+        found, rows = self._lookup(key)
+        if found:
+            return rows
+        tables = tuple(sorted(referenced_tables(query)))
+        with self._lock:
+            generation = tuple(self._generations[table] for table in tables)
+        rows = loader()
+        if rows is not None:
+            self._store(key, rows, tables, generation)
+        return rows
+
+    def invalidate(self, tables):
+        """Drop every entry that read from any of the given tables"""
+        tables = {table.lower() for table in tables}
+        with self._lock:
+            for table in tables:
+                self._generations[table] += 1
+            stale = [key for key, entry in self._entries.items() if tables.intersection(entry[1])]
+            for key in stale:
+                self._remove(key)
+            self._stats["invalidations"] += len(stale)
+
+    def clear(self):
+        with self._lock:
+            for table in list(self._generations):
+                self._generations[table] += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Snapshot of the cache counters and current occupancy"""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["entries"] = len(self._entries)
+            snapshot["bytes"] = self._bytes
+        snapshot["max_entries"] = self.max_entries
+        snapshot["max_bytes"] = self.max_bytes
+        return snapshot
+
+
+# ==================== SEARCH PICKERS ====================
+def search_condition(term, search_columns, id_column, fulltext=None):
+    """WHERE condition and params matching the search text against a picker's columns.
+    
+    A single word is matched as a prefix of each of `search_columns`, or
+    against `id_column` when it is a number. Pass only columns with an index
+    (the User name and email indexes of migration 005): MySQL merges their
+    ranges, but one unindexed column makes the whole OR a scan. Several
+    words go through the FULLTEXT index on `fulltext` with every word as a
+    required prefix, so "jo smi" finds John Smith.
+    """
+    words = [re.sub(r"\W", "", word) for word in term.split()]
+    words = [word for word in words if word]
+    if fulltext and len(words) > 1:
+        return f"MATCH({fulltext}) AGAINST (%s IN BOOLEAN MODE)", [" ".join(f"+{word}*" for word in words)]
+    
+    prefix = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    matches = [f"{column} LIKE %s" for column in search_columns]
+    params = [prefix] * len(search_columns)
+    if term.lstrip("#").isdigit():
+        matches.append(f"{id_column} = %s")
+        params.append(int(term.lstrip("#")))
+    return "(" + " OR ".join(matches) + ")", params
+
+
+def picker_query(query, search_columns, id_column, order_by, term, limit, offset=0,
+                 filters=None, params=None, fulltext=None):
+    """SQL and params of one page of a type-ahead picker.
+    
+    `query` is a SELECT ... FROM ... JOIN without WHERE/ORDER BY and
+    `filters` are its eligibility conditions; an empty `term` lists every
+    eligible row.
+    """
+    conditions = list(filters or [])
+    params = list(params or [])
+    if term:
+        condition, search_params = search_condition(term, search_columns, id_column, fulltext)
+        conditions.append(condition)
+        params.extend(search_params)
+    
+    if conditions:
+        query += "\nWHERE " + " AND ".join(conditions)
+    query += f"\nORDER BY {order_by}\nLIMIT %s OFFSET %s"
+    params.extend([limit, offset])
+    return query, tuple(params)
@@ -0,0 +1,104 @@
+"""Batch matching of pending repair requests to available technicians
+
+Every technician takes at most one request. Requests are served most
+urgent first; within a priority level, matches are made tier by tier, from
+a specialised technician in the customer's own area down to the weakest
+allowed tier. Inside a tier, requests and technicians that share a match
+key (category and area, say) are paired off by rank with one pandas merge,
+oldest request with most experienced technician. A technician with several
+specializations can win in several keys of the same pass; only their best
+match is kept and the pass is repeated for the rest, which takes a handful
+of rounds rather than a loop over request/technician pairs.
+"""
+import numpy as np
+import pandas as pd
+
+PRIORITY_WEIGHTS = {"urgent": 8, "high": 4, "medium": 2, "low": 1}
+
+# (name, needs a matching specialization, columns the request and technician must share, score factor)
+TIERS = [
+    ("specialised, same area", True, ["location_id"], 1.0),
+    ("specialised, same city", True, ["city"], 0.7),
+    ("unspecialised, same area", False, ["location_id"], 0.3),
+]
+
+# A pass stops early after this many rounds; leftovers fall through to the next tier
+MAX_ROUNDS = 50
+
+
+def technician_categories(skills, category_skills):
+    """(technician_id, category_id) pairs a technician's specializations qualify them for"""
+    pairs = skills.merge(category_skills, on="specialization")[["technician_id", "category_id"]]
+    return pairs.drop_duplicates()
+
+
+def _match_tier(requests, candidates, key):
+    """Pair requests with candidate technicians sharing `key`, by rank; returns (request_id, technician_id)"""
+    matches = []
+    for _ in range(MAX_ROUNDS):
+        if requests.empty or candidates.empty:
+            break
+        ranked_requests = requests.assign(rank=requests.groupby(key, sort=False).cumcount())
+        ranked_candidates = candidates.assign(rank=candidates.groupby(key, sort=False).cumcount())
+        paired = ranked_requests.merge(ranked_candidates, on=key + ["rank"])[["order", "request_id", "technician_id"]]
+        if paired.empty:
+            break
+        # A technician paired in several keys keeps the most urgent/oldest request
+        paired = paired.sort_values("order").drop_duplicates("technician_id")
+        matches.append(paired[["request_id", "technician_id"]])
+        requests = requests[~requests["request_id"].isin(paired["request_id"])]
+        candidates = candidates[~candidates["technician_id"].isin(paired["technician_id"])]
+    if not matches:
+        return pd.DataFrame(columns=["request_id", "technician_id"])
+    return pd.concat(matches, ignore_index=True)
+
+
+def plan_dispatch(requests, technicians, skills, category_skills, tiers=TIERS):
+    """Choose an assignment for as many pending requests as the available technicians allow.
+
+    requests: request_id, category_id, priority_level, request_date, location_id, city, service_cost
+    technicians: technician_id, experience_years, location_id, city
+    skills: technician_id, specialization
+    category_skills: category_id, specialization
+
+    Returns one row per match with request_id, technician_id, priority_level,
+    tier, score and service_cost, in commit order (most urgent first).
+    """
+    columns = ["request_id", "technician_id", "priority_level", "tier", "score", "service_cost"]
+    if requests.empty or technicians.empty:
+        return pd.DataFrame(columns=columns)
+
+    requests = requests.copy()
+    requests["weight"] = requests["priority_level"].map(PRIORITY_WEIGHTS).fillna(1)
+    requests = requests.sort_values(["weight", "request_date", "request_id"], ascending=[False, True, True])
+    requests["order"] = np.arange(len(requests))
+
+    technicians = technicians.sort_values(["experience_years", "technician_id"], ascending=[False, True])
+    qualified = technician_categories(skills, category_skills)
+    specialised = qualified.merge(technicians, on="technician_id")
+    # Keep the experience ordering after the merge
+    specialised = specialised.sort_values(["experience_years", "technician_id"], ascending=[False, True])
+
+    assigned_requests, assigned_technicians, plans = set(), set(), []
+    for weight in sorted(requests["weight"].unique(), reverse=True):
+        level = requests[requests["weight"] == weight]
+        for name, needs_skill, shared, factor in tiers:
+            open_requests = level[~level["request_id"].isin(assigned_requests)]
+            pool = specialised if needs_skill else technicians
+            pool = pool[~pool["technician_id"].isin(assigned_technicians)]
+            key = (["category_id"] if needs_skill else []) + shared
+            matched = _match_tier(open_requests[["order", "request_id"] + key],
+                                  pool[["technician_id"] + key], key)
+            if matched.empty:
+                continue
+            matched["tier"] = name
+            matched["score"] = weight * factor
+            plans.append(matched)
+            assigned_requests.update(matched["request_id"].tolist())
+            assigned_technicians.update(matched["technician_id"].tolist())
+
+    if not plans:
+        return pd.DataFrame(columns=columns)
+    plan = pd.concat(plans, ignore_index=True).merge(
+        requests[["request_id", "priority_level", "service_cost", "order"]], on="request_id")
+    return plan.sort_values("order")[columns].reset_index(drop=True)
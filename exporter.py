@@ -0,0 +1,128 @@
+"""Streaming export of query results to CSV or Parquet files
+
+Rows are read from an unbuffered cursor in batches (db.stream_query) and
+appended to a temporary file as they arrive, so an export never holds the
+whole result, a DataFrame of it and its serialized text at the same time.
+Only the first few rows are kept, for a preview.
+"""
+import csv
+import glob
+import os
+import tempfile
+import time
+
+import pandas as pd
+from mysql.connector import FieldType
+
+import db
+
+# Rows fetched from the server per batch
+EXPORT_BATCH_ROWS = int(os.environ.get("EXPORT_BATCH_ROWS", "5000"))
+# Rows kept in memory for the on-screen preview
+EXPORT_PREVIEW_ROWS = int(os.environ.get("EXPORT_PREVIEW_ROWS", "500"))
+# Export files older than this are deleted by cleanup_exports
+EXPORT_MAX_AGE_SECONDS = 3600
+
+EXPORT_DIR = tempfile.gettempdir()
+_PREFIX = "repair_export_"
+
+FORMATS = {
+    "CSV": {"suffix": ".csv", "mime": "text/csv"},
+    "Parquet": {"suffix": ".parquet", "mime": "application/vnd.apache.parquet"},
+}
+
+_INTEGER_TYPES = {FieldType.TINY, FieldType.SHORT, FieldType.LONG, FieldType.LONGLONG,
+                  FieldType.INT24, FieldType.YEAR}
+_NUMBER_TYPES = {FieldType.DECIMAL, FieldType.NEWDECIMAL, FieldType.FLOAT, FieldType.DOUBLE}
+_DATETIME_TYPES = {FieldType.DATETIME, FieldType.TIMESTAMP}
+
+
+def _arrow_schema(description):
+    """Arrow schema for a cursor description; DECIMAL becomes float64 so every batch shares one schema"""
+    import pyarrow as pa  # in requirements.txt
+
+    fields = []
+    for column in description:
+        name, type_code = column[0], column[1]
+        if type_code in _INTEGER_TYPES:
+            arrow_type = pa.int64()
+        elif type_code in _NUMBER_TYPES:
+            arrow_type = pa.float64()
+        elif type_code == FieldType.DATE:
+            arrow_type = pa.date32()
+        elif type_code in _DATETIME_TYPES:
+            arrow_type = pa.timestamp("us")
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(name, arrow_type))
+    return pa.schema(fields)
+
+
+def _arrow_batch(schema, rows):
+    import pyarrow as pa
+
+    columns = []
+    for i, field in enumerate(schema):
+        values = [row[i] for row in rows]
+        if pa.types.is_floating(field.type):
+            values = [None if value is None else float(value) for value in values]
+        elif pa.types.is_string(field.type):
+            values = [None if value is None else str(value) for value in values]
+        columns.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+def cleanup_exports(max_age=EXPORT_MAX_AGE_SECONDS):
+    """Delete export files older than max_age seconds"""
+    cutoff = time.time() - max_age
+    for path in glob.glob(os.path.join(EXPORT_DIR, _PREFIX + "*")):
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def new_export_path(file_format):
+    """Create an empty temporary export file, after deleting old ones"""
+    cleanup_exports()
+    handle, path = tempfile.mkstemp(prefix=_PREFIX, suffix=FORMATS[file_format]["suffix"], dir=EXPORT_DIR)
+    os.close(handle)
+    return path
+
+
+def export_query(pool, query, params=None, file_format="CSV", batch_rows=EXPORT_BATCH_ROWS,
+                 preview_rows=EXPORT_PREVIEW_ROWS):
+    """Write a query's result to a temporary file.
+
+    Returns a dict with the file `path`, the number of `rows` written and a
+    `preview` DataFrame of the first preview_rows rows. The caller owns the
+    file; cleanup_exports removes forgotten ones.
+    """
+    path = new_export_path(file_format)
+    row_count = 0
+    preview = []
+    try:
+        with db.stream_query(pool, query, params, batch_rows) as (description, batches):
+            columns = [column[0] for column in description]
+            if file_format == "Parquet":
+                import pyarrow.parquet as pq
+
+                schema = _arrow_schema(description)
+                with pq.ParquetWriter(path, schema) as writer:
+                    for rows in batches:
+                        writer.write_batch(_arrow_batch(schema, rows))
+                        row_count += len(rows)
+                        preview.extend(rows[:preview_rows - len(preview)])
+            else:
+                with open(path, "w", newline="", encoding="utf-8") as f:
+                    writer = csv.writer(f)
+                    writer.writerow(columns)
+                    for rows in batches:
+                        writer.writerows(rows)
+                        row_count += len(rows)
+                        preview.extend(rows[:preview_rows - len(preview)])
+    except BaseException:
+        os.remove(path)
+        raise
+    return {"path": path, "rows": row_count, "preview": pd.DataFrame(preview, columns=columns)}
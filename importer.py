@@ -0,0 +1,269 @@
+"""Bulk import of locations, service categories, users and repair requests
+
+An uploaded CSV or Parquet file is read in chunks. Each chunk is validated
+with column-wise pandas checks: required values, types, lengths, enum
+values, foreign keys looked up in one query per chunk, and email
+uniqueness. The valid rows are then written with one multi-row INSERT in
+their own transaction. Rejected rows are collected with their file row
+number and the reasons, and the caller is told about progress after every
+chunk.
+"""
+import os
+from datetime import date, datetime
+
+import mysql.connector
+import pandas as pd
+
+import db
+
+# Rows validated and inserted per transaction
+IMPORT_CHUNK_ROWS = int(os.environ.get("IMPORT_CHUNK_ROWS", "5000"))
+
+REQUEST_STATUSES = ["pending", "assigned", "in_progress", "completed", "cancelled"]
+
+# Column specs: kind, required, and per kind max length / choices / default.
+# Columns missing from the file take their default, or the table's own.
+ENTITIES = {
+    "Locations": {
+        "table": "Location",
+        "columns": {
+            "area_name": {"kind": "str", "required": True, "max_length": 100},
+            "pincode": {"kind": "str", "required": True, "max_length": 10},
+            "city": {"kind": "str", "required": True, "max_length": 50},
+            "state": {"kind": "str", "required": True, "max_length": 50},
+            "service_availability": {"kind": "bool", "default": True},
+            "delivery_charge": {"kind": "decimal", "default": 0, "min": 0},
+        },
+    },
+    "Service Categories": {
+        "table": "Service_Category",
+        "columns": {
+            "category_name": {"kind": "str", "required": True, "max_length": 50},
+            "category_description": {"kind": "str"},
+            "base_service_charge": {"kind": "decimal", "required": True, "min": 0},
+            "estimated_time_hours": {"kind": "int", "required": True, "min": 1},
+            "popularity_score": {"kind": "decimal", "default": 0, "min": 0, "max": 9.99},
+        },
+    },
+    "Users": {
+        "table": "User",
+        "columns": {
+            "first_name": {"kind": "str", "required": True, "max_length": 50},
+            "last_name": {"kind": "str", "required": True, "max_length": 50},
+            "email": {"kind": "email", "required": True, "max_length": 100},
+            "phone_number": {"kind": "str", "required": True, "max_length": 15},
+            "street": {"kind": "str", "max_length": 100},
+            "city": {"kind": "str", "max_length": 50},
+            "state": {"kind": "str", "max_length": 50},
+            "pincode": {"kind": "str", "max_length": 10},
+            "registration_date": {"kind": "date", "default": "today"},
+            "user_type": {"kind": "enum", "required": True, "choices": ["customer", "technician"]},
+            "location_id": {"kind": "int", "required": True, "references": ("Location", "location_id")},
+        },
+    },
+    "Repair Requests": {
+        "table": "Repair_Request",
+        "columns": {
+            "customer_id": {"kind": "int", "required": True, "references": ("User", "user_id", "user_type = 'customer'")},
+            "category_id": {"kind": "int", "required": True, "references": ("Service_Category", "category_id")},
+            "item_description": {"kind": "str", "required": True},
+            "issue_description": {"kind": "str", "required": True},
+            "priority_level": {"kind": "enum", "choices": ["low", "medium", "high", "urgent"], "default": "medium"},
+            "request_date": {"kind": "datetime", "default": "now"},
+            "preferred_date": {"kind": "date"},
+            "status": {"kind": "enum", "choices": REQUEST_STATUSES, "default": "pending"},
+        },
+    },
+}
+
+_TRUE = {"1", "true", "yes", "y", "t"}
+_FALSE = {"0", "false", "no", "n", "f"}
+
+
+class ImportFileError(ValueError):
+    """The file can't be imported at all (unreadable, or missing required columns)"""
+
+
+def read_chunks(file, filename, chunk_rows=IMPORT_CHUNK_ROWS):
+    """Yield (chunk, fraction done) DataFrames of strings from a CSV or Parquet file-like object"""
+    if filename.lower().endswith((".parquet", ".pq")):
+        import pyarrow.parquet as pq  # in requirements.txt
+
+        parquet = pq.ParquetFile(file)
+        total = parquet.metadata.num_rows or 1
+        done = 0
+        for batch in parquet.iter_batches(batch_size=chunk_rows):
+            chunk = batch.to_pandas()
+            done += len(chunk)
+            yield chunk.astype(object).where(chunk.notna(), ""), done / total
+        return
+
+    size = getattr(file, "size", None)
+    try:
+        reader = pd.read_csv(file, chunksize=chunk_rows, dtype=str, keep_default_na=False, skipinitialspace=True)
+    except pd.errors.EmptyDataError as err:
+        raise ImportFileError("the file is empty") from err
+    for chunk in reader:
+        yield chunk, min(file.tell() / size, 1.0) if size else None
+
+
+def check_columns(entity, columns):
+    """Raise ImportFileError when the file's header doesn't fit the entity"""
+    spec = ENTITIES[entity]["columns"]
+    unknown = [column for column in columns if column not in spec]
+    missing = [name for name, column in spec.items() if column.get("required") and name not in columns]
+    problems = []
+    if unknown:
+        problems.append(f"unknown columns: {', '.join(unknown)}")
+    if missing:
+        problems.append(f"missing required columns: {', '.join(missing)}")
+    if problems:
+        raise ImportFileError("; ".join(problems))
+
+
+def _flag(errors, mask, reason):
+    errors[mask] = errors[mask] + reason + "; "
+
+
+def _default(column):
+    default = column.get("default")
+    if default == "today":
+        return date.today()
+    if default == "now":
+        return datetime.now().replace(microsecond=0)
+    return default
+
+
+def _convert(raw, name, column, errors):
+    """Typed column from raw strings; unparseable values are flagged. Returns (values, blank mask)"""
+    kind = column["kind"]
+    text = raw.astype(str).str.strip()
+    blank = text == ""
+    if kind in ("str", "email", "enum"):
+        values = text.str.lower() if kind in ("email", "enum") else text
+        if kind == "enum":
+            _flag(errors, ~blank & ~values.isin(column["choices"]),
+                  f"{name} must be one of {', '.join(column['choices'])}")
+        if kind == "email":
+            _flag(errors, ~blank & ~values.str.match(r"^[^@\s]+@[^@\s]+\.[^@\s]+$"), f"{name} is not an email address")
+        if "max_length" in column:
+            _flag(errors, values.str.len() > column["max_length"], f"{name} is longer than {column['max_length']}")
+    elif kind in ("int", "decimal"):
+        values = pd.to_numeric(text.where(~blank), errors="coerce")
+        _flag(errors, ~blank & values.isna(), f"{name} is not a number")
+        if kind == "int":
+            fractional = values.notna() & (values % 1 != 0)
+            _flag(errors, fractional, f"{name} is not a whole number")
+            values = values.where(~fractional).astype("Int64")
+        if "min" in column:
+            _flag(errors, values < column["min"], f"{name} is below {column['min']}")
+        if "max" in column:
+            _flag(errors, values > column["max"], f"{name} is above {column['max']}")
+    elif kind in ("date", "datetime"):
+        values = pd.to_datetime(text.where(~blank), errors="coerce", format="mixed")
+        _flag(errors, ~blank & values.isna(), f"{name} is not a valid {kind}")
+        if kind == "date":
+            values = values.dt.date
+    elif kind == "bool":
+        lowered = text.str.lower()
+        values = lowered.isin(_TRUE)
+        _flag(errors, ~blank & ~lowered.isin(_TRUE | _FALSE), f"{name} is not true/false")
+    if column.get("required"):
+        _flag(errors, blank, f"{name} is required")
+    return values.astype(object).where(~blank, _default(column)), blank
+
+
+def _existing_keys(pool, reference, keys):
+    """The subset of `keys` present in the referenced table (one IN query)"""
+    if not keys:
+        return set()
+    table, key, *condition = reference
+    placeholders = ", ".join(["%s"] * len(keys))
+    where = f"{key} IN ({placeholders})" + (f" AND {condition[0]}" if condition else "")
+    rows = db.run_query(pool, f"SELECT {key} FROM {table} WHERE {where}", tuple(keys))
+    return {row[key] for row in rows}
+
+
+def validate_chunk(pool, entity, chunk, seen_emails):
+    """Typed rows ready to insert and a Series of reject reasons ('' for valid rows)"""
+    spec = ENTITIES[entity]["columns"]
+    errors = pd.Series("", index=chunk.index)
+    rows = pd.DataFrame(index=chunk.index)
+    for name, column in spec.items():
+        if name in chunk.columns:
+            rows[name] = _convert(chunk[name], name, column, errors)[0]
+        elif "default" in column:
+            rows[name] = _default(column)
+        # otherwise the column is left to the table default
+
+    for name, column in spec.items():
+        if "references" not in column or name not in rows:
+            continue
+        ids = pd.to_numeric(rows[name], errors="coerce")
+        keys = sorted({int(key) for key in ids[errors == ""].dropna()})
+        found = _existing_keys(pool, column["references"], keys)
+        target = "customer" if column["references"][0] == "User" else column["references"][0]
+        _flag(errors, (errors == "") & ids.notna() & ~ids.isin(found), f"{name} does not match any {target}")
+
+    if "email" in spec:
+        emails = rows["email"].where(errors == "")
+        _flag(errors, emails.notna() & (emails.duplicated() | emails.isin(seen_emails)), "email is repeated in the file")
+        candidates = sorted(set(rows["email"][errors == ""].dropna()))
+        taken = {email.lower() for email in _existing_keys(pool, ("User", "email"), candidates)}
+        _flag(errors, (errors == "") & rows["email"].isin(taken), "email is already registered")
+        seen_emails.update(rows["email"][errors == ""].dropna())
+    return rows, errors
+
+
+def _python_value(value):
+    if not isinstance(value, str) and pd.isna(value):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+
+def insert_chunk(pool, entity, rows):
+    """Insert typed rows with one multi-row INSERT in one transaction; returns the number inserted"""
+    table = ENTITIES[entity]["table"]
+    columns = list(rows.columns)
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+    values = [tuple(_python_value(value) for value in row) for row in rows.itertuples(index=False)]
+    with db.transaction(pool) as cursor:
+        cursor.executemany(sql, values)
+    return len(values)
+
+
+def import_file(pool, entity, file, filename, chunk_rows=IMPORT_CHUNK_ROWS, progress=None):
+    """Validate and load a whole file; returns (rows loaded, rejects DataFrame)"""
+    loaded = 0
+    rejects = []
+    seen_emails = set()
+    # Rows are numbered as a spreadsheet shows them; a CSV's row 1 is its header
+    start = first_row = 1 if filename.lower().endswith((".parquet", ".pq")) else 2
+    for chunk, fraction in read_chunks(file, filename, chunk_rows):
+        chunk.columns = [str(column).strip().lower() for column in chunk.columns]
+        if first_row == start:
+            check_columns(entity, list(chunk.columns))
+        chunk.index = pd.RangeIndex(first_row, first_row + len(chunk))
+        first_row += len(chunk)
+
+        rows, errors = validate_chunk(pool, entity, chunk, seen_emails)
+        valid = errors == ""
+        if valid.any():
+            try:
+                loaded += insert_chunk(pool, entity, rows[valid])
+            except mysql.connector.Error as err:
+                errors[valid] = f"chunk rolled back: {err}"
+        bad = chunk[errors != ""].copy()
+        if not bad.empty:
+            bad.insert(0, "reason", errors[errors != ""].str.rstrip("; "))
+            bad.insert(0, "row", bad.index)
+            rejects.append(bad)
+        if progress:
+            progress(first_row - start, loaded, sum(len(frame) for frame in rejects), fraction)
+    if first_row == start:
+        raise ImportFileError("the file has no data rows")
+    return loaded, pd.concat(rejects, ignore_index=True) if rejects else pd.DataFrame(columns=["row", "reason"])
@@ -0,0 +1,202 @@
+"""Background report jobs
+
+Reports run on a small thread pool instead of the Streamlit script thread.
+Jobs are recorded in a local SQLite table and their results are written as
+files (exporter.export_query) under JOB_RESULT_DIR. A job is identified by
+its report, parameters and file format: submitting one that is already
+queued or running returns the existing job, and one finished within
+JOB_RESULT_TTL_SECONDS is served from its stored result without running
+again.
+
+Jobs live in this server process. On start-up, jobs a previous process left
+queued or running are marked failed. Finished jobs and their files are
+deleted after JOB_RETENTION_SECONDS, checked on start-up and then at most
+hourly as reports are submitted.
+"""
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+import exporter
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Job table and result files
+JOB_DB_PATH = os.environ.get("JOB_DB_PATH", os.path.join(BASE_DIR, "report_jobs.sqlite3"))
+JOB_RESULT_DIR = os.environ.get("JOB_RESULT_DIR", os.path.join(BASE_DIR, "report_results"))
+# Reports run at the same time; each holds one pooled connection while it runs
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+# A finished result is reused for identical requests for this long
+JOB_RESULT_TTL_SECONDS = float(os.environ.get("JOB_RESULT_TTL_SECONDS", "600"))
+# Finished jobs and their files are deleted after this long
+JOB_RETENTION_SECONDS = 24 * 3600
+# submit() purges expired jobs at most this often
+JOB_PURGE_INTERVAL_SECONDS = 3600
+
+ACTIVE = ("queued", "running")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS report_job (
+    job_id TEXT PRIMARY KEY,
+    job_key TEXT NOT NULL,
+    report TEXT NOT NULL,
+    params TEXT NOT NULL,
+    file_format TEXT NOT NULL,
+    engine TEXT NOT NULL DEFAULT 'mysql',
+    status TEXT NOT NULL,
+    submitted_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT,
+    row_count INTEGER,
+    result_path TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_report_job_key ON report_job (job_key, submitted_at);
+"""
+
+
+def job_key(report, params, file_format, engine="mysql"):
+    """Stable identifier of a report run: same report, parameters, format and engine, same key"""
+    text = json.dumps([report, params, file_format, engine], default=str, sort_keys=True)
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+class JobQueue:
+    """Runs report queries on a thread pool and keeps their results on disk"""
+
+    def __init__(self, pool, path=JOB_DB_PATH, result_dir=JOB_RESULT_DIR, workers=JOB_WORKERS,
+                 result_ttl=JOB_RESULT_TTL_SECONDS, recorder=None, snapshot=None, advisor=None):
+        self.pool = pool
+        self.snapshot = snapshot
+        self.path = path
+        self.result_dir = result_dir
+        self.result_ttl = result_ttl
+        self.recorder = recorder
+        self.advisor = advisor
+        self._lock = threading.Lock()
+        self._last_purge = time.monotonic()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="report-job")
+        os.makedirs(result_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            # Job tables created before reports could run on the analytics snapshot
+            if "engine" not in {row["name"] for row in conn.execute("PRAGMA table_info(report_job)")}:
+                conn.execute("ALTER TABLE report_job ADD COLUMN engine TEXT NOT NULL DEFAULT 'mysql'")
+            conn.execute("""
+                UPDATE report_job SET status = 'failed', error = 'interrupted by a server restart',
+                                      finished_at = ?
+                WHERE status IN ('queued', 'running')
+            """, (_now(),))
+        self.purge()
+
+    def _purge_if_due(self):
+        with self._lock:
+            if time.monotonic() - self._last_purge < JOB_PURGE_INTERVAL_SECONDS:
+                return
+            self._last_purge = time.monotonic()
+        self.purge()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _update(self, job_id, **fields):
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE report_job SET {assignments} WHERE job_id = ?", (*fields.values(), job_id))
+
+    def submit(self, report, query, params=None, file_format="CSV", engine="mysql"):
+        """Queue a report and return its job id, reusing an in-flight or fresh identical job.
+
+        engine="duckdb" runs it on the analytics snapshot instead of MySQL.
+        """
+        self._purge_if_due()
+        key = job_key(report, params, file_format, engine)
+        fresh_after = (datetime.now() - timedelta(seconds=self.result_ttl)).isoformat(timespec="seconds")
+        with self._lock, self._connect() as conn:
+            existing = conn.execute("""
+                SELECT job_id, status, result_path FROM report_job
+                WHERE job_key = ?
+                  AND (status IN ('queued', 'running') OR (status = 'done' AND finished_at >= ?))
+                ORDER BY submitted_at DESC
+                LIMIT 1
+            """, (key, fresh_after)).fetchone()
+            if existing and (existing["status"] != "done" or os.path.exists(existing["result_path"])):
+                return existing["job_id"]
+            job_id = uuid.uuid4().hex
+            conn.execute("""
+                INSERT INTO report_job (job_id, job_key, report, params, file_format, engine, status, submitted_at)
+                VALUES (?, ?, ?, ?, ?, ?, 'queued', ?)
+            """, (job_id, key, report, json.dumps(params, default=str), file_format, engine, _now()))
+        self._executor.submit(self._run, job_id, query, params, file_format, engine)
+        return job_id
+
+    def _export(self, query, params, file_format, engine):
+        if engine == "duckdb":
+            return self.snapshot.export(query, params, file_format=file_format)
+        return exporter.export_query(self.pool, query, params, file_format=file_format)
+
+    def _run(self, job_id, query, params, file_format, engine):
+        self._update(job_id, status="running", started_at=_now())
+        try:
+            start = time.perf_counter()
+            if self.recorder:
+                with self.recorder.timed_query(query, "snapshot" if engine == "duckdb" else "query") as timing:
+                    export = self._export(query, params, file_format, engine)
+                    timing["rows"] = export["rows"]
+            else:
+                export = self._export(query, params, file_format, engine)
+            if self.advisor and engine != "duckdb":
+                self.advisor.observe(query, params, time.perf_counter() - start)
+            path = os.path.join(self.result_dir, job_id + exporter.FORMATS[file_format]["suffix"])
+            shutil.move(export["path"], path)
+        except Exception as err:  # the job row must never be left 'running'
+            self._update(job_id, status="failed", error=str(err), finished_at=_now())
+            return
+        self._update(job_id, status="done", row_count=export["rows"], result_path=path, finished_at=_now())
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM report_job WHERE job_id = ?", (job_id,)).fetchone()
+            return dict(row) if row else None
+
+    def recent(self, limit=20):
+        with self._connect() as conn:
+            rows = conn.execute("SELECT * FROM report_job ORDER BY submitted_at DESC LIMIT ?", (limit,))
+            return [dict(row) for row in rows]
+
+    def preview(self, job, limit=exporter.EXPORT_PREVIEW_ROWS):
+        """First `limit` rows of a finished job's result, without reading the whole file"""
+        if job["file_format"] == "Parquet":
+            import pyarrow.parquet as pq  # in requirements.txt
+
+            batch = next(pq.ParquetFile(job["result_path"]).iter_batches(batch_size=limit), None)
+            return batch.to_pandas() if batch is not None else pd.DataFrame()
+        return pd.read_csv(job["result_path"], nrows=limit)
+
+    def purge(self, max_age=JOB_RETENTION_SECONDS):
+        """Delete finished jobs older than max_age seconds and their result files"""
+        cutoff = (datetime.now() - timedelta(seconds=max_age)).isoformat(timespec="seconds")
+        with self._lock, self._connect() as conn:
+            old = conn.execute("""
+                SELECT job_id, result_path FROM report_job
+                WHERE status NOT IN ('queued', 'running') AND submitted_at < ?
+            """, (cutoff,)).fetchall()
+            for row in old:
+                if row["result_path"] and os.path.exists(row["result_path"]):
+                    os.remove(row["result_path"])
+            conn.executemany("DELETE FROM report_job WHERE job_id = ?", [(row["job_id"],) for row in old])
@@ -0,0 +1,630 @@
+"""Maintenance commands for the repair service database
+
+    python manage.py migrate [--list]
+    python manage.py explain-report --output before.json
+    python manage.py explain-report --output after.json --compare before.json --markdown report.md
+    python manage.py reconcile-counters
+    python manage.py refresh-views
+    python manage.py verify-reports
+    python manage.py benchmark-reports --repeat 3
+    python manage.py generate-data --requests 1000000 --seed 42 [--reset]
+    python manage.py slow-queries [--deploy ID] [--diff OLD NEW]
+    python manage.py partitions [--ahead 3] [--archive-before 2024-01-01]
+    python manage.py analytics-snapshot [--full]
+"""
+import argparse
+import ast
+import json
+import os
+import re
+import statistics
+import sys
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+import mysql.connector
+
+import advisor
+import analytics
+import datagen
+import db
+import reports
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MIGRATIONS_DIR = os.path.join(BASE_DIR, "migrations")
+APP_PATH = os.path.join(BASE_DIR, "app.py")
+
+
+# ==================== MIGRATIONS ====================
+def split_sql_script(script):
+    """Split a SQL script into statements, honouring DELIMITER directives"""
+    statements = []
+    delimiter = ";"
+    buffer = []
+    for line in script.splitlines():
+        stripped = line.strip()
+        if stripped.upper().startswith("DELIMITER "):
+            delimiter = stripped.split(None, 1)[1]
+            continue
+        if not buffer and (not stripped or stripped.startswith("--")):
+            continue
+        buffer.append(line)
+        if stripped.endswith(delimiter):
+            statement = "\n".join(buffer).rstrip()
+            statements.append(statement[:-len(delimiter)].rstrip())
+            buffer = []
+    if any(line.strip() for line in buffer):
+        statements.append("\n".join(buffer).strip())
+    return statements
+
+
+def list_migrations():
+    """(version, path) for every migration file, in apply order"""
+    migrations = []
+    for name in sorted(os.listdir(MIGRATIONS_DIR)):
+        if re.match(r"^\d+_.*\.sql$", name):
+            migrations.append((name[:-len(".sql")], os.path.join(MIGRATIONS_DIR, name)))
+    return migrations
+
+
+def applied_migrations(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version VARCHAR(255) PRIMARY KEY,
+            applied_at DATETIME NOT NULL
+        )
+    """)
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def execute_statement(cursor, statement):
+    """Run one script statement, draining any result sets (CALLs can return several)"""
+    if statement.lstrip().upper().startswith("CALL"):
+        for result in cursor.execute(statement, multi=True):
+            if result.with_rows:
+                result.fetchall()
+        return
+    cursor.execute(statement)
+    if cursor.with_rows:
+        cursor.fetchall()
+
+
+def cmd_migrate(args):
+    conn = db.connect()
+    cursor = conn.cursor()
+    applied = applied_migrations(cursor)
+    for version, path in list_migrations():
+        if args.list:
+            print(f"[{'x' if version in applied else ' '}] {version}")
+            continue
+        if version in applied:
+            continue
+        print(f"Applying {version} ...")
+        with open(path, encoding="utf-8") as f:
+            for statement in split_sql_script(f.read()):
+                execute_statement(cursor, statement)
+        cursor.execute("INSERT INTO schema_migrations (version, applied_at) VALUES (%s, %s)",
+                       (version, datetime.now()))
+    cursor.close()
+    conn.close()
+
+
+# ==================== EXPLAIN REPORT ====================
+QUERY_FUNCTIONS = {
+    # function name -> index of the SQL argument
+    "execute_query": 0,
+    "shared_query": 0,
+    "fetch_keyset_page": 0,
+    "paginated_grid": 1,
+    "newest_rows": 0,
+    "analytics_query": 0,
+}
+# Functions taking a list of query strings or (query, params) pairs
+BATCH_QUERY_FUNCTIONS = {"execute_batch", "analytics_batch"}
+# Search text the picker queries are explained with: one word is a prefix
+# match on the search columns, several go through the FULLTEXT index
+PICKER_SAMPLE_TERMS = ("", "jo", "jo smi")
+PICKER_SAMPLE_LIMIT = 51
+# (start, end) the dated reports are explained with
+REPORT_SAMPLE_RANGE = (datetime(2024, 1, 1), datetime(2024, 7, 1))
+
+
+class UnresolvedQuery(Exception):
+    """A query string whose SQL can't be known without running the app"""
+
+
+def _literal_sql(node, assignments):
+    """Resolve a call argument to SQL text, following simple `query = "..."` assignments"""
+    if isinstance(node, ast.Name):
+        node = assignments.get(node.id)
+    if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == "reports":
+        return getattr(reports, node.attr, None)
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    if isinstance(node, ast.JoinedStr):
+        sql = ""
+        for part in node.values:
+            if isinstance(part, ast.Constant):
+                sql += part.value
+            elif re.search(r"\b(FROM|JOIN)\s+$", sql, re.IGNORECASE):
+                raise UnresolvedQuery("the table name is interpolated")
+            else:
+                # Otherwise f-strings only interpolate ids and dates into these queries
+                sql += "1"
+        return sql
+    return None
+
+
+def _picker_helpers(tree):
+    """Functions of app.py that return a search_picker call, by name, with that call"""
+    helpers = {}
+    for func in tree.body:
+        if isinstance(func, ast.FunctionDef):
+            for node in ast.walk(func):
+                if (isinstance(node, ast.Return) and isinstance(node.value, ast.Call)
+                        and getattr(node.value.func, "id", None) == "search_picker"):
+                    helpers[func.name] = node.value
+    return helpers
+
+
+def _picker_queries(call, picker, assignments):
+    """The SQL a search_picker call runs for each of PICKER_SAMPLE_TERMS, with its params"""
+    keywords = {keyword.arg: keyword.value for keyword in picker.keywords}
+    query = _literal_sql(picker.args[2], assignments)
+    search_columns, id_column, order_by = (ast.literal_eval(arg) for arg in picker.args[3:6])
+    fulltext = ast.literal_eval(keywords["fulltext"]) if "fulltext" in keywords else None
+    # Eligibility filters are given at the call site of a helper, or to search_picker itself
+    filters = {keyword.arg: keyword.value for keyword in call.keywords}.get("filters")
+    try:
+        filters = ast.literal_eval(filters) if filters is not None else None
+    except ValueError:
+        raise UnresolvedQuery("the filters are not literal strings")
+    if query is None:
+        raise UnresolvedQuery("the query is not a literal string")
+    return [db.picker_query(query, search_columns, id_column, order_by, term, PICKER_SAMPLE_LIMIT,
+                            filters=filters, fulltext=fulltext)
+            for term in PICKER_SAMPLE_TERMS]
+
+
+def extract_app_queries(path=APP_PATH):
+    """Every SQL string passed to the query helpers and search pickers in app.py, with its line number.
+    
+    Pickers come with the params of a sample search. Queries whose table
+    name is built at run time are skipped with a warning.
+    """
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    helpers = _picker_helpers(tree)
+    queries = []
+    for func in ast.walk(tree):
+        if not isinstance(func, ast.FunctionDef):
+            continue
+        assignments = {}
+        for node in sorted(ast.walk(func), key=lambda n: getattr(n, "lineno", 0)):
+            if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+                assignments[node.targets[0].id] = node.value
+            if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)):
+                continue
+            picker = helpers.get(node.func.id) or (node if node.func.id == "search_picker" else None)
+            if picker is not None:
+                if func.name in helpers:
+                    continue
+                try:
+                    for sql, params in _picker_queries(node, picker, assignments):
+                        queries.append({"line": node.lineno, "function": func.name,
+                                        "sql": " ".join(sql.split()), "params": list(params)})
+                except UnresolvedQuery as err:
+                    print(f"warning: skipped the picker at app.py:{node.lineno} ({func.name}): {err}",
+                          file=sys.stderr)
+                continue
+            if node.func.id in BATCH_QUERY_FUNCTIONS and node.args and isinstance(node.args[0], ast.List):
+                arguments = [item.elts[0] if isinstance(item, ast.Tuple) else item for item in node.args[0].elts]
+            else:
+                position = QUERY_FUNCTIONS.get(node.func.id)
+                if position is None or len(node.args) <= position:
+                    continue
+                arguments = [node.args[position]]
+            for argument in arguments:
+                try:
+                    sql = _literal_sql(argument, assignments)
+                except UnresolvedQuery as err:
+                    print(f"warning: skipped the query at app.py:{node.lineno} ({func.name}): {err}",
+                          file=sys.stderr)
+                    continue
+                if sql is None:
+                    continue
+                if node.func.id == "paginated_grid" and len(node.args) > 2:
+                    sort_keys = ast.literal_eval(node.args[2])
+                    sql += "\nORDER BY " + ", ".join(f"{expr} DESC" for expr, _ in sort_keys) + "\nLIMIT %s"
+                queries.append({"line": node.lineno, "function": func.name, "sql": " ".join(sql.split())})
+    unique = {}
+    for query in sorted(queries, key=lambda q: q["line"]):
+        unique.setdefault(query["sql"], query)
+    return list(unique.values())
+
+
+def extract_report_queries():
+    """The queries of reports.REPORTS, with params for REPORT_SAMPLE_RANGE"""
+    queries = []
+    for name, report in reports.REPORTS.items():
+        params = REPORT_SAMPLE_RANGE if report["dated"] else ()
+        if "params" in report:
+            params = report["params"](*params)
+        queries.append({"line": name, "function": "reports.REPORTS",
+                        "sql": " ".join(report["query"].split()), "params": list(params)})
+    return queries
+
+
+def _sample_value(sql_before_placeholder):
+    """Representative literal for a %s placeholder, based on the column it is compared with"""
+    context = sql_before_placeholder[-60:].lower()
+    if re.search(r"limit\s*$", context):
+        return "25"
+    column = re.search(r"(\w+)\s*(=|<|>|<=|>=|like)\s*$", context)
+    column = column.group(1) if column else ""
+    if "date" in column:
+        return "'2024-06-01'"
+    if column == "status":
+        return "'pending'"
+    if column.endswith("_type"):
+        return "'customer'"
+    if column.endswith("_id") or not column:
+        return "1"
+    return "'x'"
+
+
+def bind_sample_params(sql):
+    """Replace %s placeholders with representative literals so the statement can be EXPLAINed"""
+    parts = sql.split("%s")
+    bound = parts[0]
+    for part in parts[1:]:
+        bound += _sample_value(bound) + part
+    return bound.replace("%%", "%")
+
+
+def explain_queries(queries):
+    conn = db.connect()
+    cursor = conn.cursor(dictionary=True)
+    results = []
+    for query in queries:
+        entry = dict(query)
+        try:
+            if "params" in query:
+                cursor.execute("EXPLAIN " + query["sql"], query["params"])
+            else:
+                cursor.execute("EXPLAIN " + bind_sample_params(query["sql"]))
+            entry["plan"] = [
+                {key: row.get(key) for key in ("id", "select_type", "table", "type", "key", "rows", "filtered", "Extra")}
+                for row in cursor.fetchall()
+            ]
+        except mysql.connector.Error as err:
+            entry["error"] = str(err)
+        results.append(entry)
+    cursor.close()
+    conn.close()
+    return results
+
+
+def _plan_summary(entry):
+    if entry is None:
+        return "—"
+    if "error" in entry:
+        return f"error: {entry['error']}"
+    lines = []
+    for row in entry["plan"]:
+        flags = [flag for flag in ("Using filesort", "Using temporary") if flag in (row["Extra"] or "")]
+        lines.append(f"{row['table']}: {row['type'] or '-'} via {row['key'] or 'no index'}, "
+                     f"~{row['rows'] or 0} rows{' (' + ', '.join(flags) + ')' if flags else ''}")
+    return "<br>".join(lines)
+
+
+def _examined_rows(entry):
+    if entry is None or "error" in entry:
+        return None
+    return sum(row["rows"] or 0 for row in entry["plan"])
+
+
+def render_markdown(after, before=None):
+    before_by_sql = {entry["sql"]: entry for entry in before or []}
+    lines = [
+        "# EXPLAIN report",
+        "",
+        f"Generated {datetime.now():%Y-%m-%d %H:%M} from {len(after)} query strings in app.py and reports.py.",
+        "",
+    ]
+    if before is not None:
+        lines += ["| Source | Query | Before | After | Rows examined |", "| --- | --- | --- | --- | --- |"]
+    else:
+        lines += ["| Source | Query | Plan |", "| --- | --- | --- |"]
+    for entry in after:
+        sql = entry["sql"] if len(entry["sql"]) <= 160 else entry["sql"][:157] + "..."
+        sql = sql.replace("|", "\\|")
+        location = f"{entry['function']}:{entry['line']}"
+        if before is not None:
+            previous = before_by_sql.get(entry["sql"])
+            rows_before, rows_after = _examined_rows(previous), _examined_rows(entry)
+            change = f"{rows_before} → {rows_after}" if rows_before is not None else str(rows_after)
+            lines.append(f"| {location} | `{sql}` | {_plan_summary(previous)} | {_plan_summary(entry)} | {change} |")
+        else:
+            lines.append(f"| {location} | `{sql}` | {_plan_summary(entry)} |")
+    return "\n".join(lines) + "\n"
+
+
+def cmd_explain_report(args):
+    results = explain_queries(extract_app_queries() + extract_report_queries())
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, default=str)
+    print(f"Wrote plans for {len(results)} queries to {args.output}")
+    if args.markdown:
+        before = None
+        if args.compare:
+            with open(args.compare, encoding="utf-8") as f:
+                before = json.load(f)
+        with open(args.markdown, "w", encoding="utf-8") as f:
+            f.write(render_markdown(results, before))
+        print(f"Wrote {args.markdown}")
+
+
+# ==================== SUMMARY TABLES ====================
+def call_and_report(procedure):
+    """Call a maintenance procedure and print the messages it returns"""
+    conn = db.connect()
+    cursor = conn.cursor()
+    cursor.callproc(procedure)
+    for result in cursor.stored_results():
+        for row in result.fetchall():
+            print(row[0])
+    cursor.close()
+    conn.close()
+
+
+def cmd_reconcile_counters(args):
+    call_and_report("ReconcileCounters")
+    call_and_report("RebuildRevenueMonthly")
+
+
+def cmd_refresh_views(args):
+    call_and_report("RefreshMaterializedViews")
+
+
+# ==================== REPORT REWRITES ====================
+def _comparable(row):
+    return {column: round(float(value), 4) if isinstance(value, (Decimal, float)) else value
+            for column, value in row.items()}
+
+
+def compare_report(cursor, report):
+    """Rows where the rewritten query disagrees with the legacy one, as (key, legacy, rewritten)"""
+    cursor.execute(report["query"], report.get("params", ()))
+    rewritten = cursor.fetchall()
+    cursor.execute(report["legacy"], report.get("legacy_params", ()))
+    legacy = [report.get("legacy_fixup", dict)(row) for row in cursor.fetchall()]
+
+    def by_key(rows):
+        return {tuple(row[column] for column in report["key"]): _comparable(row) for row in rows}
+
+    rewritten, legacy = by_key(rewritten), by_key(legacy)
+    return [(key, legacy.get(key), rewritten.get(key))
+            for key in sorted(set(rewritten) | set(legacy), key=str)
+            if legacy.get(key) != rewritten.get(key)]
+
+
+def cmd_verify_reports(args):
+    conn = db.connect()
+    cursor = conn.cursor(dictionary=True)
+    failed = 0
+    for report in reports.REWRITTEN:
+        differences = compare_report(cursor, report)
+        if not differences:
+            print(f"OK    {report['name']}")
+            continue
+        failed += 1
+        print(f"DIFF  {report['name']}: {len(differences)} rows differ")
+        for key, legacy, rewritten in differences[:5]:
+            print(f"      {key}: legacy={legacy} rewritten={rewritten}")
+    cursor.close()
+    conn.close()
+    return 1 if failed else 0
+
+
+def time_query(cursor, sql, repeat, params=()):
+    """Median wall time of running a query and fetching all of its rows, or None on timeout"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        try:
+            cursor.execute(sql, params)
+            cursor.fetchall()
+        except mysql.connector.errors.DatabaseError as err:
+            if err.errno == 3024:  # ER_QUERY_TIMEOUT (MAX_EXECUTION_TIME exceeded)
+                return None
+            raise
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def cmd_benchmark_reports(args):
+    conn = db.connect()
+    cursor = conn.cursor()
+    cursor.execute("SET SESSION MAX_EXECUTION_TIME = %s", (int(args.max_seconds * 1000),))
+    cursor.execute("SELECT COUNT(*) FROM Repair_Request")
+    request_count = cursor.fetchone()[0]
+    print(f"{request_count:,} repair requests, median of {args.repeat} runs\n")
+    print("| Report | Legacy | Rewritten | Speedup |")
+    print("| --- | --- | --- | --- |")
+    for report in reports.REWRITTEN:
+        legacy = time_query(cursor, report["legacy"], args.repeat, report.get("legacy_params", ()))
+        rewritten = time_query(cursor, report["query"], args.repeat, report.get("params", ()))
+        legacy_text = f"{legacy:.3f}s" if legacy is not None else f"> {args.max_seconds:.0f}s"
+        rewritten_text = f"{rewritten:.3f}s" if rewritten is not None else f"> {args.max_seconds:.0f}s"
+        if legacy is None or rewritten is None:
+            speedup = "—"
+        else:
+            speedup = f"{legacy / rewritten:.1f}x" if rewritten else "∞"
+        print(f"| {report['name']} | {legacy_text} | {rewritten_text} | {speedup} |")
+    cursor.close()
+    conn.close()
+
+
+# ==================== SYNTHETIC DATA ====================
+def cmd_generate_data(args):
+    try:
+        sizes = datagen.generate(
+            args.requests, seed=args.seed, end_date=args.end_date, years=args.years,
+            customers=args.customers, technicians=args.technicians, locations=args.locations,
+            batch_size=args.batch_size, load_data=args.load_data, reset=args.reset,
+        )
+    except RuntimeError as err:
+        print(err, file=sys.stderr)
+        return 1
+    print("Generated " + ", ".join(f"{count:,} {name}" for name, count in sizes.items()))
+
+
+# ==================== SLOW QUERIES ====================
+def _print_slow_query(row):
+    flags = [f"full scan of {scan['table']} ({scan['rows']:,} rows)" for scan in json.loads(row["full_scans"])]
+    flags += [name for name in ("filesort", "temporary") if row[name]]
+    print(f"{row['fingerprint']}  worst {row['worst_ms']:.0f} ms  x{row['occurrences']}  {row['statement'][:100]}")
+    if flags:
+        print("    " + "; ".join(flags))
+    if row["suggested_index"]:
+        print("    " + row["suggested_index"].replace("\n", "\n    "))
+
+
+def cmd_slow_queries(args):
+    store = advisor.SlowQueryStore(args.db)
+    if args.diff:
+        changes = store.diff(*args.diff)
+        for title, rows in (("Newly slow", changes["new"]), ("Resolved", changes["resolved"])):
+            print(f"{title}: {len(rows)}")
+            for row in rows:
+                _print_slow_query(row)
+        print(f"Plan changed: {len(changes['changed'])}")
+        for change in changes["changed"]:
+            print(f"{change['fingerprint']}  {change['old_worst_ms']:.0f} -> {change['new_worst_ms']:.0f} ms  "
+                  f"{change['statement'][:100]}")
+        return 1 if changes["new"] or changes["changed"] else 0
+    if not args.deploy:
+        for row in store.deploys():
+            print(f"{row['deploy']}  {row['queries']} slow queries, last seen {row['last_seen']}")
+        return 0
+    for row in store.records(args.deploy):
+        _print_slow_query(row)
+
+
+# ==================== PARTITIONS ====================
+def add_months(day, months):
+    month = day.year * 12 + day.month - 1 + months
+    return date(month // 12, month % 12 + 1, 1)
+
+
+def cmd_partitions(args):
+    conn = db.connect()
+    cursor = conn.cursor()
+    through = add_months(date.today(), args.ahead)
+    for table in db.PARTITIONED_TABLES:
+        cursor.callproc("AddMonthlyPartitions", (table, through))
+    if args.archive_before:
+        cursor.callproc("ArchivePartitions", (args.archive_before, args.archive_schema))
+        # The last result set is the summary; the ones before come from the rebuild procedures
+        summary = [result.fetchall() for result in cursor.stored_results()][-1]
+        for table, partitions, rows in summary:
+            print(f"Archived {rows:,} {table} rows" + (f" ({partitions})" if partitions else ""))
+    conn.commit()
+
+    cursor.execute("""
+        SELECT TABLE_NAME, PARTITION_NAME, PARTITION_DESCRIPTION, TABLE_ROWS
+        FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND PARTITION_NAME IS NOT NULL
+        ORDER BY TABLE_NAME, PARTITION_ORDINAL_POSITION
+    """)
+    for table, partition, bound, rows in cursor.fetchall():
+        print(f"{table:<20} {partition:<10} < {bound:<14} ≈{rows:,} rows")
+    cursor.close()
+    conn.close()
+
+
+# ==================== ANALYTICS SNAPSHOT ====================
+def cmd_analytics_snapshot(args):
+    if not analytics.available():
+        print("The analytics snapshot needs DuckDB: pip install duckdb", file=sys.stderr)
+        return 1
+    snapshot = analytics.Snapshot(args.path)
+    written = snapshot.refresh(db.ConnectionPool(size=1), full=args.full)
+    for table, rows in written.items():
+        print(f"{table:<26} {rows:>12,} rows written")
+    print(f"Snapshot in {snapshot.path} as of {snapshot.refreshed_at():%Y-%m-%d %H:%M:%S}")
+
+
+# ==================== CLI ====================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Repair service database maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate = commands.add_parser("migrate", help="apply pending migrations from migrations/")
+    migrate.add_argument("--list", action="store_true", help="show migration status without applying")
+    migrate.set_defaults(handler=cmd_migrate)
+
+    explain = commands.add_parser("explain-report", help="EXPLAIN every query string in app.py")
+    explain.add_argument("--output", required=True, help="JSON file to write the plans to")
+    explain.add_argument("--compare", help="earlier JSON output to compare against (before/after)")
+    explain.add_argument("--markdown", help="also write a Markdown report to this path")
+    explain.set_defaults(handler=cmd_explain_report)
+
+    reconcile = commands.add_parser("reconcile-counters", help="rebuild the dashboard counter tables from scratch")
+    reconcile.set_defaults(handler=cmd_reconcile_counters)
+
+    refresh = commands.add_parser("refresh-views", help="rebuild the materialized view tables from scratch")
+    refresh.set_defaults(handler=cmd_refresh_views)
+
+    verify = commands.add_parser("verify-reports", help="check the rewritten report queries against the legacy ones")
+    verify.set_defaults(handler=cmd_verify_reports)
+
+    benchmark = commands.add_parser("benchmark-reports", help="time the rewritten report queries against the legacy ones")
+    benchmark.add_argument("--repeat", type=int, default=3, help="runs per query (the median is reported)")
+    benchmark.add_argument("--max-seconds", type=float, default=600, help="abandon a query after this long")
+    benchmark.set_defaults(handler=cmd_benchmark_reports)
+
+    generate = commands.add_parser("generate-data", help="fill the database with deterministic synthetic data")
+    generate.add_argument("--requests", type=int, required=True, help="number of repair requests (10k .. 10M)")
+    generate.add_argument("--seed", type=int, default=42)
+    generate.add_argument("--end-date", type=date.fromisoformat, help="latest request date, YYYY-MM-DD (default: today)")
+    generate.add_argument("--years", type=int, default=2, help="years of history before --end-date")
+    generate.add_argument("--customers", type=int, help="default: requests / 8")
+    generate.add_argument("--technicians", type=int, help="default: requests / 400")
+    generate.add_argument("--locations", type=int, help="default: requests / 20000, 20..500")
+    generate.add_argument("--batch-size", type=int, default=5000, help="rows per INSERT / LOAD DATA file")
+    generate.add_argument("--load-data", action="store_true", help="load through LOAD DATA LOCAL INFILE")
+    generate.add_argument("--reset", action="store_true", help="empty the tables first")
+    generate.set_defaults(handler=cmd_generate_data)
+
+    slow = commands.add_parser("slow-queries", help="show or diff the plans captured by the slow-query advisor")
+    slow.add_argument("--db", default=advisor.ADVISOR_DB_PATH, help="advisor SQLite file")
+    slow.add_argument("--deploy", help="list the slow queries of this deploy (default: list deploys)")
+    slow.add_argument("--diff", nargs=2, metavar=("OLD", "NEW"), help="compare two deploys; exits 1 on regressions")
+    slow.set_defaults(handler=cmd_slow_queries)
+
+    partitions = commands.add_parser("partitions", help="add monthly partitions ahead and archive old ones")
+    partitions.add_argument("--ahead", type=int, default=3, help="months after this one that get a partition")
+    partitions.add_argument("--archive-before", type=date.fromisoformat,
+                            help="move months before this date's month into the archive schema")
+    partitions.add_argument("--archive-schema", default=f"{db.DB_CONFIG['database']}_archive")
+    partitions.set_defaults(handler=cmd_partitions)
+
+    snapshot = commands.add_parser("analytics-snapshot", help="refresh the Parquet snapshot DuckDB analytics run on")
+    snapshot.add_argument("--full", action="store_true", help="re-export every table and month")
+    snapshot.add_argument("--path", default=analytics.ANALYTICS_SNAPSHOT_DIR, help="snapshot directory")
+    snapshot.set_defaults(handler=cmd_analytics_snapshot)
+
+    args = parser.parse_args(argv)
+    try:
+        return args.handler(args) or 0
+    except mysql.connector.Error as err:
+        print(f"Database error: {err}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,213 @@
+"""In-process latency metrics for queries, procedure calls and pages
+
+Every timed call is kept in a fixed-size ring buffer (for percentiles over
+recent traffic) and in cumulative Prometheus histograms (for scraping).
+"""
+import hashlib
+import os
+import re
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Most recent samples kept for percentiles
+METRICS_BUFFER_SIZE = int(os.environ.get("METRICS_BUFFER_SIZE", "5000"))
+# Serve /metrics in Prometheus text format on this port (unset: don't serve)
+METRICS_PORT = os.environ.get("METRICS_PORT")
+
+# Histogram bucket upper bounds, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# "snapshot" is a query run on the DuckDB analytics snapshot (analytics.py)
+KINDS = ("query", "snapshot", "procedure", "transaction", "page")
+
+_COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_STRING = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|%\(\w+\)s")
+_VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql):
+    """Normalise a statement so calls that differ only in literals share one fingerprint"""
+    text = _COMMENT.sub(" ", sql)
+    text = _STRING.sub("?", text)
+    text = _PLACEHOLDER.sub("?", text)
+    text = _NUMBER.sub("?", text)
+    text = _VALUE_LIST.sub("(...)", text)
+    return " ".join(text.split())
+
+
+def fingerprint_id(text):
+    """Short stable id for a fingerprint, usable as a metric label"""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+
+
+def approximate_size(rows, sample=100):
+    """Approximate bytes held by a list of dict rows, from the first `sample` rows"""
+    if not isinstance(rows, list) or not rows:
+        return 0
+    head = rows[:sample]
+    sampled = sum(
+        sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row.values())
+        if isinstance(row, dict) else sys.getsizeof(row)
+        for row in head
+    )
+    return sys.getsizeof(rows) + sampled * len(rows) // len(head)
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class MetricsRecorder:
+    """Thread-safe store of timing samples shared by every session of the app"""
+
+    def __init__(self, buffer_size=METRICS_BUFFER_SIZE):
+        self.samples = deque(maxlen=buffer_size)
+        self.statements = {}  # fingerprint id -> fingerprint text
+        self._histograms = defaultdict(lambda: {"buckets": [0] * len(BUCKETS), "count": 0, "sum": 0.0,
+                                                "rows": 0, "bytes": 0, "errors": 0})
+        self._lock = threading.Lock()
+
+    def record(self, kind, name, seconds, rows=0, size=0, error=False):
+        sample = {"kind": kind, "name": name, "seconds": seconds, "rows": rows, "bytes": size,
+                  "error": error, "at": time.time()}
+        with self._lock:
+            self.samples.append(sample)
+            histogram = self._histograms[(kind, name)]
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    histogram["buckets"][i] += 1
+            histogram["count"] += 1
+            histogram["sum"] += seconds
+            histogram["rows"] += rows
+            histogram["bytes"] += size
+            histogram["errors"] += int(error)
+
+    @contextmanager
+    def timed(self, kind, name):
+        """Time a with-block; the block may set `rows` and `bytes` on the yielded dict.
+        
+        The elapsed time is stored back on the dict as `seconds` when the block exits.
+        """
+        outcome = {"rows": 0, "bytes": 0}
+        error = False
+        start = time.perf_counter()
+        try:
+            yield outcome
+        except Exception:
+            error = True
+            raise
+        finally:
+            outcome["seconds"] = time.perf_counter() - start
+            self.record(kind, name, outcome["seconds"], outcome["rows"], outcome["bytes"], error)
+
+    @contextmanager
+    def timed_query(self, sql, kind="query"):
+        """Time a statement under its fingerprint"""
+        text = fingerprint(sql)
+        name = fingerprint_id(text)
+        with self._lock:
+            self.statements.setdefault(name, text)
+        with self.timed(kind, name) as outcome:
+            yield outcome
+
+    def summary(self, kind):
+        """Per-name latency percentiles over the ring buffer, slowest p95 first"""
+        with self._lock:
+            samples = [sample for sample in self.samples if sample["kind"] == kind]
+            statements = dict(self.statements)
+        grouped = defaultdict(list)
+        for sample in samples:
+            grouped[sample["name"]].append(sample)
+        rows = []
+        for name, group in grouped.items():
+            seconds = sorted(sample["seconds"] for sample in group)
+            rows.append({
+                "name": name,
+                "statement": statements.get(name, name),
+                "calls": len(group),
+                "p50_ms": _percentile(seconds, 0.50) * 1000,
+                "p95_ms": _percentile(seconds, 0.95) * 1000,
+                "p99_ms": _percentile(seconds, 0.99) * 1000,
+                "max_ms": seconds[-1] * 1000,
+                "total_s": sum(seconds),
+                "avg_rows": sum(sample["rows"] for sample in group) / len(group),
+                "avg_kib": sum(sample["bytes"] for sample in group) / len(group) / 1024,
+                "errors": sum(sample["error"] for sample in group),
+            })
+        return sorted(rows, key=lambda row: row["p95_ms"], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self.samples.clear()
+            self._histograms.clear()
+
+    def prometheus_text(self):
+        """All cumulative histograms in the Prometheus text exposition format"""
+        with self._lock:
+            histograms = {key: {**value, "buckets": list(value["buckets"])} for key, value in self._histograms.items()}
+            statements = dict(self.statements)
+        lines = []
+        for kind in KINDS:
+            label = "fingerprint" if kind in ("query", "snapshot") else kind
+            metric = f"repair_app_{kind}_duration_seconds"
+            lines += [f"# HELP {metric} Wall time of {kind} calls.", f"# TYPE {metric} histogram"]
+            for (entry_kind, name), histogram in sorted(histograms.items()):
+                if entry_kind != kind:
+                    continue
+                labels = f'{label}="{_escape(name)}"'
+                for bound, count in zip(BUCKETS, histogram["buckets"]):
+                    lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {histogram["count"]}')
+                lines.append(f"{metric}_sum{{{labels}}} {histogram['sum']:.6f}")
+                lines.append(f"{metric}_count{{{labels}}} {histogram['count']}")
+            for counter, key, help_text in (("rows_total", "rows", "Rows returned"),
+                                            ("bytes_total", "bytes", "Approximate bytes materialized"),
+                                            ("errors_total", "errors", "Calls that raised")):
+                metric = f"repair_app_{kind}_{counter}"
+                lines += [f"# HELP {metric} {help_text} by {kind} calls.", f"# TYPE {metric} counter"]
+                for (entry_kind, name), histogram in sorted(histograms.items()):
+                    if entry_kind == kind:
+                        lines.append(f'{metric}{{{label}="{_escape(name)}"}} {histogram[key]}')
+        lines += ["# HELP repair_app_query_info Statement text of each query fingerprint.",
+                  "# TYPE repair_app_query_info gauge"]
+        for name, text in sorted(statements.items()):
+            lines.append(f'repair_app_query_info{{fingerprint="{name}",statement="{_escape(text[:300])}"}} 1')
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def serve(recorder, port):
+    """Serve recorder.prometheus_text() at http://0.0.0.0:<port>/metrics from a daemon thread"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") != "/metrics":
+                self.send_error(404)
+                return
+            body = recorder.prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", int(port)), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
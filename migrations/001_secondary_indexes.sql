@@ -0,0 +1,36 @@
+-- ============================================
+-- MIGRATION 001: SECONDARY INDEXES FOR HOT FILTER/SORT COLUMNS
+-- ============================================
+-- Each index is matched to the queries in app.py that filter or sort on
+-- these columns; InnoDB appends the primary key to every secondary index,
+-- so (col) also serves ORDER BY col, id and keyset seeks on (col, id).
+
+-- Repair_Request: status pickers/counters and newest-first listings
+-- (WHERE status = ... ORDER BY request_date, GROUP BY status, COUNT pending)
+CREATE INDEX idx_request_status_date ON Repair_Request (status, request_date);
+-- (ORDER BY request_date DESC [LIMIT n], keyset paging on (request_date, request_id))
+CREATE INDEX idx_request_date ON Repair_Request (request_date);
+
+-- Service_Assignment: newest-first listings and keyset paging
+CREATE INDEX idx_assignment_date ON Service_Assignment (assignment_date);
+-- Active-job checks per technician (before_technician_delete, protected technicians, views);
+-- also takes over from the implicit technician_id foreign key index
+CREATE INDEX idx_assignment_technician_status ON Service_Assignment (technician_id, assignment_status);
+-- Completed-assignment pickers ordered by completion date (Add Review)
+CREATE INDEX idx_assignment_status_completion ON Service_Assignment (assignment_status, actual_completion_date);
+
+-- Payment: completed-payment analytics by month and by method
+CREATE INDEX idx_payment_status_date ON Payment (payment_status, payment_date);
+CREATE INDEX idx_payment_status_method ON Payment (payment_status, payment_method, payment_amount);
+-- Newest-first listings and keyset paging
+CREATE INDEX idx_payment_date ON Payment (payment_date);
+
+-- Technician: available-technician pickers
+CREATE INDEX idx_technician_availability ON Technician (availability_status);
+
+-- User: customer/technician pickers and reports
+CREATE INDEX idx_user_type ON User (user_type);
+
+-- Review: newest-first listings and rating distribution
+CREATE INDEX idx_review_date ON Review (review_date);
+CREATE INDEX idx_review_customer_rating ON Review (customer_rating);
@@ -0,0 +1,45 @@
+-- ============================================
+-- MIGRATION 002: SINGLE-CALL DASHBOARD DATA
+-- ============================================
+-- Returns everything the Dashboard page shows in one round trip:
+--   1. KPI tiles (users, technicians, requests, pending requests)
+--   2. Requests by status
+--   3. Completed revenue by service category
+--   4. 10 most recent repair requests
+
+DROP PROCEDURE IF EXISTS GetSystemDashboard;
+
+DELIMITER //
+CREATE PROCEDURE GetSystemDashboard()
+BEGIN
+    -- KPI tiles
+    SELECT 
+        (SELECT COUNT(*) FROM User) as total_users,
+        (SELECT COUNT(*) FROM Technician) as total_technicians,
+        (SELECT COUNT(*) FROM Repair_Request) as total_requests,
+        (SELECT COUNT(*) FROM Repair_Request WHERE status = 'pending') as pending_requests;
+    
+    -- Requests by status
+    SELECT status, COUNT(*) as count 
+    FROM Repair_Request 
+    GROUP BY status;
+    
+    -- Revenue by service category
+    SELECT sc.category_name, SUM(p.payment_amount) as total_revenue
+    FROM Payment p
+    JOIN Service_Assignment sa ON p.assignment_id = sa.assignment_id
+    JOIN Repair_Request rr ON sa.request_id = rr.request_id
+    JOIN Service_Category sc ON rr.category_id = sc.category_id
+    WHERE p.payment_status = 'completed'
+    GROUP BY sc.category_name;
+    
+    -- Recent repair requests
+    SELECT rr.request_id, u.first_name, u.last_name, sc.category_name,
+           rr.status, rr.request_date
+    FROM Repair_Request rr
+    JOIN User u ON rr.customer_id = u.user_id
+    JOIN Service_Category sc ON rr.category_id = sc.category_id
+    ORDER BY rr.request_date DESC
+    LIMIT 10;
+END //
+DELIMITER ;
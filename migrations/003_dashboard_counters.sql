@@ -0,0 +1,302 @@
+-- ============================================
+-- MIGRATION 003: TRIGGER-MAINTAINED DASHBOARD COUNTERS
+-- ============================================
+-- Keeps the dashboard KPIs as a handful of pre-computed rows so the
+-- Dashboard never has to COUNT(*) or GROUP BY over Repair_Request.
+--
+-- MySQL does not fire triggers for rows removed by ON DELETE CASCADE,
+-- so the BEFORE DELETE triggers on parent tables subtract the child
+-- rows that the cascade is about to remove.
+--
+-- Bulk loaders may SET @disable_summary_triggers = 1 to skip the
+-- per-row bookkeeping, and must CALL ReconcileCounters() afterwards.
+
+CREATE TABLE System_Counters (
+    counter_name VARCHAR(50) PRIMARY KEY,
+    counter_value BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE Request_Status_Counts (
+    status VARCHAR(20) PRIMARY KEY,
+    request_count BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE Payment_Status_Totals (
+    payment_status VARCHAR(20) PRIMARY KEY,
+    payment_count BIGINT NOT NULL DEFAULT 0,
+    total_amount DECIMAL(14,2) NOT NULL DEFAULT 0.00
+);
+
+-- ============================================
+-- COUNTER HELPERS
+-- ============================================
+
+DELIMITER //
+CREATE PROCEDURE BumpCounter(IN p_counter_name VARCHAR(50), IN p_delta BIGINT)
+BEGIN
+    INSERT INTO System_Counters (counter_name, counter_value)
+    VALUES (p_counter_name, p_delta)
+    ON DUPLICATE KEY UPDATE counter_value = counter_value + p_delta;
+END //
+
+CREATE PROCEDURE BumpRequestStatus(IN p_status VARCHAR(20), IN p_delta BIGINT)
+BEGIN
+    INSERT INTO Request_Status_Counts (status, request_count)
+    VALUES (COALESCE(p_status, ''), p_delta)
+    ON DUPLICATE KEY UPDATE request_count = request_count + p_delta;
+END //
+
+CREATE PROCEDURE BumpPaymentStatus(IN p_payment_status VARCHAR(20), IN p_count_delta BIGINT, IN p_amount_delta DECIMAL(14,2))
+BEGIN
+    INSERT INTO Payment_Status_Totals (payment_status, payment_count, total_amount)
+    VALUES (COALESCE(p_payment_status, ''), p_count_delta, p_amount_delta)
+    ON DUPLICATE KEY UPDATE payment_count = payment_count + p_count_delta,
+                            total_amount = total_amount + p_amount_delta;
+END //
+
+-- Rebuild every counter from the base tables
+CREATE PROCEDURE ReconcileCounters()
+BEGIN
+    START TRANSACTION;
+
+    DELETE FROM System_Counters;
+    INSERT INTO System_Counters (counter_name, counter_value)
+    SELECT 'total_users', COUNT(*) FROM User
+    UNION ALL
+    SELECT 'total_technicians', COUNT(*) FROM Technician
+    UNION ALL
+    SELECT 'total_requests', COUNT(*) FROM Repair_Request
+    UNION ALL
+    SELECT 'total_payments', COUNT(*) FROM Payment;
+
+    DELETE FROM Request_Status_Counts;
+    INSERT INTO Request_Status_Counts (status, request_count)
+    SELECT COALESCE(status, ''), COUNT(*)
+    FROM Repair_Request
+    GROUP BY COALESCE(status, '');
+
+    DELETE FROM Payment_Status_Totals;
+    INSERT INTO Payment_Status_Totals (payment_status, payment_count, total_amount)
+    SELECT payment_status, COUNT(*), SUM(payment_amount)
+    FROM Payment
+    GROUP BY payment_status;
+
+    COMMIT;
+
+    SELECT 'Counters reconciled' AS message;
+END //
+DELIMITER ;
+
+-- ============================================
+-- COUNTER TRIGGERS
+-- ============================================
+
+DELIMITER //
+CREATE TRIGGER after_user_insert_counters
+AFTER INSERT ON User
+FOR EACH ROW
+BEGIN
+    IF COALESCE(@disable_summary_triggers, 0) = 0 THEN
+        CALL BumpCounter('total_users', 1);
+    END IF;
+END //
+
+-- Also accounts for the Technician, Repair_Request and Payment rows the cascade removes
+CREATE TRIGGER before_user_delete_counters
+BEFORE DELETE ON User
+FOR EACH ROW
+BEGIN
+    IF COALESCE(@disable_summary_triggers, 0) = 0 THEN
+        CALL BumpCounter('total_users', -1);
+        CALL BumpCounter('total_technicians', -(SELECT COUNT(*) FROM Technician WHERE user_id = OLD.user_id));
+        CALL BumpCounter('total_requests', -(SELECT COUNT(*) FROM Repair_Request WHERE customer_id = OLD.user_id));
+        CALL BumpCounter('total_payments', -(
+            SELECT COUNT(*)
+            FROM Payment p
+            JOIN Service_Assignment sa ON p.assignment_id = sa.assignment_id
+            JOIN Repair_Request rr ON sa.request_id = rr.request_id
+            WHERE rr.customer_id = OLD.user_id
+        ));
+
+        UPDATE Request_Status_Counts rsc
+        JOIN (
+            SELECT COALESCE(status, '') as status, COUNT(*) as request_count
+            FROM Repair_Request
+            WHERE customer_id = OLD.user_id
+            GROUP BY COALESCE(status, '')
+        ) removed ON rsc.status = removed.status
+        SET rsc.request_count = rsc.request_count - removed.request_count;
+
+        UPDATE Payment_Status_Totals pst
+        JOIN (
+            SELECT p.payment_status, COUNT(*) as payment_count, SUM(p.payment_amount) as total_amount
+            FROM Payment p
+            JOIN Service_Assignment sa ON p.assignment_id = sa.assignment_id
+            JOIN Repair_Request rr ON sa.request_id = rr.request_id
+            WHERE rr.customer_id = OLD.user_id
+            GROUP BY p.payment_status
+        ) removed ON pst.payment_status = removed.payment_status
+        SET pst.payment_count = pst.payment_count - removed.payment_count,
+            pst.total_amount = pst.total_amount - removed.total_amount;
+    END IF;
+END //
+
+CREATE TRIGGER after_technician_insert_counters
+AFTER INSERT ON Technician
+FOR EACH ROW
+BEGIN
+    IF COALESCE(@disable_summary_triggers, 0) = 0 THEN
+        CALL BumpCounter('total_technicians', 1);
+    END IF;
+END //
+
+CREATE TRIGGER after_technician_delete_counters
+AFTER DELETE ON Technician
+FOR EACH ROW
+BEGIN
+    IF COALESCE(@disable_summary_triggers, 0) = 0 THEN
+        CALL BumpCounter('total_technicians', -1);
+    END IF;
+END //
+
+CREATE TRIGGER after_request_insert_counters
+AFTER INSERT ON Repair_Request
+FOR EACH ROW
+BEGIN
+    IF COALESCE(@disable_summary_triggers, 0) = 0 THEN
+        CALL BumpCounter('total_requests', 1);
+        CALL BumpRequestStatus(NEW.status, 1);
+    END IF;
+END //
+
+CREATE TRIGGER after_request_update_counters
+AFTER UPDATE ON Repair_Request
+FOR EACH ROW
+BEGIN
+    IF COALESCE(@disable_summary_triggers, 0) = 0 AND NOT (OLD.status <=> NEW.status) THEN
+        CALL BumpRequestStatus(OLD.status, -1);
+        CALL BumpRequestStatus(NEW.status, 1);
+    END IF;
+END //
+
+-- Also accounts for the Payment row the cascade removes
+CREATE TRIGGER before_request_delete_counters
+BEFORE DELETE ON Repair_Request
+FOR EACH ROW
+BEGIN
+    DECLARE v_payment_status VARCHAR(20);
+    DECLARE v_payment_amount DECIMAL(8,2);
+
+    IF COALESCE(@disable_summary_triggers, 0) = 0 THEN
+        CALL BumpCounter('total_requests', -1);
+        CALL BumpRequestStatus(OLD.status, -1);
+
+        SELECT p.payment_status, p.payment_amount
+        INTO v_payment_status, v_payment_amount
+        FROM Payment p
+        JOIN Service_Assignment sa ON p.assignment_id = sa.assignment_id
+        WHERE sa.request_id = OLD.request_id;
+
+        IF v_payment_amount IS NOT NULL THEN
+            CALL BumpCounter('total_payments', -1);
+            CALL BumpPaymentStatus(v_payment_status, -1, -v_payment_amount);
+        END IF;
+    END IF;
+END //
+
+-- Also accounts for the Payment row the cascade removes
+CREATE TRIGGER before_assignment_delete_counters
+BEFORE DELETE ON Service_Assignment
+FOR EACH ROW
+BEGIN
+    DECLARE v_payment_status VARCHAR(20);
+    DECLARE v_payment_amount DECIMAL(8,2);
+
+    IF COALESCE(@disable_summary_triggers, 0) = 0 THEN
+        SELECT payment_status, payment_amount
+        INTO v_payment_status, v_payment_amount
+        FROM Payment
+        WHERE assignment_id = OLD.assignment_id;
+
+        IF v_payment_amount IS NOT NULL THEN
+            CALL BumpCounter('total_payments', -1);
+            CALL BumpPaymentStatus(v_payment_status, -1, -v_payment_amount);
+        END IF;
+    END IF;
+END //
+
+CREATE TRIGGER after_payment_insert_counters
+AFTER INSERT ON Payment
+FOR EACH ROW
+BEGIN
+    IF COALESCE(@disable_summary_triggers, 0) = 0 THEN
+        CALL BumpCounter('total_payments', 1);
+        CALL BumpPaymentStatus(NEW.payment_status, 1, NEW.payment_amount);
+    END IF;
+END //
+
+CREATE TRIGGER after_payment_update_counters
+AFTER UPDATE ON Payment
+FOR EACH ROW
+BEGIN
+    IF COALESCE(@disable_summary_triggers, 0) = 0
+       AND (NOT (OLD.payment_status <=> NEW.payment_status) OR OLD.payment_amount <> NEW.payment_amount) THEN
+        CALL BumpPaymentStatus(OLD.payment_status, -1, -OLD.payment_amount);
+        CALL BumpPaymentStatus(NEW.payment_status, 1, NEW.payment_amount);
+    END IF;
+END //
+
+CREATE TRIGGER after_payment_delete_counters
+AFTER DELETE ON Payment
+FOR EACH ROW
+BEGIN
+    IF COALESCE(@disable_summary_triggers, 0) = 0 THEN
+        CALL BumpCounter('total_payments', -1);
+        CALL BumpPaymentStatus(OLD.payment_status, -1, -OLD.payment_amount);
+    END IF;
+END //
+DELIMITER ;
+
+-- ============================================
+-- DASHBOARD READS THE COUNTERS
+-- ============================================
+
+DROP PROCEDURE IF EXISTS GetSystemDashboard;
+
+DELIMITER //
+CREATE PROCEDURE GetSystemDashboard()
+BEGIN
+    -- KPI tiles
+    SELECT
+        (SELECT counter_value FROM System_Counters WHERE counter_name = 'total_users') as total_users,
+        (SELECT counter_value FROM System_Counters WHERE counter_name = 'total_technicians') as total_technicians,
+        (SELECT counter_value FROM System_Counters WHERE counter_name = 'total_requests') as total_requests,
+        COALESCE((SELECT request_count FROM Request_Status_Counts WHERE status = 'pending'), 0) as pending_requests;
+
+    -- Requests by status
+    SELECT status, request_count as count
+    FROM Request_Status_Counts
+    WHERE request_count > 0;
+
+    -- Revenue by service category
+    SELECT sc.category_name, SUM(p.payment_amount) as total_revenue
+    FROM Payment p
+    JOIN Service_Assignment sa ON p.assignment_id = sa.assignment_id
+    JOIN Repair_Request rr ON sa.request_id = rr.request_id
+    JOIN Service_Category sc ON rr.category_id = sc.category_id
+    WHERE p.payment_status = 'completed'
+    GROUP BY sc.category_name;
+
+    -- Recent repair requests
+    SELECT rr.request_id, u.first_name, u.last_name, sc.category_name,
+           rr.status, rr.request_date
+    FROM Repair_Request rr
+    JOIN User u ON rr.customer_id = u.user_id
+    JOIN Service_Category sc ON rr.category_id = sc.category_id
+    ORDER BY rr.request_date DESC
+    LIMIT 10;
+END //
+DELIMITER ;
+
+-- Seed the counters from the existing data
+CALL ReconcileCounters();
@@ -0,0 +1,652 @@
+-- ============================================
+-- MIGRATION 004: MATERIALIZED REPORTING VIEWS
+-- ============================================
+-- Summary tables backing the five reporting views. They hold only the
+-- aggregates, keyed by entity id; names and other descriptive columns are
+-- joined in at read time so edits to User/Location/Service_Category never
+-- leave them stale.
+--
+--   Technician_Rating_View        -> MV_Technician_Rating        (recomputed per technician)
+--   Technician_Earnings_View      -> MV_Technician_Earnings      (recomputed per technician)
+--   Customer_Service_History      -> MV_Customer_Service_History (recomputed per customer)
+--   Popular_Categories_View       -> MV_Popular_Categories       (delta-maintained counts/sums)
+--   Pending_Requests_By_Location  -> MV_Pending_Requests_By_Location (delta-maintained count)
+--
+-- Per-technician and per-customer recomputation touches a few hundred rows
+-- at most; category and location totals span far more rows, so those are
+-- adjusted by deltas instead of recomputed.
+--
+-- As with the dashboard counters, cascaded deletes do not fire triggers, so
+-- BEFORE DELETE triggers on parent tables account for the child rows, and
+-- bulk loaders that SET @disable_summary_triggers = 1 must finish with
+-- CALL RefreshMaterializedViews().
+
+CREATE TABLE MV_Technician_Rating (
+    technician_id INT PRIMARY KEY,
+    rating_average DECIMAL(4,2),
+    total_reviews INT NOT NULL DEFAULT 0,
+    total_jobs_completed INT NOT NULL DEFAULT 0,
+    refreshed_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    KEY idx_mv_technician_rating_refreshed (refreshed_at)
+);
+
+CREATE TABLE MV_Technician_Earnings (
+    technician_id INT PRIMARY KEY,
+    total_assignments INT NOT NULL DEFAULT 0,
+    completed_jobs INT NOT NULL DEFAULT 0,
+    total_earnings DECIMAL(12,2) NOT NULL DEFAULT 0.00,
+    avg_job_cost DECIMAL(10,2),
+    refreshed_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    KEY idx_mv_technician_earnings_refreshed (refreshed_at)
+);
+
+CREATE TABLE MV_Customer_Service_History (
+    user_id INT PRIMARY KEY,
+    total_requests INT NOT NULL DEFAULT 0,
+    completed_requests INT NOT NULL DEFAULT 0,
+    total_spent DECIMAL(12,2),
+    refreshed_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    KEY idx_mv_customer_history_refreshed (refreshed_at)
+);
+
+CREATE TABLE MV_Popular_Categories (
+    category_id INT PRIMARY KEY,
+    total_requests BIGINT NOT NULL DEFAULT 0,
+    rating_sum BIGINT NOT NULL DEFAULT 0,
+    rating_count BIGINT NOT NULL DEFAULT 0,
+    refreshed_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    KEY idx_mv_popular_categories_refreshed (refreshed_at)
+);
+
+CREATE TABLE MV_Pending_Requests_By_Location (
+    location_id INT PRIMARY KEY,
+    pending_requests BIGINT NOT NULL DEFAULT 0,
+    refreshed_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    KEY idx_mv_pending_location_refreshed (refreshed_at)
+);
+
+-- Technicians whose summaries must be recomputed once a cascading delete completes
+CREATE TABLE MV_Stale_Technicians (
+    technician_id INT PRIMARY KEY
+);
+
+-- Last full rebuild per summary table
+CREATE TABLE MV_Refresh_Log (
+    view_name VARCHAR(64) PRIMARY KEY,
+    last_full_refresh DATETIME NOT NULL
+);
+
+-- ============================================
+-- REFRESH PROCEDURES
+-- ============================================
+
+DELIMITER //
+CREATE PROCEDURE RefreshTechnicianSummaries(IN p_technician_id INT)
+BEGIN
+    DELETE FROM MV_Technician_Rating WHERE technician_id = p_technician_id;
+    INSERT INTO MV_Technician_Rating (technician_id, rating_average, total_reviews, total_jobs_completed)
+    SELECT
+        t.technician_id,
+        ROUND(AVG(r.technician_rating), 2),
+        COUNT(r.review_id),
+        COUNT(sa.assignment_id)
+    FROM Technician t
+    JOIN Service_Assignment sa ON t.technician_id = sa.technician_id
+    LEFT JOIN Review r ON sa.assignment_id = r.assignment_id
+    WHERE t.technician_id = p_technician_id
+        AND sa.assignment_status = 'completed'
+    GROUP BY t.technician_id;
+
+    DELETE FROM MV_Technician_Earnings WHERE technician_id = p_technician_id;
+    INSERT INTO MV_Technician_Earnings (technician_id, total_assignments, completed_jobs, total_earnings, avg_job_cost)
+    SELECT
+        t.technician_id,
+        COUNT(sa.assignment_id),
+        COUNT(CASE WHEN sa.assignment_status = 'completed' THEN 1 END),
+        SUM(CASE WHEN sa.assignment_status = 'completed' THEN sa.service_cost ELSE 0 END),
+        ROUND(AVG(CASE WHEN sa.assignment_status = 'completed' THEN sa.service_cost END), 2)
+    FROM Technician t
+    LEFT JOIN Service_Assignment sa ON t.technician_id = sa.technician_id
+    WHERE t.technician_id = p_technician_id
+    GROUP BY t.technician_id;
+END //
+
+CREATE PROCEDURE RefreshCustomerHistory(IN p_user_id INT)
+BEGIN
+    DELETE FROM MV_Customer_Service_History WHERE user_id = p_user_id;
+    INSERT INTO MV_Customer_Service_History (user_id, total_requests, completed_requests, total_spent)
+    SELECT
+        u.user_id,
+        COUNT(rr.request_id),
+        COUNT(CASE WHEN sa.assignment_status = 'completed' THEN 1 END),
+        SUM(p.payment_amount)
+    FROM User u
+    LEFT JOIN Repair_Request rr ON u.user_id = rr.customer_id
+    LEFT JOIN Service_Assignment sa ON rr.request_id = sa.request_id
+    LEFT JOIN Payment p ON sa.assignment_id = p.assignment_id
+    WHERE u.user_id = p_user_id
+        AND u.user_type = 'customer'
+    GROUP BY u.user_id;
+END //
+
+CREATE PROCEDURE RefreshStaleTechnicians()
+BEGIN
+    DECLARE v_technician_id INT;
+    DECLARE v_done INT DEFAULT 0;
+    DECLARE stale_cursor CURSOR FOR SELECT technician_id FROM MV_Stale_Technicians;
+    DECLARE CONTINUE HANDLER FOR NOT FOUND SET v_done = 1;
+
+    OPEN stale_cursor;
+    stale_loop: LOOP
+        FETCH stale_cursor INTO v_technician_id;
+        IF v_done = 1 THEN
+            LEAVE stale_loop;
+        END IF;
+        CALL RefreshTechnicianSummaries(v_technician_id);
+        DELETE FROM MV_Stale_Technicians WHERE technician_id = v_technician_id;
+    END LOOP;
+    CLOSE stale_cursor;
+END //
+
+CREATE PROCEDURE BumpCategoryStats(
+    IN p_category_id INT,
+    IN p_request_delta BIGINT,
+    IN p_rating_sum_delta BIGINT,
+    IN p_rating_count_delta BIGINT
+)
+BEGIN
+    INSERT INTO MV_Popular_Categories (category_id, total_requests, rating_sum, rating_count)
+    VALUES (p_category_id, p_request_delta, p_rating_sum_delta, p_rating_count_delta)
+    ON DUPLICATE KEY UPDATE total_requests = total_requests + p_request_delta,
+                            rating_sum = rating_sum + p_rating_sum_delta,
+                            rating_count = rating_count + p_rating_count_delta;
+END //
+
+CREATE PROCEDURE BumpLocationPending(IN p_location_id INT, IN p_delta BIGINT)
+BEGIN
+    INSERT INTO MV_Pending_Requests_By_Location (location_id, pending_requests)
+    VALUES (p_location_id, p_delta)
+    ON DUPLICATE KEY UPDATE pending_requests = pending_requests + p_delta;
+END //
+
+-- Full rebuild of every summary table from the base tables
+CREATE PROCEDURE RefreshMaterializedViews()
+BEGIN
+    START TRANSACTION;
+
+    DELETE FROM MV_Technician_Rating;
+    INSERT INTO MV_Technician_Rating (technician_id, rating_average, total_reviews, total_jobs_completed)
+    SELECT
+        t.technician_id,
+        ROUND(AVG(r.technician_rating), 2),
+        COUNT(r.review_id),
+        COUNT(sa.assignment_id)
+    FROM Technician t
+    JOIN Service_Assignment sa ON t.technician_id = sa.technician_id
+    LEFT JOIN Review r ON sa.assignment_id = r.assignment_id
+    WHERE sa.assignment_status = 'completed'
+    GROUP BY t.technician_id;
+
+    DELETE FROM MV_Technician_Earnings;
+    INSERT INTO MV_Technician_Earnings (technician_id, total_assignments, completed_jobs, total_earnings, avg_job_cost)
+    SELECT
+        t.technician_id,
+        COUNT(sa.assignment_id),
+        COUNT(CASE WHEN sa.assignment_status = 'completed' THEN 1 END),
+        SUM(CASE WHEN sa.assignment_status = 'completed' THEN sa.service_cost ELSE 0 END),
+        ROUND(AVG(CASE WHEN sa.assignment_status = 'completed' THEN sa.service_cost END), 2)
+    FROM Technician t
+    LEFT JOIN Service_Assignment sa ON t.technician_id = sa.technician_id
+    GROUP BY t.technician_id;
+
+    DELETE FROM MV_Customer_Service_History;
+    INSERT INTO MV_Customer_Service_History (user_id, total_requests, completed_requests, total_spent)
+    SELECT
+        rr.customer_id,
+        COUNT(rr.request_id),
+        COUNT(CASE WHEN sa.assignment_status = 'completed' THEN 1 END),
+        SUM(p.payment_amount)
+    FROM Repair_Request rr
+    JOIN User u ON rr.customer_id = u.user_id
+    LEFT JOIN Service_Assignment sa ON rr.request_id = sa.request_id
+    LEFT JOIN Payment p ON sa.assignment_id = p.assignment_id
+    WHERE u.user_type = 'customer'
+    GROUP BY rr.customer_id;
+
+    DELETE FROM MV_Popular_Categories;
+    INSERT INTO MV_Popular_Categories (category_id, total_requests, rating_sum, rating_count)
+    SELECT
+        rr.category_id,
+        COUNT(rr.request_id),
+        COALESCE(SUM(r.customer_rating), 0),
+        COUNT(r.customer_rating)
+    FROM Repair_Request rr
+    LEFT JOIN Service_Assignment sa ON rr.request_id = sa.request_id
+    LEFT JOIN Review r ON sa.assignment_id = r.assignment_id
+    GROUP BY rr.category_id;
+
+    DELETE FROM MV_Pending_Requests_By_Location;
+    INSERT INTO MV_Pending_Requests_By_Location (location_id, pending_requests)
+    SELECT u.location_id, COUNT(rr.request_id)
+    FROM Repair_Request rr
+    JOIN User u ON rr.customer_id = u.user_id
+    WHERE rr.status IN ('pending', 'assigned')
+    GROUP BY u.location_id;
+
+    DELETE FROM MV_Stale_Technicians;
+
+    INSERT INTO MV_Refresh_Log (view_name, last_full_refresh) VALUES
+        ('Technician_Rating_View', NOW()),
+        ('Technician_Earnings_View', NOW()),
+        ('Customer_Service_History', NOW()),
+        ('Popular_Categories_View', NOW()),
+        ('Pending_Requests_By_Location', NOW())
+    ON DUPLICATE KEY UPDATE last_full_refresh = VALUES(last_full_refresh);
+
+    COMMIT;
+
+    SELECT 'Materialized views rebuilt' AS message;
+END //
+DELIMITER ;
+
+-- ============================================
+-- INCREMENTAL REFRESH TRIGGERS
+-- ============================================
+
+DELIMITER //
+-- Repair_Request: category/location deltas, customer history
+CREATE TRIGGER after_request_insert_mv
+AFTER INSERT ON Repair_Request
+FOR EACH ROW
+BEGIN
+    IF COALESCE(@disable_summary_triggers, 0) = 0 THEN
+        CALL BumpCategoryStats(NEW.category_id, 1, 0, 0);
+        IF NEW.status IN ('pending', 'assigned') THEN
+            CALL BumpLocationPending((SELECT location_id FROM User WHERE user_id = NEW.customer_id), 1);
+        END IF;
+        CALL RefreshCustomerHistory(NEW.customer_id);
+    END IF;
+END //
+
+CREATE TRIGGER after_request_update_mv
+AFTER UPDATE ON Repair_Request
+FOR EACH ROW
+BEGIN
+    DECLARE v_rating INT;
+    DECLARE v_old_pending INT;
+    DECLARE v_new_pending INT;
+
+    IF COALESCE(@disable_summary_triggers, 0) = 0 THEN
+        SET v_old_pending = COALESCE(OLD.status IN ('pending', 'assigned'), 0);
+        SET v_new_pending = COALESCE(NEW.status IN ('pending', 'assigned'), 0);
+
+        IF OLD.category_id <> NEW.category_id THEN
+            SET v_rating = (
+                SELECT r.customer_rating
+                FROM Service_Assignment sa
+                JOIN Review r ON sa.assignment_id = r.assignment_id
+                WHERE sa.request_id = NEW.request_id
+            );
+            CALL BumpCategoryStats(OLD.category_id, -1, -COALESCE(v_rating, 0), -(v_rating IS NOT NULL));
+            CALL BumpCategoryStats(NEW.category_id, 1, COALESCE(v_rating, 0), (v_rating IS NOT NULL));
+        END IF;
+
+        IF v_old_pending <> v_new_pending OR OLD.customer_id <> NEW.customer_id THEN
+            IF v_old_pending = 1 THEN
+                CALL BumpLocationPending((SELECT location_id FROM User WHERE user_id = OLD.customer_id), -1);
+            END IF;
+            IF v_new_pending = 1 THEN
+                CALL BumpLocationPending((SELECT location_id FROM User WHERE user_id = NEW.customer_id), 1);
+            END IF;
+        END IF;
+
+        IF OLD.customer_id <> NEW.customer_id THEN
+            CALL RefreshCustomerHistory(OLD.customer_id);
+            CALL RefreshCustomerHistory(NEW.customer_id);
+        END IF;
+    END IF;
+END //
+
+-- Also accounts for the assignment/review rows the cascade removes
+CREATE TRIGGER before_request_delete_mv
+BEFORE DELETE ON Repair_Request
+FOR EACH ROW
+BEGIN
+    DECLARE v_rating INT;
+
+    IF COALESCE(@disable_summary_triggers, 0) = 0 THEN
+        SET v_rating = (
+            SELECT r.customer_rating
+            FROM Service_Assignment sa
+            JOIN Review r ON sa.assignment_id = r.assignment_id
+            WHERE sa.request_id = OLD.request_id
+        );
+        CALL BumpCategoryStats(OLD.category_id, -1, -COALESCE(v_rating, 0), -(v_rating IS NOT NULL));
+
+        IF OLD.status IN ('pending', 'assigned') THEN
+            CALL BumpLocationPending((SELECT location_id FROM User WHERE user_id = OLD.customer_id), -1);
+        END IF;
+
+        INSERT IGNORE INTO MV_Stale_Technicians (technician_id)
+        SELECT technician_id FROM Service_Assignment WHERE request_id = OLD.request_id;
+    END IF;
+END //
+
+CREATE TRIGGER after_request_delete_mv
+AFTER DELETE ON Repair_Request
+FOR EACH ROW
+BEGIN
+    IF COALESCE(@disable_summary_triggers, 0) = 0 THEN
+        CALL RefreshCustomerHistory(OLD.customer_id);
+        CALL RefreshStaleTechnicians();
+    END IF;
+END //
+
+-- Service_Assignment: technician summaries, customer history
+CREATE TRIGGER after_assignment_insert_mv
+AFTER INSERT ON Service_Assignment
+FOR EACH ROW
+BEGIN
+    IF COALESCE(@disable_summary_triggers, 0) = 0 THEN
+        CALL RefreshTechnicianSummaries(NEW.technician_id);
+        CALL RefreshCustomerHistory((SELECT customer_id FROM Repair_Request WHERE request_id = NEW.request_id));
+    END IF;
+END //
+
+CREATE TRIGGER after_assignment_update_mv
+AFTER UPDATE ON Service_Assignment
+FOR EACH ROW
+BEGIN
+    IF COALESCE(@disable_summary_triggers, 0) = 0 THEN
+        CALL RefreshTechnicianSummaries(NEW.technician_id);
+        IF OLD.technician_id <> NEW.technician_id THEN
+            CALL RefreshTechnicianSummaries(OLD.technician_id);
+        END IF;
+        IF NOT (OLD.assignment_status <=> NEW.assignment_status) OR OLD.request_id <> NEW.request_id THEN
+            CALL RefreshCustomerHistory((SELECT customer_id FROM Repair_Request WHERE request_id = NEW.request_id));
+        END IF;
+        IF OLD.request_id <> NEW.request_id THEN
+            CALL RefreshCustomerHistory((SELECT customer_id FROM Repair_Request WHERE request_id = OLD.request_id));
+        END IF;
+    END IF;
+END //
+
+-- Also accounts for the review row the cascade removes
+CREATE TRIGGER before_assignment_delete_mv
+BEFORE DELETE ON Service_Assignment
+FOR EACH ROW
+BEGIN
+    DECLARE v_rating INT;
+
+    IF COALESCE(@disable_summary_triggers, 0) = 0 THEN
+        SET v_rating = (SELECT customer_rating FROM Review WHERE assignment_id = OLD.assignment_id);
+        IF v_rating IS NOT NULL THEN
+            CALL BumpCategoryStats((SELECT category_id FROM Repair_Request WHERE request_id = OLD.request_id),
+                                   0, -v_rating, -1);
+        END IF;
+    END IF;
+END //
+
+CREATE TRIGGER after_assignment_delete_mv
+AFTER DELETE ON Service_Assignment
+FOR EACH ROW
+BEGIN
+    IF COALESCE(@disable_summary_triggers, 0) = 0 THEN
+        CALL RefreshTechnicianSummaries(OLD.technician_id);
+        CALL RefreshCustomerHistory((SELECT customer_id FROM Repair_Request WHERE request_id = OLD.request_id));
+    END IF;
+END //
+
+-- Review: category rating deltas, technician rating
+CREATE TRIGGER after_review_insert_mv
+AFTER INSERT ON Review
+FOR EACH ROW
+BEGIN
+    IF COALESCE(@disable_summary_triggers, 0) = 0 THEN
+        IF NEW.customer_rating IS NOT NULL THEN
+            CALL BumpCategoryStats((
+                SELECT rr.category_id
+                FROM Service_Assignment sa
+                JOIN Repair_Request rr ON sa.request_id = rr.request_id
+                WHERE sa.assignment_id = NEW.assignment_id
+            ), 0, NEW.customer_rating, 1);
+        END IF;
+        CALL RefreshTechnicianSummaries((SELECT technician_id FROM Service_Assignment WHERE assignment_id = NEW.assignment_id));
+    END IF;
+END //
+
+CREATE TRIGGER after_review_update_mv
+AFTER UPDATE ON Review
+FOR EACH ROW
+BEGIN
+    IF COALESCE(@disable_summary_triggers, 0) = 0 THEN
+        IF NOT (OLD.customer_rating <=> NEW.customer_rating) OR OLD.assignment_id <> NEW.assignment_id THEN
+            CALL BumpCategoryStats((
+                SELECT rr.category_id
+                FROM Service_Assignment sa
+                JOIN Repair_Request rr ON sa.request_id = rr.request_id
+                WHERE sa.assignment_id = OLD.assignment_id
+            ), 0, -COALESCE(OLD.customer_rating, 0), -(OLD.customer_rating IS NOT NULL));
+            CALL BumpCategoryStats((
+                SELECT rr.category_id
+                FROM Service_Assignment sa
+                JOIN Repair_Request rr ON sa.request_id = rr.request_id
+                WHERE sa.assignment_id = NEW.assignment_id
+            ), 0, COALESCE(NEW.customer_rating, 0), (NEW.customer_rating IS NOT NULL));
+        END IF;
+        CALL RefreshTechnicianSummaries((SELECT technician_id FROM Service_Assignment WHERE assignment_id = NEW.assignment_id));
+        IF OLD.assignment_id <> NEW.assignment_id THEN
+            CALL RefreshTechnicianSummaries((SELECT technician_id FROM Service_Assignment WHERE assignment_id = OLD.assignment_id));
+        END IF;
+    END IF;
+END //
+
+CREATE TRIGGER after_review_delete_mv
+AFTER DELETE ON Review
+FOR EACH ROW
+BEGIN
+    IF COALESCE(@disable_summary_triggers, 0) = 0 THEN
+        IF OLD.customer_rating IS NOT NULL THEN
+            CALL BumpCategoryStats((
+                SELECT rr.category_id
+                FROM Service_Assignment sa
+                JOIN Repair_Request rr ON sa.request_id = rr.request_id
+                WHERE sa.assignment_id = OLD.assignment_id
+            ), 0, -OLD.customer_rating, -1);
+        END IF;
+        CALL RefreshTechnicianSummaries((SELECT technician_id FROM Service_Assignment WHERE assignment_id = OLD.assignment_id));
+    END IF;
+END //
+
+-- Payment: customer spend
+CREATE TRIGGER after_payment_insert_mv
+AFTER INSERT ON Payment
+FOR EACH ROW
+BEGIN
+    IF COALESCE(@disable_summary_triggers, 0) = 0 THEN
+        CALL RefreshCustomerHistory((
+            SELECT rr.customer_id
+            FROM Service_Assignment sa
+            JOIN Repair_Request rr ON sa.request_id = rr.request_id
+            WHERE sa.assignment_id = NEW.assignment_id
+        ));
+    END IF;
+END //
+
+CREATE TRIGGER after_payment_update_mv
+AFTER UPDATE ON Payment
+FOR EACH ROW
+BEGIN
+    IF COALESCE(@disable_summary_triggers, 0) = 0 THEN
+        CALL RefreshCustomerHistory((
+            SELECT rr.customer_id
+            FROM Service_Assignment sa
+            JOIN Repair_Request rr ON sa.request_id = rr.request_id
+            WHERE sa.assignment_id = NEW.assignment_id
+        ));
+    END IF;
+END //
+
+CREATE TRIGGER after_payment_delete_mv
+AFTER DELETE ON Payment
+FOR EACH ROW
+BEGIN
+    IF COALESCE(@disable_summary_triggers, 0) = 0 THEN
+        CALL RefreshCustomerHistory((
+            SELECT rr.customer_id
+            FROM Service_Assignment sa
+            JOIN Repair_Request rr ON sa.request_id = rr.request_id
+            WHERE sa.assignment_id = OLD.assignment_id
+        ));
+    END IF;
+END //
+
+-- Technician: earnings rows exist for every technician
+CREATE TRIGGER after_technician_insert_mv
+AFTER INSERT ON Technician
+FOR EACH ROW
+BEGIN
+    IF COALESCE(@disable_summary_triggers, 0) = 0 THEN
+        CALL RefreshTechnicianSummaries(NEW.technician_id);
+    END IF;
+END //
+
+CREATE TRIGGER after_technician_delete_mv
+AFTER DELETE ON Technician
+FOR EACH ROW
+BEGIN
+    IF COALESCE(@disable_summary_triggers, 0) = 0 THEN
+        CALL RefreshTechnicianSummaries(OLD.technician_id);
+    END IF;
+END //
+
+-- User: moving a customer moves their pending requests between locations
+CREATE TRIGGER after_user_update_mv
+AFTER UPDATE ON User
+FOR EACH ROW
+BEGIN
+    DECLARE v_pending BIGINT;
+
+    IF COALESCE(@disable_summary_triggers, 0) = 0 THEN
+        IF OLD.location_id <> NEW.location_id THEN
+            SET v_pending = (
+                SELECT COUNT(*) FROM Repair_Request
+                WHERE customer_id = NEW.user_id AND status IN ('pending', 'assigned')
+            );
+            IF v_pending > 0 THEN
+                CALL BumpLocationPending(OLD.location_id, -v_pending);
+                CALL BumpLocationPending(NEW.location_id, v_pending);
+            END IF;
+        END IF;
+        IF NOT (OLD.user_type <=> NEW.user_type) THEN
+            CALL RefreshCustomerHistory(NEW.user_id);
+        END IF;
+    END IF;
+END //
+
+-- Also accounts for the requests, assignments and technician row the cascade removes
+CREATE TRIGGER before_user_delete_mv
+BEFORE DELETE ON User
+FOR EACH ROW
+BEGIN
+    IF COALESCE(@disable_summary_triggers, 0) = 0 THEN
+        UPDATE MV_Popular_Categories m
+        JOIN (
+            SELECT rr.category_id, COUNT(*) as request_count,
+                   COALESCE(SUM(r.customer_rating), 0) as rating_sum, COUNT(r.customer_rating) as rating_count
+            FROM Repair_Request rr
+            LEFT JOIN Service_Assignment sa ON rr.request_id = sa.request_id
+            LEFT JOIN Review r ON sa.assignment_id = r.assignment_id
+            WHERE rr.customer_id = OLD.user_id
+            GROUP BY rr.category_id
+        ) removed ON m.category_id = removed.category_id
+        SET m.total_requests = m.total_requests - removed.request_count,
+            m.rating_sum = m.rating_sum - removed.rating_sum,
+            m.rating_count = m.rating_count - removed.rating_count;
+
+        CALL BumpLocationPending(OLD.location_id, -(
+            SELECT COUNT(*) FROM Repair_Request
+            WHERE customer_id = OLD.user_id AND status IN ('pending', 'assigned')
+        ));
+
+        INSERT IGNORE INTO MV_Stale_Technicians (technician_id)
+        SELECT sa.technician_id
+        FROM Service_Assignment sa
+        JOIN Repair_Request rr ON sa.request_id = rr.request_id
+        WHERE rr.customer_id = OLD.user_id
+        UNION
+        SELECT technician_id FROM Technician WHERE user_id = OLD.user_id;
+    END IF;
+END //
+
+CREATE TRIGGER after_user_delete_mv
+AFTER DELETE ON User
+FOR EACH ROW
+BEGIN
+    IF COALESCE(@disable_summary_triggers, 0) = 0 THEN
+        DELETE FROM MV_Customer_Service_History WHERE user_id = OLD.user_id;
+        CALL RefreshStaleTechnicians();
+    END IF;
+END //
+DELIMITER ;
+
+-- ============================================
+-- TECHNICIAN DASHBOARD READS THE SUMMARIES
+-- ============================================
+
+DROP PROCEDURE IF EXISTS GetTechnicianDashboard;
+
+DELIMITER //
+CREATE PROCEDURE GetTechnicianDashboard(IN p_technician_id INT)
+BEGIN
+    -- Basic info
+    SELECT
+        t.technician_id,
+        CONCAT(u.first_name, ' ', u.last_name) as name,
+        u.email,
+        u.phone_number,
+        t.experience_years,
+        t.availability_status,
+        COALESCE(mtr.rating_average, 0) as rating,
+        COALESCE(mtr.total_reviews, 0) as total_reviews
+    FROM Technician t
+    JOIN User u ON t.user_id = u.user_id
+    LEFT JOIN MV_Technician_Rating mtr ON t.technician_id = mtr.technician_id
+    WHERE t.technician_id = p_technician_id;
+
+    -- Earnings summary
+    SELECT
+        t.technician_id,
+        u.first_name,
+        u.last_name,
+        mte.total_assignments,
+        mte.completed_jobs,
+        mte.total_earnings,
+        mte.avg_job_cost
+    FROM Technician t
+    JOIN User u ON t.user_id = u.user_id
+    JOIN MV_Technician_Earnings mte ON t.technician_id = mte.technician_id
+    WHERE t.technician_id = p_technician_id;
+
+    -- Recent assignments
+    SELECT
+        sa.assignment_id,
+        rr.request_id,
+        CONCAT(cu.first_name, ' ', cu.last_name) as customer_name,
+        sc.category_name,
+        rr.issue_description,
+        sa.assignment_date,
+        sa.assignment_status,
+        sa.service_cost
+    FROM Service_Assignment sa
+    JOIN Repair_Request rr ON sa.request_id = rr.request_id
+    JOIN User cu ON rr.customer_id = cu.user_id
+    JOIN Service_Category sc ON rr.category_id = sc.category_id
+    WHERE sa.technician_id = p_technician_id
+    ORDER BY sa.assignment_date DESC
+    LIMIT 10;
+END //
+DELIMITER ;
+
+-- Populate the summaries from the existing data
+CALL RefreshMaterializedViews();
@@ -0,0 +1,18 @@
+-- ============================================
+-- MIGRATION 005: INDEXES FOR THE TYPE-AHEAD USER SEARCH
+-- ============================================
+-- The customer, technician and request pickers in app.py (search_condition)
+-- match a single search word as a prefix of each column:
+--   first_name LIKE 'jo%' OR last_name LIKE 'jo%' OR email LIKE 'jo%' OR phone_number LIKE 'jo%'
+-- With one index per column MySQL answers this with an index_merge union of
+-- four short ranges instead of scanning User. Names are indexed on a prefix
+-- of the column: nobody types more than 20 characters into a picker.
+-- (email already has its UNIQUE index)
+CREATE INDEX idx_user_first_name ON User (first_name(20));
+CREATE INDEX idx_user_last_name ON User (last_name(20));
+CREATE INDEX idx_user_phone ON User (phone_number);
+
+-- Searches of several words ("john smi") use
+--   MATCH(first_name, last_name, email) AGAINST ('+john* +smi*' IN BOOLEAN MODE)
+-- Words shorter than innodb_ft_min_token_size (default 3) are ignored by it.
+CREATE FULLTEXT INDEX ft_user_search ON User (first_name, last_name, email);
@@ -0,0 +1,99 @@
+-- ============================================
+-- MIGRATION 006: ATOMIC TECHNICIAN ASSIGNMENT
+-- ============================================
+-- AssignTechnicianToRequest used to run three autocommitted statements,
+-- including an UPDATE of Repair_Request that after_assignment_insert
+-- already performs, and nothing stopped two dispatchers from booking the
+-- same technician at once.
+--
+-- AssignTechnicianLocked does the work without transaction control, so it
+-- can also run inside a caller's transaction (e.g. a batch of assignments).
+-- It locks the technician and the request with SELECT ... FOR UPDATE, so a
+-- concurrent assignment of either waits and then sees it is taken.
+-- AssignTechnicianToRequest wraps it in one transaction and is what the
+-- app calls.
+
+DROP PROCEDURE IF EXISTS AssignTechnicianToRequest;
+
+DELIMITER //
+CREATE PROCEDURE AssignTechnicianLocked(
+    IN p_request_id INT,
+    IN p_technician_id INT,
+    IN p_service_cost DECIMAL(8,2),
+    IN p_estimated_completion DATE,
+    OUT p_assignment_id INT
+)
+BEGIN
+    DECLARE v_availability VARCHAR(20);
+    DECLARE v_request_status VARCHAR(20);
+
+    SELECT availability_status INTO v_availability
+    FROM Technician
+    WHERE technician_id = p_technician_id
+    FOR UPDATE;
+
+    IF v_availability IS NULL THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Technician not found';
+    ELSEIF v_availability <> 'available' THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Technician is not available';
+    END IF;
+
+    SELECT status INTO v_request_status
+    FROM Repair_Request
+    WHERE request_id = p_request_id
+    FOR UPDATE;
+
+    IF v_request_status IS NULL THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Repair request not found';
+    ELSEIF v_request_status <> 'pending' THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Repair request is not pending';
+    END IF;
+
+    -- after_assignment_insert moves the request to 'assigned'
+    INSERT INTO Service_Assignment (
+        request_id,
+        technician_id,
+        assignment_date,
+        estimated_completion_date,
+        assignment_status,
+        service_cost
+    ) VALUES (
+        p_request_id,
+        p_technician_id,
+        NOW(),
+        COALESCE(p_estimated_completion, DATE_ADD(CURDATE(), INTERVAL 3 DAY)),
+        'assigned',
+        p_service_cost
+    );
+    SET p_assignment_id = LAST_INSERT_ID();
+
+    UPDATE Technician
+    SET availability_status = 'busy'
+    WHERE technician_id = p_technician_id;
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE PROCEDURE AssignTechnicianToRequest(
+    IN p_request_id INT,
+    IN p_technician_id INT,
+    IN p_service_cost DECIMAL(8,2),
+    IN p_estimated_completion DATE
+)
+BEGIN
+    DECLARE v_assignment_id INT;
+
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    START TRANSACTION;
+    CALL AssignTechnicianLocked(p_request_id, p_technician_id, p_service_cost,
+                                p_estimated_completion, v_assignment_id);
+    COMMIT;
+
+    SELECT 'Assignment created successfully' AS message, v_assignment_id AS assignment_id;
+END //
+DELIMITER ;
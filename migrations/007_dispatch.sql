@@ -0,0 +1,107 @@
+-- ============================================
+-- MIGRATION 007: BATCH DISPATCH
+-- ============================================
+-- Category_Specialization records which technician specializations can
+-- serve each service category; the dispatcher in dispatch.py matches
+-- pending requests to available technicians through it.
+--
+-- DispatchAssignments commits a whole dispatch plan. The caller fills the
+-- session's TEMPORARY TABLE Dispatch_Plan and calls it inside its own
+-- transaction, so the batch commits or rolls back as one unit. Each row
+-- goes through AssignTechnicianLocked (migration 006); rows whose
+-- technician or request was taken since the plan was computed are skipped
+-- with the reason, the rest are assigned.
+
+CREATE TABLE Category_Specialization (
+    category_id INT NOT NULL,
+    specialization VARCHAR(50) NOT NULL,
+    PRIMARY KEY (category_id, specialization),
+    INDEX idx_category_specialization (specialization),
+    FOREIGN KEY (category_id) REFERENCES Service_Category(category_id) ON DELETE CASCADE
+);
+
+-- Every category can be served by a specialization of the same name
+INSERT INTO Category_Specialization (category_id, specialization)
+SELECT category_id, LEFT(category_name, 50) FROM Service_Category;
+
+INSERT IGNORE INTO Category_Specialization (category_id, specialization)
+SELECT sc.category_id, m.specialization
+FROM Service_Category sc
+JOIN (
+    SELECT 'Smartphone Screen Repair' AS category_name, 'Smartphone Repair' AS specialization
+    UNION ALL SELECT 'Smartphone Screen Repair', 'iPhone Repair'
+    UNION ALL SELECT 'Mobile Battery Replacement', 'Smartphone Repair'
+    UNION ALL SELECT 'Mobile Battery Replacement', 'iPhone Repair'
+    UNION ALL SELECT 'Mobile Battery Replacement', 'Mobile Accessories'
+    UNION ALL SELECT 'Tablet Repair', 'Smartphone Repair'
+    UNION ALL SELECT 'Laptop Hardware Repair', 'Laptop Repair'
+    UNION ALL SELECT 'Laptop Hardware Repair', 'MacBook Repair'
+    UNION ALL SELECT 'Laptop Screen Replacement', 'Laptop Repair'
+    UNION ALL SELECT 'Laptop Screen Replacement', 'MacBook Repair'
+    UNION ALL SELECT 'Desktop PC Repair', 'Desktop Repair'
+    UNION ALL SELECT 'Clothing Alteration', 'Tailoring'
+    UNION ALL SELECT 'Dress Tailoring', 'Tailoring'
+    UNION ALL SELECT 'Dress Tailoring', 'Dress Making'
+    UNION ALL SELECT 'Dress Tailoring', 'Embroidery'
+    UNION ALL SELECT 'Blouse Stitching', 'Tailoring'
+    UNION ALL SELECT 'Blouse Stitching', 'Dress Making'
+    UNION ALL SELECT 'Blouse Stitching', 'Embroidery'
+    UNION ALL SELECT 'Curtain Stitching', 'Tailoring'
+    UNION ALL SELECT 'Furniture Restoration', 'Furniture Repair'
+    UNION ALL SELECT 'Furniture Restoration', 'Wood Polishing'
+    UNION ALL SELECT 'Wood Furniture Polishing', 'Wood Polishing'
+    UNION ALL SELECT 'Wood Furniture Polishing', 'Furniture Restoration'
+    UNION ALL SELECT 'Sofa Upholstery', 'Sofa Repair'
+    UNION ALL SELECT 'Sofa Upholstery', 'Chair Upholstery'
+    UNION ALL SELECT 'Chair Repair', 'Chair Upholstery'
+    UNION ALL SELECT 'Chair Repair', 'Furniture Repair'
+) m ON sc.category_name = m.category_name;
+
+-- ============================================
+-- DISPATCH PROCEDURE
+-- ============================================
+-- Expects, in the calling session:
+--   CREATE TEMPORARY TABLE Dispatch_Plan (
+--       plan_order INT PRIMARY KEY, request_id INT NOT NULL, technician_id INT NOT NULL,
+--       service_cost DECIMAL(8,2) NOT NULL, assignment_id INT NULL, skipped_reason VARCHAR(255) NULL)
+-- with plan_order numbered 1..n.
+
+DELIMITER //
+CREATE PROCEDURE DispatchAssignments()
+BEGIN
+    DECLARE v_total INT;
+    DECLARE v_position INT DEFAULT 0;
+    DECLARE v_request_id INT;
+    DECLARE v_technician_id INT;
+    DECLARE v_service_cost DECIMAL(8,2);
+    DECLARE v_assignment_id INT;
+    DECLARE v_error VARCHAR(255);
+
+    SELECT COUNT(*) INTO v_total FROM Dispatch_Plan;
+
+    WHILE v_position < v_total DO
+        SET v_position = v_position + 1;
+        SELECT request_id, technician_id, service_cost
+        INTO v_request_id, v_technician_id, v_service_cost
+        FROM Dispatch_Plan
+        WHERE plan_order = v_position;
+
+        BEGIN
+            -- Refused by AssignTechnicianLocked (taken since planning), or a duplicate assignment
+            DECLARE EXIT HANDLER FOR SQLSTATE '45000', 1062
+            BEGIN
+                GET DIAGNOSTICS CONDITION 1 v_error = MESSAGE_TEXT;
+                UPDATE Dispatch_Plan SET skipped_reason = v_error WHERE plan_order = v_position;
+            END;
+
+            SET v_assignment_id = NULL;
+            CALL AssignTechnicianLocked(v_request_id, v_technician_id, v_service_cost, NULL, v_assignment_id);
+            UPDATE Dispatch_Plan SET assignment_id = v_assignment_id WHERE plan_order = v_position;
+        END;
+    END WHILE;
+
+    SELECT plan_order, request_id, technician_id, assignment_id, skipped_reason
+    FROM Dispatch_Plan
+    ORDER BY plan_order;
+END //
+DELIMITER ;
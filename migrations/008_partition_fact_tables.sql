@@ -0,0 +1,622 @@
+-- ============================================
+-- MIGRATION 008: MONTHLY PARTITIONS FOR THE FACT TABLES
+-- ============================================
+-- Repair_Request, Service_Assignment and Payment are RANGE partitioned by
+-- month on request_date, assignment_date and payment_date. Queries bounded
+-- on those columns only read the months they need, and old months can be
+-- moved out whole (ArchivePartitions) instead of deleted row by row.
+--
+-- MySQL requires every unique key of a partitioned table to include the
+-- partitioning column, and InnoDB partitioned tables can neither have nor
+-- be the target of foreign keys. So:
+--   * the primary keys become (id, date); ids stay AUTO_INCREMENT and unique
+--   * Service_Assignment.request_id and Payment.assignment_id lose their
+--     UNIQUE index; the *_keys triggers refuse a second row (error 1062),
+--     looking for it with a locking read so concurrent transactions see
+--     each other's committed rows
+--   * the foreign keys into, out of and between these tables are dropped;
+--     the *_keys triggers check the parent rows (error 1452), refuse to
+--     delete referenced Technician/Service_Category rows (error 1451), and
+--     the *_cascade triggers delete the children of a deleted row
+-- The triggers honour SET FOREIGN_KEY_CHECKS = 0 like real foreign keys.
+--
+-- A foreign key cascade never fired the child table's triggers, and the
+-- summary triggers of migrations 003/004 account for the removed children
+-- in the parent's BEFORE DELETE trigger. The *_cascade triggers therefore
+-- delete with @disable_summary_triggers set, so nothing is counted twice.
+--
+-- Each table has a p_start partition for everything before its first
+-- month, one partition per month (pYYYYMM), and p_future for everything
+-- after the last one. `python manage.py partitions` adds months ahead of
+-- time and archives old ones.
+
+-- ============================================
+-- PARTITION HELPERS
+-- ============================================
+
+DELIMITER //
+CREATE PROCEDURE ExecuteSql(IN p_sql TEXT)
+BEGIN
+    SET @execute_sql = p_sql;
+    PREPARE execute_stmt FROM @execute_sql;
+    EXECUTE execute_stmt;
+    DEALLOCATE PREPARE execute_stmt;
+END //
+
+-- "PARTITION pYYYYMM VALUES LESS THAN (...), ..., PARTITION p_future ..." for every month from p_from through p_through
+CREATE FUNCTION MonthlyPartitions(p_from DATE, p_through DATE)
+RETURNS TEXT
+DETERMINISTIC NO SQL
+BEGIN
+    DECLARE v_month DATE DEFAULT CAST(DATE_FORMAT(p_from, '%Y-%m-01') AS DATE);
+    DECLARE v_definitions TEXT DEFAULT '';
+
+    WHILE v_month <= p_through DO
+        SET v_definitions = CONCAT(v_definitions,
+                                   'PARTITION p', DATE_FORMAT(v_month, '%Y%m'),
+                                   ' VALUES LESS THAN (''', DATE_ADD(v_month, INTERVAL 1 MONTH), '''), ');
+        SET v_month = DATE_ADD(v_month, INTERVAL 1 MONTH);
+    END WHILE;
+    RETURN CONCAT(v_definitions, 'PARTITION p_future VALUES LESS THAN (MAXVALUE)');
+END //
+
+CREATE PROCEDURE CheckFactTable(IN p_table VARCHAR(64))
+BEGIN
+    IF p_table NOT IN ('Repair_Request', 'Service_Assignment', 'Payment') THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'Not a month-partitioned table';
+    END IF;
+END //
+
+-- (Re)partition a table with one partition per month from p_from through p_through.
+-- Rebuilds the table: run it on empty tables or in a maintenance window.
+CREATE PROCEDURE PartitionByMonth(
+    IN p_table VARCHAR(64),
+    IN p_column VARCHAR(64),
+    IN p_from DATE,
+    IN p_through DATE
+)
+BEGIN
+    CALL CheckFactTable(p_table);
+    CALL ExecuteSql(CONCAT(
+        'ALTER TABLE ', p_table, ' PARTITION BY RANGE COLUMNS (', p_column, ') (',
+        'PARTITION p_start VALUES LESS THAN (''', CAST(DATE_FORMAT(p_from, '%Y-%m-01') AS DATE), '''), ',
+        MonthlyPartitions(p_from, p_through), ')'
+    ));
+END //
+
+-- Split the (normally empty) p_future partition so months through p_through get their own partitions
+CREATE PROCEDURE AddMonthlyPartitions(IN p_table VARCHAR(64), IN p_through DATE)
+BEGIN
+    DECLARE v_last VARCHAR(64);
+    DECLARE v_next DATE;
+
+    CALL CheckFactTable(p_table);
+    SELECT MAX(PARTITION_NAME) INTO v_last
+    FROM information_schema.PARTITIONS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = p_table AND PARTITION_NAME REGEXP '^p[0-9]{6}$';
+
+    SET v_next = DATE_ADD(STR_TO_DATE(CONCAT(SUBSTRING(v_last, 2), '01'), '%Y%m%d'), INTERVAL 1 MONTH);
+    IF v_next <= p_through THEN
+        CALL ExecuteSql(CONCAT('ALTER TABLE ', p_table, ' REORGANIZE PARTITION p_future INTO (',
+                               MonthlyPartitions(v_next, p_through), ')'));
+    END IF;
+END //
+
+-- Refuse to archive before p_boundary while a row that would be archived is
+-- still open, or has a child dated on or after p_boundary that would be
+-- left live without it (a request made in March and assigned in April).
+-- Such a row would disappear from every page that joins back to it.
+CREATE PROCEDURE CheckArchivable(IN p_boundary DATE)
+BEGIN
+    DECLARE v_count INT;
+    DECLARE v_message VARCHAR(128);
+
+    SELECT COUNT(*) INTO v_count FROM Repair_Request
+    WHERE request_date < p_boundary AND status NOT IN ('completed', 'cancelled');
+    IF v_count > 0 THEN
+        SET v_message = CONCAT(v_count, ' repair requests before the cutoff are still open');
+    END IF;
+
+    IF v_message IS NULL THEN
+        SELECT COUNT(*) INTO v_count FROM Service_Assignment
+        WHERE assignment_date < p_boundary AND assignment_status IN ('assigned', 'in_progress');
+        IF v_count > 0 THEN
+            SET v_message = CONCAT(v_count, ' service assignments before the cutoff are still open');
+        END IF;
+    END IF;
+
+    IF v_message IS NULL THEN
+        SELECT COUNT(*) INTO v_count FROM Payment
+        WHERE payment_date < p_boundary AND payment_status = 'pending';
+        IF v_count > 0 THEN
+            SET v_message = CONCAT(v_count, ' payments before the cutoff are still pending');
+        END IF;
+    END IF;
+
+    IF v_message IS NULL THEN
+        SELECT COUNT(*) INTO v_count
+        FROM Repair_Request rr
+        JOIN Service_Assignment sa ON sa.request_id = rr.request_id
+        WHERE rr.request_date < p_boundary AND sa.assignment_date >= p_boundary;
+        IF v_count > 0 THEN
+            SET v_message = CONCAT(v_count, ' repair requests before the cutoff were assigned after it');
+        END IF;
+    END IF;
+
+    IF v_message IS NULL THEN
+        SELECT COUNT(*) INTO v_count
+        FROM Service_Assignment sa
+        JOIN Payment p ON p.assignment_id = sa.assignment_id
+        WHERE sa.assignment_date < p_boundary AND p.payment_date >= p_boundary;
+        IF v_count > 0 THEN
+            SET v_message = CONCAT(v_count, ' service assignments before the cutoff were paid after it');
+        END IF;
+    END IF;
+
+    IF v_message IS NOT NULL THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = v_message;
+    END IF;
+END //
+
+-- Move every month before p_before's month (and p_start) of the three fact
+-- tables into unpartitioned copies in p_archive_schema, then do the same
+-- for reviews of archived assignments. Partitions are swapped out with
+-- EXCHANGE PARTITION, which fires no triggers, so the counters and views
+-- are rebuilt at the end. Each table is cut at its own date column;
+-- CheckArchivable first makes sure that leaves no open work in the archive
+-- and no live row whose parent was archived, so pick an earlier cutoff if
+-- it refuses.
+CREATE PROCEDURE ArchivePartitions(IN p_before DATE, IN p_archive_schema VARCHAR(64))
+BEGIN
+    DECLARE v_boundary DATE DEFAULT CAST(DATE_FORMAT(p_before, '%Y-%m-01') AS DATE);
+    DECLARE v_tables VARCHAR(100) DEFAULT 'Repair_Request,Service_Assignment,Payment';
+    DECLARE v_table VARCHAR(64);
+    DECLARE v_partitions TEXT;
+    DECLARE v_remaining TEXT;
+    DECLARE v_partition VARCHAR(64);
+    DECLARE v_months INT;
+    DECLARE v_last VARCHAR(64);
+    DECLARE v_archive VARCHAR(200);
+    DECLARE v_stage VARCHAR(200);
+    DECLARE v_saved_flag INT;
+
+    CALL CheckArchivable(v_boundary);
+
+    DROP TEMPORARY TABLE IF EXISTS Archive_Result;
+    CREATE TEMPORARY TABLE Archive_Result (
+        table_name VARCHAR(64) PRIMARY KEY,
+        partitions TEXT,
+        archived_rows BIGINT NOT NULL DEFAULT 0
+    );
+
+    CALL ExecuteSql(CONCAT('CREATE DATABASE IF NOT EXISTS `', p_archive_schema, '`'));
+
+    WHILE v_tables <> '' DO
+        SET v_table = SUBSTRING_INDEX(v_tables, ',', 1);
+        SET v_tables = IF(LOCATE(',', v_tables) > 0, SUBSTRING(v_tables, LOCATE(',', v_tables) + 1), '');
+        SET v_archive = CONCAT('`', p_archive_schema, '`.', v_table);
+        SET v_stage = CONCAT('`', p_archive_schema, '`.', v_table, '_stage');
+
+        SELECT GROUP_CONCAT(PARTITION_NAME ORDER BY PARTITION_ORDINAL_POSITION),
+               SUM(PARTITION_NAME <> 'p_start'),
+               MAX(NULLIF(PARTITION_NAME, 'p_start'))
+        INTO v_partitions, v_months, v_last
+        FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = v_table
+          AND (PARTITION_NAME = 'p_start'
+               OR (PARTITION_NAME REGEXP '^p[0-9]{6}$'
+                   AND PARTITION_NAME < CONCAT('p', DATE_FORMAT(v_boundary, '%Y%m'))));
+
+        -- Nothing to do unless at least one whole month lies before the cutoff
+        IF COALESCE(v_months, 0) > 0 THEN
+            IF NOT EXISTS (SELECT 1 FROM information_schema.TABLES
+                           WHERE TABLE_SCHEMA = p_archive_schema AND TABLE_NAME = v_table) THEN
+                CALL ExecuteSql(CONCAT('CREATE TABLE ', v_archive, ' LIKE ', v_table));
+                CALL ExecuteSql(CONCAT('ALTER TABLE ', v_archive, ' REMOVE PARTITIONING'));
+            END IF;
+            CALL ExecuteSql(CONCAT('DROP TABLE IF EXISTS ', v_stage));
+            CALL ExecuteSql(CONCAT('CREATE TABLE ', v_stage, ' LIKE ', v_table));
+            CALL ExecuteSql(CONCAT('ALTER TABLE ', v_stage, ' REMOVE PARTITIONING'));
+            INSERT INTO Archive_Result (table_name, partitions) VALUES (v_table, v_partitions);
+
+            SET v_remaining = v_partitions;
+            WHILE v_remaining <> '' DO
+                SET v_partition = SUBSTRING_INDEX(v_remaining, ',', 1);
+                SET v_remaining = IF(LOCATE(',', v_remaining) > 0,
+                                     SUBSTRING(v_remaining, LOCATE(',', v_remaining) + 1), '');
+                -- Swap the month out (instant), then copy it into the archive table
+                CALL ExecuteSql(CONCAT('ALTER TABLE ', v_table, ' EXCHANGE PARTITION ', v_partition,
+                                       ' WITH TABLE ', v_stage));
+                CALL ExecuteSql(CONCAT('SELECT COUNT(*) INTO @archive_count FROM ', v_stage));
+                CALL ExecuteSql(CONCAT('INSERT INTO ', v_archive, ' SELECT * FROM ', v_stage));
+                CALL ExecuteSql(CONCAT('TRUNCATE TABLE ', v_stage));
+                UPDATE Archive_Result SET archived_rows = archived_rows + @archive_count
+                WHERE table_name = v_table;
+            END WHILE;
+
+            -- The emptied partitions become one p_start ending where the last of them ended
+            CALL ExecuteSql(CONCAT(
+                'ALTER TABLE ', v_table, ' REORGANIZE PARTITION ', v_partitions,
+                ' INTO (PARTITION p_start VALUES LESS THAN (''',
+                DATE_ADD(STR_TO_DATE(CONCAT(SUBSTRING(v_last, 2), '01'), '%Y%m%d'), INTERVAL 1 MONTH), '''))'
+            ));
+            CALL ExecuteSql(CONCAT('DROP TABLE ', v_stage));
+        END IF;
+    END WHILE;
+
+    -- Reviews follow their assignment
+    IF NOT EXISTS (SELECT 1 FROM information_schema.TABLES
+                   WHERE TABLE_SCHEMA = p_archive_schema AND TABLE_NAME = 'Review') THEN
+        CALL ExecuteSql(CONCAT('CREATE TABLE `', p_archive_schema, '`.Review LIKE Review'));
+    END IF;
+    CALL ExecuteSql(CONCAT(
+        'INSERT INTO `', p_archive_schema, '`.Review ',
+        'SELECT r.* FROM Review r ',
+        'WHERE NOT EXISTS (SELECT 1 FROM Service_Assignment sa WHERE sa.assignment_id = r.assignment_id)'
+    ));
+    SET v_saved_flag = @disable_summary_triggers;
+    SET @disable_summary_triggers = 1;
+    DELETE r FROM Review r
+    WHERE NOT EXISTS (SELECT 1 FROM Service_Assignment sa WHERE sa.assignment_id = r.assignment_id);
+    INSERT INTO Archive_Result (table_name, archived_rows) VALUES ('Review', ROW_COUNT());
+    SET @disable_summary_triggers = v_saved_flag;
+
+    CALL ReconcileCounters();
+    CALL RefreshMaterializedViews();
+
+    SELECT table_name, partitions, archived_rows FROM Archive_Result ORDER BY table_name;
+    DROP TEMPORARY TABLE Archive_Result;
+END //
+DELIMITER ;
+
+-- ============================================
+-- DROP THE FOREIGN KEYS AND UNIQUE KEYS
+-- ============================================
+
+DELIMITER //
+CREATE PROCEDURE DropForeignKeys(IN p_table VARCHAR(64))
+BEGIN
+    DECLARE v_constraints TEXT;
+
+    SELECT GROUP_CONCAT('DROP FOREIGN KEY ', CONSTRAINT_NAME SEPARATOR ', ') INTO v_constraints
+    FROM information_schema.TABLE_CONSTRAINTS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = p_table AND CONSTRAINT_TYPE = 'FOREIGN KEY';
+
+    IF v_constraints IS NOT NULL THEN
+        CALL ExecuteSql(CONCAT('ALTER TABLE ', p_table, ' ', v_constraints));
+    END IF;
+END //
+DELIMITER ;
+
+-- Review is not partitioned, but its foreign key points at Service_Assignment
+CALL DropForeignKeys('Review');
+CALL DropForeignKeys('Payment');
+CALL DropForeignKeys('Service_Assignment');
+CALL DropForeignKeys('Repair_Request');
+DROP PROCEDURE DropForeignKeys;
+
+-- The indexes that backed the foreign keys stay; the UNIQUE ones become plain
+ALTER TABLE Service_Assignment DROP INDEX request_id, ADD INDEX idx_assignment_request (request_id);
+ALTER TABLE Payment DROP INDEX assignment_id, ADD INDEX idx_payment_assignment (assignment_id);
+
+ALTER TABLE Repair_Request DROP PRIMARY KEY, ADD PRIMARY KEY (request_id, request_date);
+ALTER TABLE Service_Assignment DROP PRIMARY KEY, ADD PRIMARY KEY (assignment_id, assignment_date);
+ALTER TABLE Payment DROP PRIMARY KEY, ADD PRIMARY KEY (payment_id, payment_date);
+
+-- ============================================
+-- PARTITION BY MONTH
+-- ============================================
+-- From the oldest row (or this month) to three months ahead
+
+SET @partition_from = COALESCE((SELECT DATE(MIN(request_date)) FROM Repair_Request), CURDATE());
+CALL PartitionByMonth('Repair_Request', 'request_date', @partition_from, DATE_ADD(CURDATE(), INTERVAL 3 MONTH));
+
+SET @partition_from = COALESCE((SELECT DATE(MIN(assignment_date)) FROM Service_Assignment), CURDATE());
+CALL PartitionByMonth('Service_Assignment', 'assignment_date', @partition_from, DATE_ADD(CURDATE(), INTERVAL 3 MONTH));
+
+SET @partition_from = COALESCE((SELECT DATE(MIN(payment_date)) FROM Payment), CURDATE());
+CALL PartitionByMonth('Payment', 'payment_date', @partition_from, DATE_ADD(CURDATE(), INTERVAL 3 MONTH));
+
+-- ============================================
+-- KEY CHECKS THAT REPLACE THE FOREIGN KEYS
+-- ============================================
+
+DELIMITER //
+CREATE PROCEDURE RefuseMissingParent(IN p_message VARCHAR(200))
+BEGIN
+    SIGNAL SQLSTATE '23000' SET MYSQL_ERRNO = 1452, MESSAGE_TEXT = p_message;
+END //
+
+CREATE PROCEDURE CheckRequestKeys(IN p_customer_id INT, IN p_category_id INT)
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM User WHERE user_id = p_customer_id) THEN
+        CALL RefuseMissingParent('Cannot add or update a child row: Repair_Request.customer_id has no User');
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM Service_Category WHERE category_id = p_category_id) THEN
+        CALL RefuseMissingParent('Cannot add or update a child row: Repair_Request.category_id has no Service_Category');
+    END IF;
+END //
+
+-- Locks the request row, so two assignments of one request are checked one
+-- after the other. The duplicate probe is a locking read: a plain SELECT
+-- would read this transaction's snapshot under REPEATABLE READ and miss an
+-- assignment another session committed after it.
+CREATE PROCEDURE CheckAssignmentKeys(IN p_assignment_id INT, IN p_request_id INT, IN p_technician_id INT)
+BEGIN
+    DECLARE v_count INT;
+    DECLARE v_duplicates INT;
+
+    SELECT COUNT(*) INTO v_count FROM Repair_Request WHERE request_id = p_request_id FOR UPDATE;
+    IF v_count = 0 THEN
+        CALL RefuseMissingParent('Cannot add or update a child row: Service_Assignment.request_id has no Repair_Request');
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM Technician WHERE technician_id = p_technician_id) THEN
+        CALL RefuseMissingParent('Cannot add or update a child row: Service_Assignment.technician_id has no Technician');
+    END IF;
+    SELECT COUNT(*) INTO v_duplicates
+    FROM Service_Assignment FORCE INDEX (idx_assignment_request)
+    WHERE request_id = p_request_id AND assignment_id <> p_assignment_id
+    FOR SHARE;
+    IF v_duplicates > 0 THEN
+        SIGNAL SQLSTATE '23000' SET MYSQL_ERRNO = 1062,
+            MESSAGE_TEXT = 'Duplicate entry: the repair request already has an assignment';
+    END IF;
+END //
+
+-- Locks the assignment row, so two payments of one assignment are checked
+-- one after the other; the duplicate probe is a locking read, as above
+CREATE PROCEDURE CheckPaymentKeys(IN p_payment_id INT, IN p_assignment_id INT)
+BEGIN
+    DECLARE v_count INT;
+    DECLARE v_duplicates INT;
+
+    SELECT COUNT(*) INTO v_count FROM Service_Assignment WHERE assignment_id = p_assignment_id FOR UPDATE;
+    IF v_count = 0 THEN
+        CALL RefuseMissingParent('Cannot add or update a child row: Payment.assignment_id has no Service_Assignment');
+    END IF;
+    SELECT COUNT(*) INTO v_duplicates
+    FROM Payment FORCE INDEX (idx_payment_assignment)
+    WHERE assignment_id = p_assignment_id AND payment_id <> p_payment_id
+    FOR SHARE;
+    IF v_duplicates > 0 THEN
+        SIGNAL SQLSTATE '23000' SET MYSQL_ERRNO = 1062,
+            MESSAGE_TEXT = 'Duplicate entry: the assignment already has a payment';
+    END IF;
+END //
+
+CREATE PROCEDURE RefuseReferencedDelete(IN p_message VARCHAR(200))
+BEGIN
+    SIGNAL SQLSTATE '23000' SET MYSQL_ERRNO = 1451, MESSAGE_TEXT = p_message;
+END //
+
+CREATE TRIGGER before_request_insert_keys
+BEFORE INSERT ON Repair_Request
+FOR EACH ROW
+BEGIN
+    IF @@foreign_key_checks = 1 THEN
+        CALL CheckRequestKeys(NEW.customer_id, NEW.category_id);
+    END IF;
+END //
+
+CREATE TRIGGER before_request_update_keys
+BEFORE UPDATE ON Repair_Request
+FOR EACH ROW
+BEGIN
+    IF @@foreign_key_checks = 1
+       AND (OLD.customer_id <> NEW.customer_id OR OLD.category_id <> NEW.category_id) THEN
+        CALL CheckRequestKeys(NEW.customer_id, NEW.category_id);
+    END IF;
+END //
+
+CREATE TRIGGER before_assignment_insert_keys
+BEFORE INSERT ON Service_Assignment
+FOR EACH ROW
+BEGIN
+    IF @@foreign_key_checks = 1 THEN
+        CALL CheckAssignmentKeys(NEW.assignment_id, NEW.request_id, NEW.technician_id);
+    END IF;
+END //
+
+CREATE TRIGGER before_assignment_update_keys
+BEFORE UPDATE ON Service_Assignment
+FOR EACH ROW
+BEGIN
+    IF @@foreign_key_checks = 1
+       AND (OLD.request_id <> NEW.request_id OR OLD.technician_id <> NEW.technician_id) THEN
+        CALL CheckAssignmentKeys(NEW.assignment_id, NEW.request_id, NEW.technician_id);
+    END IF;
+END //
+
+-- Before the amount check, so a missing assignment is reported as such
+CREATE TRIGGER before_payment_insert_keys
+BEFORE INSERT ON Payment
+FOR EACH ROW
+PRECEDES before_payment_insert
+BEGIN
+    IF @@foreign_key_checks = 1 THEN
+        CALL CheckPaymentKeys(NEW.payment_id, NEW.assignment_id);
+    END IF;
+END //
+
+CREATE TRIGGER before_payment_update_keys
+BEFORE UPDATE ON Payment
+FOR EACH ROW
+BEGIN
+    IF @@foreign_key_checks = 1 AND OLD.assignment_id <> NEW.assignment_id THEN
+        CALL CheckPaymentKeys(NEW.payment_id, NEW.assignment_id);
+    END IF;
+END //
+
+CREATE TRIGGER before_review_insert_keys
+BEFORE INSERT ON Review
+FOR EACH ROW
+BEGIN
+    IF @@foreign_key_checks = 1
+       AND NOT EXISTS (SELECT 1 FROM Service_Assignment WHERE assignment_id = NEW.assignment_id) THEN
+        CALL RefuseMissingParent('Cannot add or update a child row: Review.assignment_id has no Service_Assignment');
+    END IF;
+END //
+
+CREATE TRIGGER before_review_update_keys
+BEFORE UPDATE ON Review
+FOR EACH ROW
+BEGIN
+    IF @@foreign_key_checks = 1 AND OLD.assignment_id <> NEW.assignment_id
+       AND NOT EXISTS (SELECT 1 FROM Service_Assignment WHERE assignment_id = NEW.assignment_id) THEN
+        CALL RefuseMissingParent('Cannot add or update a child row: Review.assignment_id has no Service_Assignment');
+    END IF;
+END //
+
+-- ON DELETE RESTRICT: technicians and categories that are still referenced
+-- After the active-assignment check, which gives the friendlier message
+CREATE TRIGGER before_technician_delete_keys
+BEFORE DELETE ON Technician
+FOR EACH ROW
+FOLLOWS before_technician_delete
+BEGIN
+    IF @@foreign_key_checks = 1
+       AND EXISTS (SELECT 1 FROM Service_Assignment WHERE technician_id = OLD.technician_id) THEN
+        CALL RefuseReferencedDelete('Cannot delete or update a parent row: the technician has service assignments');
+    END IF;
+END //
+
+CREATE TRIGGER before_category_delete_keys
+BEFORE DELETE ON Service_Category
+FOR EACH ROW
+BEGIN
+    IF @@foreign_key_checks = 1
+       AND EXISTS (SELECT 1 FROM Repair_Request WHERE category_id = OLD.category_id) THEN
+        CALL RefuseReferencedDelete('Cannot delete or update a parent row: the category has repair requests');
+    END IF;
+END //
+
+-- A user's Technician row goes with the user by a real cascade, which fires no
+-- trigger on Technician, so its assignments are checked here
+CREATE TRIGGER before_user_delete_keys
+BEFORE DELETE ON User
+FOR EACH ROW
+PRECEDES before_user_delete_counters
+BEGIN
+    IF @@foreign_key_checks = 1 AND EXISTS (
+        SELECT 1
+        FROM Technician t
+        JOIN Service_Assignment sa ON sa.technician_id = t.technician_id
+        WHERE t.user_id = OLD.user_id
+    ) THEN
+        CALL RefuseReferencedDelete('Cannot delete or update a parent row: the technician has service assignments');
+    END IF;
+END //
+
+-- ON DELETE CASCADE. These run before the summary AFTER DELETE triggers, which
+-- (as with a real cascade) expect the children to be gone already.
+CREATE TRIGGER after_user_delete_cascade
+AFTER DELETE ON User
+FOR EACH ROW
+PRECEDES after_user_delete_mv
+BEGIN
+    DECLARE v_saved_flag INT DEFAULT @disable_summary_triggers;
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        SET @disable_summary_triggers = v_saved_flag;
+        RESIGNAL;
+    END;
+
+    IF @@foreign_key_checks = 1 THEN
+        SET @disable_summary_triggers = 1;
+        DELETE FROM Repair_Request WHERE customer_id = OLD.user_id;
+        SET @disable_summary_triggers = v_saved_flag;
+    END IF;
+END //
+
+CREATE TRIGGER after_request_delete_cascade
+AFTER DELETE ON Repair_Request
+FOR EACH ROW
+PRECEDES after_request_delete_mv
+BEGIN
+    DECLARE v_saved_flag INT DEFAULT @disable_summary_triggers;
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        SET @disable_summary_triggers = v_saved_flag;
+        RESIGNAL;
+    END;
+
+    IF @@foreign_key_checks = 1 THEN
+        SET @disable_summary_triggers = 1;
+        DELETE FROM Service_Assignment WHERE request_id = OLD.request_id;
+        SET @disable_summary_triggers = v_saved_flag;
+    END IF;
+END //
+
+CREATE TRIGGER after_assignment_delete_cascade
+AFTER DELETE ON Service_Assignment
+FOR EACH ROW
+PRECEDES after_assignment_delete_mv
+BEGIN
+    DECLARE v_saved_flag INT DEFAULT @disable_summary_triggers;
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        SET @disable_summary_triggers = v_saved_flag;
+        RESIGNAL;
+    END;
+
+    IF @@foreign_key_checks = 1 THEN
+        SET @disable_summary_triggers = 1;
+        DELETE FROM Payment WHERE assignment_id = OLD.assignment_id;
+        DELETE FROM Review WHERE assignment_id = OLD.assignment_id;
+        SET @disable_summary_triggers = v_saved_flag;
+    END IF;
+END //
+DELIMITER ;
+
+-- ============================================
+-- DASHBOARD: RECENT REQUESTS FROM RECENT PARTITIONS
+-- ============================================
+
+DROP PROCEDURE IF EXISTS GetSystemDashboard;
+
+DELIMITER //
+CREATE PROCEDURE GetSystemDashboard()
+BEGIN
+    DECLARE v_since DATETIME;
+
+    -- KPI tiles
+    SELECT
+        (SELECT counter_value FROM System_Counters WHERE counter_name = 'total_users') as total_users,
+        (SELECT counter_value FROM System_Counters WHERE counter_name = 'total_technicians') as total_technicians,
+        (SELECT counter_value FROM System_Counters WHERE counter_name = 'total_requests') as total_requests,
+        COALESCE((SELECT request_count FROM Request_Status_Counts WHERE status = 'pending'), 0) as pending_requests;
+
+    -- Requests by status
+    SELECT status, request_count as count
+    FROM Request_Status_Counts
+    WHERE request_count > 0;
+
+    -- Revenue by service category
+    SELECT sc.category_name, SUM(p.payment_amount) as total_revenue
+    FROM Payment p
+    JOIN Service_Assignment sa ON p.assignment_id = sa.assignment_id
+    JOIN Repair_Request rr ON sa.request_id = rr.request_id
+    JOIN Service_Category sc ON rr.category_id = sc.category_id
+    WHERE p.payment_status = 'completed'
+    GROUP BY sc.category_name;
+
+    -- Recent repair requests: the month before the newest request is enough
+    -- for ten rows unless the table is nearly empty, and lets MySQL skip
+    -- every older partition
+    SET v_since = (SELECT DATE_SUB(MAX(request_date), INTERVAL 1 MONTH) FROM Repair_Request);
+    IF (SELECT COUNT(*) FROM (
+            SELECT 1 FROM Repair_Request WHERE request_date >= v_since LIMIT 10
+        ) recent) < 10 THEN
+        SET v_since = '1000-01-01';
+    END IF;
+
+    SELECT rr.request_id, u.first_name, u.last_name, sc.category_name,
+           rr.status, rr.request_date
+    FROM Repair_Request rr
+    JOIN User u ON rr.customer_id = u.user_id
+    JOIN Service_Category sc ON rr.category_id = sc.category_id
+    WHERE rr.request_date >= v_since
+    ORDER BY rr.request_date DESC
+    LIMIT 10;
+END //
+DELIMITER ;
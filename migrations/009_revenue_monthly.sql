@@ -0,0 +1,285 @@
+-- ============================================
+-- MIGRATION 009: MONTHLY REVENUE ROLLUP
+-- ============================================
+-- Completed payments summed per month, service category, payment method
+-- and customer location. The monthly revenue trend, the payment method
+-- charts, the dashboard's revenue by category and the Revenue Analysis
+-- Report read whole past months from here instead of grouping every payment
+-- by DATE_FORMAT(payment_date, ...); only the current month is still summed
+-- from Payment.
+--
+-- Triggers on Payment keep the rollup current. As in migration 003, the
+-- BEFORE DELETE triggers on the parent tables subtract the payments their
+-- cascade removes, and bulk loaders that SET @disable_summary_triggers = 1
+-- must CALL RebuildRevenueMonthly() afterwards. Moving a paid request to
+-- another category or its customer to another location is not tracked;
+-- RebuildRevenueMonthly (run by `manage.py reconcile-counters`) catches up.
+
+CREATE TABLE Revenue_Monthly (
+    revenue_month DATE NOT NULL,
+    category_id INT NOT NULL,
+    payment_method VARCHAR(20) NOT NULL,
+    location_id INT NOT NULL,
+    transaction_count BIGINT NOT NULL DEFAULT 0,
+    total_revenue DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    PRIMARY KEY (revenue_month, category_id, payment_method, location_id)
+);
+
+-- ============================================
+-- ROLLUP HELPERS
+-- ============================================
+
+DELIMITER //
+-- Add (or with negative deltas, remove) one payment of an assignment.
+-- Refuses a payment whose assignment, request or customer is missing
+-- rather than leaving it out of the rollup without a word.
+CREATE PROCEDURE BumpRevenueMonthly(
+    IN p_assignment_id INT,
+    IN p_payment_method VARCHAR(20),
+    IN p_payment_date DATETIME,
+    IN p_count_delta BIGINT,
+    IN p_amount_delta DECIMAL(14,2)
+)
+BEGIN
+    DECLARE v_category_id INT;
+    DECLARE v_location_id INT;
+
+    SELECT rr.category_id, u.location_id INTO v_category_id, v_location_id
+    FROM Service_Assignment sa
+    JOIN Repair_Request rr ON sa.request_id = rr.request_id
+    JOIN User u ON rr.customer_id = u.user_id
+    WHERE sa.assignment_id = p_assignment_id
+    LIMIT 1;
+    IF v_category_id IS NULL THEN
+        SIGNAL SQLSTATE '45000'
+            SET MESSAGE_TEXT = 'Revenue_Monthly: the payment has no live assignment, request or customer';
+    END IF;
+
+    INSERT INTO Revenue_Monthly (revenue_month, category_id, payment_method, location_id,
+                                 transaction_count, total_revenue)
+    VALUES (CAST(DATE_FORMAT(p_payment_date, '%Y-%m-01') AS DATE), v_category_id, p_payment_method,
+            v_location_id, p_count_delta, p_amount_delta)
+    ON DUPLICATE KEY UPDATE transaction_count = transaction_count + p_count_delta,
+                            total_revenue = total_revenue + p_amount_delta;
+END //
+
+-- Rebuild every month from the first one whose payments can all still be
+-- joined to their assignment, request and customer. Earlier months were
+-- archived (migration 008), or have payments whose chain was, and keep the
+-- totals they had: rebuilding them would drop those payments.
+CREATE PROCEDURE RebuildRevenueMonthly()
+BEGIN
+    DECLARE v_from DATE;
+    DECLARE v_last_orphan DATETIME;
+
+    SELECT CAST(DATE_FORMAT(MIN(payment_date), '%Y-%m-01') AS DATE) INTO v_from FROM Payment;
+
+    SELECT MAX(p.payment_date) INTO v_last_orphan
+    FROM Payment p
+    LEFT JOIN Service_Assignment sa ON p.assignment_id = sa.assignment_id
+    LEFT JOIN Repair_Request rr ON sa.request_id = rr.request_id
+    LEFT JOIN User u ON rr.customer_id = u.user_id
+    WHERE p.payment_status = 'completed' AND u.user_id IS NULL;
+    IF v_last_orphan IS NOT NULL THEN
+        SET v_from = DATE_ADD(CAST(DATE_FORMAT(v_last_orphan, '%Y-%m-01') AS DATE), INTERVAL 1 MONTH);
+    END IF;
+
+    START TRANSACTION;
+
+    DELETE FROM Revenue_Monthly WHERE revenue_month >= v_from;
+    INSERT INTO Revenue_Monthly (revenue_month, category_id, payment_method, location_id,
+                                 transaction_count, total_revenue)
+    SELECT CAST(DATE_FORMAT(p.payment_date, '%Y-%m-01') AS DATE) as revenue_month,
+           rr.category_id, p.payment_method, u.location_id, COUNT(*), SUM(p.payment_amount)
+    FROM Payment p
+    JOIN Service_Assignment sa ON p.assignment_id = sa.assignment_id
+    JOIN Repair_Request rr ON sa.request_id = rr.request_id
+    JOIN User u ON rr.customer_id = u.user_id
+    WHERE p.payment_status = 'completed' AND p.payment_date >= v_from
+    GROUP BY revenue_month, rr.category_id, p.payment_method, u.location_id;
+
+    COMMIT;
+
+    SELECT CONCAT('Revenue rollup rebuilt from ', COALESCE(v_from, 'the first payment')) AS message;
+END //
+DELIMITER ;
+
+-- ============================================
+-- TRIGGERS THAT MAINTAIN THE ROLLUP
+-- ============================================
+
+DELIMITER //
+CREATE TRIGGER after_payment_insert_revenue
+AFTER INSERT ON Payment
+FOR EACH ROW
+BEGIN
+    IF COALESCE(@disable_summary_triggers, 0) = 0 AND NEW.payment_status = 'completed' THEN
+        CALL BumpRevenueMonthly(NEW.assignment_id, NEW.payment_method, NEW.payment_date, 1, NEW.payment_amount);
+    END IF;
+END //
+
+CREATE TRIGGER after_payment_update_revenue
+AFTER UPDATE ON Payment
+FOR EACH ROW
+BEGIN
+    IF COALESCE(@disable_summary_triggers, 0) = 0
+       AND (NOT (OLD.payment_status <=> NEW.payment_status) OR OLD.payment_amount <> NEW.payment_amount
+            OR OLD.payment_method <> NEW.payment_method OR OLD.payment_date <> NEW.payment_date
+            OR OLD.assignment_id <> NEW.assignment_id) THEN
+        IF OLD.payment_status = 'completed' THEN
+            CALL BumpRevenueMonthly(OLD.assignment_id, OLD.payment_method, OLD.payment_date, -1, -OLD.payment_amount);
+        END IF;
+        IF NEW.payment_status = 'completed' THEN
+            CALL BumpRevenueMonthly(NEW.assignment_id, NEW.payment_method, NEW.payment_date, 1, NEW.payment_amount);
+        END IF;
+    END IF;
+END //
+
+CREATE TRIGGER after_payment_delete_revenue
+AFTER DELETE ON Payment
+FOR EACH ROW
+BEGIN
+    IF COALESCE(@disable_summary_triggers, 0) = 0 AND OLD.payment_status = 'completed' THEN
+        CALL BumpRevenueMonthly(OLD.assignment_id, OLD.payment_method, OLD.payment_date, -1, -OLD.payment_amount);
+    END IF;
+END //
+
+-- Also accounts for the Payment row the cascade removes
+CREATE TRIGGER before_assignment_delete_revenue
+BEFORE DELETE ON Service_Assignment
+FOR EACH ROW
+BEGIN
+    DECLARE v_payment_method VARCHAR(20);
+    DECLARE v_payment_date DATETIME;
+    DECLARE v_payment_amount DECIMAL(8,2);
+
+    IF COALESCE(@disable_summary_triggers, 0) = 0 THEN
+        SELECT payment_method, payment_date, payment_amount
+        INTO v_payment_method, v_payment_date, v_payment_amount
+        FROM Payment
+        WHERE assignment_id = OLD.assignment_id AND payment_status = 'completed'
+        LIMIT 1;
+
+        IF v_payment_amount IS NOT NULL THEN
+            CALL BumpRevenueMonthly(OLD.assignment_id, v_payment_method, v_payment_date, -1, -v_payment_amount);
+        END IF;
+    END IF;
+END //
+
+-- Also accounts for the Payment row the cascade removes
+CREATE TRIGGER before_request_delete_revenue
+BEFORE DELETE ON Repair_Request
+FOR EACH ROW
+BEGIN
+    DECLARE v_assignment_id INT;
+    DECLARE v_payment_method VARCHAR(20);
+    DECLARE v_payment_date DATETIME;
+    DECLARE v_payment_amount DECIMAL(8,2);
+
+    IF COALESCE(@disable_summary_triggers, 0) = 0 THEN
+        SELECT p.assignment_id, p.payment_method, p.payment_date, p.payment_amount
+        INTO v_assignment_id, v_payment_method, v_payment_date, v_payment_amount
+        FROM Payment p
+        JOIN Service_Assignment sa ON p.assignment_id = sa.assignment_id
+        WHERE sa.request_id = OLD.request_id AND p.payment_status = 'completed'
+        LIMIT 1;
+
+        IF v_payment_amount IS NOT NULL THEN
+            CALL BumpRevenueMonthly(v_assignment_id, v_payment_method, v_payment_date, -1, -v_payment_amount);
+        END IF;
+    END IF;
+END //
+
+-- Also accounts for the Payment rows the cascade removes
+CREATE TRIGGER before_user_delete_revenue
+BEFORE DELETE ON User
+FOR EACH ROW
+BEGIN
+    IF COALESCE(@disable_summary_triggers, 0) = 0 THEN
+        UPDATE Revenue_Monthly rm
+        JOIN (
+            SELECT CAST(DATE_FORMAT(p.payment_date, '%Y-%m-01') AS DATE) as revenue_month,
+                   rr.category_id, p.payment_method,
+                   COUNT(*) as transaction_count, SUM(p.payment_amount) as total_revenue
+            FROM Payment p
+            JOIN Service_Assignment sa ON p.assignment_id = sa.assignment_id
+            JOIN Repair_Request rr ON sa.request_id = rr.request_id
+            WHERE rr.customer_id = OLD.user_id AND p.payment_status = 'completed'
+            GROUP BY revenue_month, rr.category_id, p.payment_method
+        ) removed ON rm.revenue_month = removed.revenue_month
+                 AND rm.category_id = removed.category_id
+                 AND rm.payment_method = removed.payment_method
+                 AND rm.location_id = OLD.location_id
+        SET rm.transaction_count = rm.transaction_count - removed.transaction_count,
+            rm.total_revenue = rm.total_revenue - removed.total_revenue;
+    END IF;
+END //
+DELIMITER ;
+
+-- Seed the rollup from the existing payments
+CALL RebuildRevenueMonthly();
+
+-- ============================================
+-- DASHBOARD: REVENUE BY CATEGORY FROM THE ROLLUP
+-- ============================================
+
+DROP PROCEDURE IF EXISTS GetSystemDashboard;
+
+DELIMITER //
+CREATE PROCEDURE GetSystemDashboard()
+BEGIN
+    DECLARE v_since DATETIME;
+    DECLARE v_this_month DATE DEFAULT DATE_FORMAT(CURDATE(), '%Y-%m-01');
+
+    -- KPI tiles
+    SELECT
+        (SELECT counter_value FROM System_Counters WHERE counter_name = 'total_users') as total_users,
+        (SELECT counter_value FROM System_Counters WHERE counter_name = 'total_technicians') as total_technicians,
+        (SELECT counter_value FROM System_Counters WHERE counter_name = 'total_requests') as total_requests,
+        COALESCE((SELECT request_count FROM Request_Status_Counts WHERE status = 'pending'), 0) as pending_requests;
+
+    -- Requests by status
+    SELECT status, request_count as count
+    FROM Request_Status_Counts
+    WHERE request_count > 0;
+
+    -- Revenue by service category: closed months from the rollup, the
+    -- current one from Payment
+    SELECT sc.category_name, SUM(revenue.total_revenue) as total_revenue
+    FROM (
+        SELECT category_id, SUM(transaction_count) as transaction_count, SUM(total_revenue) as total_revenue
+        FROM Revenue_Monthly
+        WHERE revenue_month < v_this_month
+        GROUP BY category_id
+        UNION ALL
+        SELECT rr.category_id, COUNT(*), SUM(p.payment_amount)
+        FROM Payment p
+        JOIN Service_Assignment sa ON p.assignment_id = sa.assignment_id
+        JOIN Repair_Request rr ON sa.request_id = rr.request_id
+        WHERE p.payment_status = 'completed' AND p.payment_date >= v_this_month
+        GROUP BY rr.category_id
+    ) revenue
+    JOIN Service_Category sc ON revenue.category_id = sc.category_id
+    GROUP BY sc.category_name
+    HAVING SUM(revenue.transaction_count) > 0;
+
+    -- Recent repair requests: the month before the newest request is enough
+    -- for ten rows unless the table is nearly empty, and lets MySQL skip
+    -- every older partition
+    SET v_since = (SELECT DATE_SUB(MAX(request_date), INTERVAL 1 MONTH) FROM Repair_Request);
+    IF (SELECT COUNT(*) FROM (
+            SELECT 1 FROM Repair_Request WHERE request_date >= v_since LIMIT 10
+        ) recent) < 10 THEN
+        SET v_since = '1000-01-01';
+    END IF;
+
+    SELECT rr.request_id, u.first_name, u.last_name, sc.category_name,
+           rr.status, rr.request_date
+    FROM Repair_Request rr
+    JOIN User u ON rr.customer_id = u.user_id
+    JOIN Service_Category sc ON rr.category_id = sc.category_id
+    WHERE rr.request_date >= v_since
+    ORDER BY rr.request_date DESC
+    LIMIT 10;
+END //
+DELIMITER ;
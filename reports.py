@@ -0,0 +1,334 @@
+"""SQL for the analytics and reports on the Advanced Operations page
+
+The per-technician / per-customer / per-location reports aggregate each
+child table (assignments, payments, reviews) in its own derived table,
+keyed by the entity id, and only then join the results to the entity and
+its name. The LEGACY_* versions are the original join-then-aggregate
+queries, kept so `manage.py verify-reports` and `manage.py benchmark-reports`
+can compare the two.
+"""
+
+from datetime import datetime
+
+# ==================== COMPLEX QUERIES ====================
+TOP_TECHNICIANS = """
+    SELECT t.technician_id, u.first_name, u.last_name,
+           jobs.total_jobs,
+           revenue.total_revenue,
+           ratings.avg_rating
+    FROM (
+        SELECT technician_id, COUNT(*) as total_jobs
+        FROM Service_Assignment
+        WHERE assignment_status = 'completed'
+        GROUP BY technician_id
+    ) jobs
+    JOIN (
+        SELECT sa.technician_id, SUM(p.payment_amount) as total_revenue
+        FROM Payment p
+        JOIN Service_Assignment sa ON p.assignment_id = sa.assignment_id
+        WHERE p.payment_status = 'completed' AND sa.assignment_status = 'completed'
+        GROUP BY sa.technician_id
+    ) revenue ON jobs.technician_id = revenue.technician_id
+    LEFT JOIN (
+        SELECT sa.technician_id, AVG(r.technician_rating) as avg_rating
+        FROM Review r
+        JOIN Service_Assignment sa ON r.assignment_id = sa.assignment_id
+        WHERE sa.assignment_status = 'completed'
+        GROUP BY sa.technician_id
+    ) ratings ON jobs.technician_id = ratings.technician_id
+    JOIN Technician t ON jobs.technician_id = t.technician_id
+    JOIN User u ON t.user_id = u.user_id
+    ORDER BY revenue.total_revenue DESC, ratings.avg_rating DESC
+    LIMIT 10
+"""
+
+LEGACY_TOP_TECHNICIANS = """
+    SELECT t.technician_id, u.first_name, u.last_name,
+           COUNT(DISTINCT sa.assignment_id) as total_jobs,
+           SUM(p.payment_amount) as total_revenue,
+           AVG(r.technician_rating) as avg_rating
+    FROM Technician t
+    JOIN User u ON t.user_id = u.user_id
+    JOIN Service_Assignment sa ON t.technician_id = sa.technician_id
+    LEFT JOIN Payment p ON sa.assignment_id = p.assignment_id AND p.payment_status = 'completed'
+    LEFT JOIN Review r ON sa.assignment_id = r.assignment_id
+    WHERE sa.assignment_status = 'completed'
+    GROUP BY t.technician_id, u.first_name, u.last_name
+    HAVING total_revenue IS NOT NULL
+    ORDER BY total_revenue DESC, avg_rating DESC
+    LIMIT 10
+"""
+
+CATEGORY_STATS = """
+    SELECT sc.category_name,
+           COUNT(rr.request_id) as total_requests,
+           SUM(CASE WHEN rr.status = 'completed' THEN 1 ELSE 0 END) as completed,
+           SUM(CASE WHEN rr.status = 'pending' THEN 1 ELSE 0 END) as pending,
+           AVG(p.payment_amount) as avg_payment
+    FROM Service_Category sc
+    LEFT JOIN Repair_Request rr ON sc.category_id = rr.category_id
+    LEFT JOIN Service_Assignment sa ON rr.request_id = sa.request_id
+    LEFT JOIN Payment p ON sa.assignment_id = p.assignment_id AND p.payment_status = 'completed'
+    GROUP BY sc.category_id, sc.category_name
+    ORDER BY total_requests DESC
+"""
+
+# Technicians are counted per location in their own derived table; joining
+# them alongside the requests multiplied every request (and its revenue)
+# by the number of technicians in the area
+LOCATION_STATS = """
+    SELECT l.area_name, l.city, l.state,
+           COALESCE(requests.total_requests, 0) as total_requests,
+           COALESCE(technicians.technicians_in_area, 0) as technicians_in_area,
+           revenue.total_revenue
+    FROM Location l
+    LEFT JOIN (
+        SELECT u.location_id, COUNT(*) as total_requests
+        FROM Repair_Request rr
+        JOIN User u ON rr.customer_id = u.user_id
+        GROUP BY u.location_id
+    ) requests ON l.location_id = requests.location_id
+    LEFT JOIN (
+        SELECT u.location_id, COUNT(*) as technicians_in_area
+        FROM Technician t
+        JOIN User u ON t.user_id = u.user_id
+        GROUP BY u.location_id
+    ) technicians ON l.location_id = technicians.location_id
+    LEFT JOIN (
+        SELECT u.location_id, SUM(p.payment_amount) as total_revenue
+        FROM Payment p
+        JOIN Service_Assignment sa ON p.assignment_id = sa.assignment_id
+        JOIN Repair_Request rr ON sa.request_id = rr.request_id
+        JOIN User u ON rr.customer_id = u.user_id
+        WHERE p.payment_status = 'completed'
+        GROUP BY u.location_id
+    ) revenue ON l.location_id = revenue.location_id
+    ORDER BY revenue.total_revenue DESC
+"""
+
+LEGACY_LOCATION_STATS = """
+    SELECT l.area_name, l.city, l.state,
+           COUNT(DISTINCT rr.request_id) as total_requests,
+           COUNT(DISTINCT t.technician_id) as technicians_in_area,
+           SUM(p.payment_amount) as total_revenue
+    FROM Location l
+    LEFT JOIN User u ON l.location_id = u.location_id
+    LEFT JOIN Repair_Request rr ON u.user_id = rr.customer_id
+    LEFT JOIN Technician t ON l.location_id = (SELECT location_id FROM User WHERE user_id = t.user_id)
+    LEFT JOIN Service_Assignment sa ON rr.request_id = sa.request_id
+    LEFT JOIN Payment p ON sa.assignment_id = p.assignment_id AND p.payment_status = 'completed'
+    GROUP BY l.location_id, l.area_name, l.city, l.state
+    ORDER BY total_revenue DESC
+"""
+
+# ==================== REPORTS ====================
+SERVICE_COMPLETION_REPORT = """
+    SELECT rr.request_id, u.first_name, u.last_name, sc.category_name,
+           rr.status, rr.request_date, sa.actual_completion_date,
+           DATEDIFF(sa.actual_completion_date, rr.request_date) as days_to_complete
+    FROM Repair_Request rr
+    JOIN User u ON rr.customer_id = u.user_id
+    JOIN Service_Category sc ON rr.category_id = sc.category_id
+    LEFT JOIN Service_Assignment sa ON rr.request_id = sa.request_id
+    WHERE rr.status = 'completed'
+      AND rr.request_date >= %s AND rr.request_date < %s
+    ORDER BY rr.request_date DESC
+"""
+
+TECHNICIAN_PERFORMANCE_REPORT = """
+    SELECT t.technician_id, u.first_name, u.last_name,
+           COALESCE(jobs.total_assignments, 0) as total_assignments,
+           COALESCE(jobs.completed, 0) as completed,
+           ratings.avg_rating,
+           earnings.total_earnings
+    FROM Technician t
+    JOIN User u ON t.user_id = u.user_id
+    LEFT JOIN (
+        SELECT technician_id,
+               COUNT(*) as total_assignments,
+               SUM(CASE WHEN assignment_status = 'completed' THEN 1 ELSE 0 END) as completed
+        FROM Service_Assignment
+        GROUP BY technician_id
+    ) jobs ON t.technician_id = jobs.technician_id
+    LEFT JOIN (
+        SELECT sa.technician_id, AVG(r.technician_rating) as avg_rating
+        FROM Review r
+        JOIN Service_Assignment sa ON r.assignment_id = sa.assignment_id
+        GROUP BY sa.technician_id
+    ) ratings ON t.technician_id = ratings.technician_id
+    LEFT JOIN (
+        SELECT sa.technician_id, SUM(p.payment_amount) as total_earnings
+        FROM Payment p
+        JOIN Service_Assignment sa ON p.assignment_id = sa.assignment_id
+        WHERE p.payment_status = 'completed'
+        GROUP BY sa.technician_id
+    ) earnings ON t.technician_id = earnings.technician_id
+    ORDER BY earnings.total_earnings DESC
+"""
+
+LEGACY_TECHNICIAN_PERFORMANCE_REPORT = """
+    SELECT t.technician_id, u.first_name, u.last_name,
+           COUNT(sa.assignment_id) as total_assignments,
+           SUM(CASE WHEN sa.assignment_status = 'completed' THEN 1 ELSE 0 END) as completed,
+           AVG(r.technician_rating) as avg_rating,
+           SUM(p.payment_amount) as total_earnings
+    FROM Technician t
+    JOIN User u ON t.user_id = u.user_id
+    LEFT JOIN Service_Assignment sa ON t.technician_id = sa.technician_id
+    LEFT JOIN Review r ON sa.assignment_id = r.assignment_id
+    LEFT JOIN Payment p ON sa.assignment_id = p.assignment_id AND p.payment_status = 'completed'
+    GROUP BY t.technician_id, u.first_name, u.last_name
+    ORDER BY total_earnings DESC
+"""
+
+# Whole months inside the range come from the Revenue_Monthly rollup
+# (migration 009); the partial months at either end and the current month
+# are summed from Payment. Parameters come from revenue_params().
+REVENUE_ANALYSIS_REPORT = """
+    SELECT revenue.month,
+           sc.category_name,
+           SUM(revenue.transaction_count) as transaction_count,
+           SUM(revenue.total_revenue) as total_revenue,
+           SUM(revenue.total_revenue) / SUM(revenue.transaction_count) as avg_transaction
+    FROM (
+        SELECT DATE_FORMAT(rm.revenue_month, '%%Y-%%m') as month, rm.category_id,
+               rm.transaction_count, rm.total_revenue
+        FROM Revenue_Monthly rm
+        WHERE rm.revenue_month >= %s AND rm.revenue_month < %s
+        UNION ALL
+        SELECT DATE_FORMAT(p.payment_date, '%%Y-%%m'), rr.category_id, 1, p.payment_amount
+        FROM Payment p
+        JOIN Service_Assignment sa ON p.assignment_id = sa.assignment_id
+        JOIN Repair_Request rr ON sa.request_id = rr.request_id
+        WHERE p.payment_status = 'completed'
+          AND ((p.payment_date >= %s AND p.payment_date < %s) OR (p.payment_date >= %s AND p.payment_date < %s))
+    ) revenue
+    JOIN Service_Category sc ON revenue.category_id = sc.category_id
+    WHERE revenue.transaction_count <> 0
+    GROUP BY revenue.month, sc.category_name
+    ORDER BY revenue.month DESC, total_revenue DESC
+"""
+
+LEGACY_REVENUE_ANALYSIS_REPORT = """
+    SELECT DATE_FORMAT(p.payment_date, '%%Y-%%m') as month,
+           sc.category_name,
+           COUNT(p.payment_id) as transaction_count,
+           SUM(p.payment_amount) as total_revenue,
+           AVG(p.payment_amount) as avg_transaction
+    FROM Payment p
+    JOIN Service_Assignment sa ON p.assignment_id = sa.assignment_id
+    JOIN Repair_Request rr ON sa.request_id = rr.request_id
+    JOIN Service_Category sc ON rr.category_id = sc.category_id
+    WHERE p.payment_status = 'completed'
+      AND p.payment_date >= %s AND p.payment_date < %s
+    GROUP BY month, sc.category_name
+    ORDER BY month DESC, total_revenue DESC
+"""
+
+CUSTOMER_SATISFACTION_REPORT = """
+    SELECT u.user_id, u.first_name, u.last_name,
+           requests.total_requests,
+           ratings.avg_rating_given,
+           spend.total_spent
+    FROM (
+        SELECT customer_id, COUNT(*) as total_requests
+        FROM Repair_Request
+        GROUP BY customer_id
+    ) requests
+    JOIN User u ON requests.customer_id = u.user_id
+    LEFT JOIN (
+        SELECT rr.customer_id, AVG(r.customer_rating) as avg_rating_given
+        FROM Review r
+        JOIN Service_Assignment sa ON r.assignment_id = sa.assignment_id
+        JOIN Repair_Request rr ON sa.request_id = rr.request_id
+        GROUP BY rr.customer_id
+    ) ratings ON requests.customer_id = ratings.customer_id
+    LEFT JOIN (
+        SELECT rr.customer_id, SUM(p.payment_amount) as total_spent
+        FROM Payment p
+        JOIN Service_Assignment sa ON p.assignment_id = sa.assignment_id
+        JOIN Repair_Request rr ON sa.request_id = rr.request_id
+        WHERE p.payment_status = 'completed'
+        GROUP BY rr.customer_id
+    ) spend ON requests.customer_id = spend.customer_id
+    WHERE u.user_type = 'customer'
+    ORDER BY ratings.avg_rating_given DESC
+"""
+
+LEGACY_CUSTOMER_SATISFACTION_REPORT = """
+    SELECT u.user_id, u.first_name, u.last_name,
+           COUNT(rr.request_id) as total_requests,
+           AVG(r.customer_rating) as avg_rating_given,
+           SUM(p.payment_amount) as total_spent
+    FROM User u
+    LEFT JOIN Repair_Request rr ON u.user_id = rr.customer_id
+    LEFT JOIN Service_Assignment sa ON rr.request_id = sa.request_id
+    LEFT JOIN Review r ON sa.assignment_id = r.assignment_id
+    LEFT JOIN Payment p ON sa.assignment_id = p.assignment_id AND p.payment_status = 'completed'
+    WHERE u.user_type = 'customer'
+    GROUP BY u.user_id, u.first_name, u.last_name
+    HAVING total_requests > 0
+    ORDER BY avg_rating_given DESC
+"""
+
+# Reports offered on the Advanced Operations page. A `dated` report takes a
+# (start, end) pair of parameters bounding its date column, end exclusive.
+def month_start(day):
+    return datetime(day.year, day.month, 1)
+
+
+def add_months(day, months):
+    month = day.year * 12 + day.month - 1 + months
+    return datetime(month // 12, month % 12 + 1, 1)
+
+
+def revenue_params(start, end, today=None):
+    """Parameters of REVENUE_ANALYSIS_REPORT for payments in [start, end).
+
+    The rollup covers the whole, closed months in the range; Payment covers
+    [start, rollup start) and [rollup end, end).
+    """
+    rollup_from = month_start(start) if month_start(start) == start else add_months(start, 1)
+    rollup_to = min(month_start(end), month_start(today or datetime.now()))
+    if rollup_to <= rollup_from:
+        rollup_from = rollup_to = start
+    return (rollup_from, rollup_to, start, rollup_from, rollup_to, end)
+
+
+REPORTS = {
+    "Service Completion Report": {"query": SERVICE_COMPLETION_REPORT, "dated": True},
+    "Technician Performance Report": {"query": TECHNICIAN_PERFORMANCE_REPORT, "dated": False},
+    "Revenue Analysis Report": {"query": REVENUE_ANALYSIS_REPORT, "dated": True, "params": revenue_params,
+                                "snapshot_query": LEGACY_REVENUE_ANALYSIS_REPORT},
+    "Customer Satisfaction Report": {"query": CUSTOMER_SATISFACTION_REPORT, "dated": False},
+}
+
+
+def _legacy_location_revenue(row):
+    """The legacy query counts each request once per technician in its area"""
+    row = dict(row)
+    if row["total_revenue"] is not None and row["technicians_in_area"]:
+        row["total_revenue"] = row["total_revenue"] / row["technicians_in_area"]
+    return row
+
+
+ALL_TIME = (datetime(1000, 1, 1), datetime(9999, 1, 1))
+
+# Rewritten queries and the legacy queries they replace. `key` names the
+# columns that identify a row; rows are compared as sets because ties in
+# ORDER BY may come back in either order. `legacy_fixup` maps a legacy row
+# onto what the rewrite should return where the legacy result was wrong.
+REWRITTEN = [
+    {"name": "Top Performing Technicians", "query": TOP_TECHNICIANS,
+     "legacy": LEGACY_TOP_TECHNICIANS, "key": ("technician_id",)},
+    {"name": "Location-wise Service Analysis", "query": LOCATION_STATS,
+     "legacy": LEGACY_LOCATION_STATS, "key": ("area_name", "city", "state"),
+     "legacy_fixup": _legacy_location_revenue},
+    {"name": "Technician Performance Report", "query": TECHNICIAN_PERFORMANCE_REPORT,
+     "legacy": LEGACY_TECHNICIAN_PERFORMANCE_REPORT, "key": ("technician_id",)},
+    {"name": "Customer Satisfaction Report", "query": CUSTOMER_SATISFACTION_REPORT,
+     "legacy": LEGACY_CUSTOMER_SATISFACTION_REPORT, "key": ("user_id",)},
+    {"name": "Revenue Analysis Report", "query": REVENUE_ANALYSIS_REPORT,
+     "params": revenue_params(ALL_TIME[0], ALL_TIME[1]),
+     "legacy": LEGACY_REVENUE_ANALYSIS_REPORT, "legacy_params": ALL_TIME, "key": ("month", "category_name")},
+]
@@ -0,0 +1,103 @@
+import os
+from datetime import date, datetime
+
+import pytest
+
+import analytics
+
+
+def test_placeholders_and_escaped_percent_signs():
+    query = "SELECT DATE_FORMAT(d, '%%Y-%%m') FROM t WHERE a = %s AND b LIKE %s"
+    assert analytics.to_duckdb(query) == "SELECT strftime(d, '%Y-%m') FROM t WHERE a = ? AND b LIKE ?"
+
+
+def test_date_format_is_case_insensitive_and_whole_word():
+    assert analytics.to_duckdb("select date_format(x, '%%d')") == "select strftime(x, '%d')"
+    assert analytics.to_duckdb("SELECT MY_DATE_FORMAT(x)") == "SELECT MY_DATE_FORMAT(x)"
+
+
+def test_datediff_swaps_its_arguments_and_drops_the_time():
+    query = "SELECT DATEDIFF(sa.actual_completion_date, rr.request_date) as days"
+    assert analytics.to_duckdb(query) == (
+        "SELECT date_diff('day', CAST(rr.request_date AS DATE), CAST(sa.actual_completion_date AS DATE)) as days")
+
+
+def test_month_helpers():
+    assert analytics._add_months(datetime(2024, 11, 15), 3) == datetime(2025, 2, 1)
+    assert analytics._add_months(datetime(2024, 1, 1), -1) == datetime(2023, 12, 1)
+    assert analytics._month_starts(date(2023, 11, 30), date(2024, 2, 1)) == [
+        datetime(2023, 11, 1), datetime(2023, 12, 1), datetime(2024, 1, 1), datetime(2024, 2, 1)]
+
+
+@pytest.mark.skipif(not analytics.available(), reason="duckdb is optional")
+def test_translated_sql_runs_on_duckdb():
+    import duckdb
+
+    conn = duckdb.connect()
+    conn.execute("""
+        CREATE TABLE t AS SELECT * FROM (VALUES
+            (TIMESTAMP '2024-03-01 23:00:00', TIMESTAMP '2024-03-03 01:00:00'),
+            (TIMESTAMP '2024-03-05 08:00:00', TIMESTAMP '2024-03-05 09:00:00')
+        ) v(opened, closed)
+    """)
+    rows = conn.execute(analytics.to_duckdb("""
+        SELECT DATE_FORMAT(opened, '%%Y-%%m') as month, DATEDIFF(closed, opened) as days
+        FROM t
+        WHERE opened >= %s
+        ORDER BY opened
+    """), [datetime(2024, 1, 1)]).fetchall()
+    # Calendar days, as in MySQL: 23:00 to 01:00 two days later is 2
+    assert rows == [("2024-03", 2), ("2024-03", 0)]
+
+
+class FakeMySQL:
+    """Payment rows as (payment_id, payment_date); every other table is empty"""
+
+    def __init__(self, payments):
+        self.payments = payments
+
+    def run_query(self, pool, query, params=None, fetch=True):
+        rows = self.payments if "FROM Payment" in query else []
+        if "MIN(" in query:
+            return [{"first": min((day for _, day in rows), default=None),
+                     "last": max((day for _, day in rows), default=None)}]
+        if "MAX(" in query:
+            return [{"max_id": max((payment_id for payment_id, _ in rows), default=0)}]
+        if "DISTINCT" in query:
+            return [{"month": day.strftime("%Y-%m-01")} for payment_id, day in rows
+                    if params[0] < payment_id <= params[1]]
+        raise AssertionError(f"unexpected query: {query}")
+
+    def export_query(self, pool, query, params=None, file_format="Parquet", preview_rows=0):
+        import pandas as pd
+
+        rows = self.payments if "FROM Payment" in query and "LIMIT 0" not in query else []
+        if params:
+            rows = [(payment_id, day) for payment_id, day in rows if params[0] <= day < params[1]]
+        path = analytics.exporter.new_export_path("Parquet")
+        pd.DataFrame(rows, columns=["payment_id", "payment_date"]).astype({"payment_id": "int64"}).to_parquet(path)
+        return {"path": path, "rows": len(rows)}
+
+
+@pytest.mark.skipif(not analytics.available(), reason="duckdb is optional")
+def test_refresh_never_touches_the_files_of_an_open_connection(tmp_path, monkeypatch):
+    mysql = FakeMySQL([(1, datetime(2024, 1, 5)), (2, datetime(2024, 2, 5))])
+    monkeypatch.setattr(analytics.db, "run_query", mysql.run_query)
+    monkeypatch.setattr(analytics.exporter, "export_query", mysql.export_query)
+    snapshot = analytics.Snapshot(str(tmp_path))
+
+    snapshot.refresh(None)
+    first = snapshot.data_path()
+    reader = snapshot.connect()
+
+    # An older month gains a row: the incremental refresh writes a new generation
+    mysql.payments.append((3, datetime(2023, 6, 1)))
+    snapshot.refresh(None)
+    assert snapshot.data_path() != first
+    assert reader.execute("SELECT COUNT(*) FROM Payment").fetchone() == (2,)
+    assert snapshot.query("SELECT COUNT(*) as n FROM Payment") == [{"n": 3}]
+
+    # The generation after next removes the first one
+    snapshot.refresh(None, full=True)
+    assert not os.path.exists(first)
+    assert snapshot.query("SELECT COUNT(*) as n FROM Payment") == [{"n": 3}]
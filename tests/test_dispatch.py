@@ -0,0 +1,129 @@
+import pandas as pd
+
+import dispatch
+
+COLUMNS = ["request_id", "technician_id", "priority_level", "tier", "score", "service_cost"]
+WITHOUT_UNSPECIALISED = [tier for tier in dispatch.TIERS if tier[1]]
+
+
+def make_requests(*rows):
+    """rows: (request_id, category_id, priority_level, request_date, location_id, city)"""
+    frame = pd.DataFrame(rows, columns=["request_id", "category_id", "priority_level", "request_date",
+                                        "location_id", "city"])
+    frame["request_date"] = pd.to_datetime(frame["request_date"])
+    frame["service_cost"] = 100.0
+    return frame
+
+
+def make_technicians(*rows):
+    """rows: (technician_id, experience_years, location_id, city)"""
+    return pd.DataFrame(rows, columns=["technician_id", "experience_years", "location_id", "city"])
+
+
+def make_skills(*rows):
+    return pd.DataFrame(rows, columns=["technician_id", "specialization"])
+
+
+CATEGORY_SKILLS = pd.DataFrame([(1, "Plumbing"), (2, "Electrical")], columns=["category_id", "specialization"])
+
+
+def pairs(plan):
+    return dict(zip(plan["request_id"], plan["technician_id"]))
+
+
+def test_no_technician_or_request_is_used_twice():
+    # Technician 10 qualifies for both categories in both areas
+    requests = make_requests(
+        (1, 1, "medium", "2024-01-01", 100, "Pune"),
+        (2, 2, "medium", "2024-01-02", 100, "Pune"),
+        (3, 1, "medium", "2024-01-03", 200, "Pune"),
+        (4, 2, "high", "2024-01-04", 200, "Pune"),
+    )
+    technicians = make_technicians((10, 9, 100, "Pune"), (11, 5, 200, "Pune"), (12, 1, 100, "Pune"))
+    skills = make_skills((10, "Plumbing"), (10, "Electrical"), (11, "Plumbing"), (12, "Electrical"))
+
+    plan = dispatch.plan_dispatch(requests, technicians, skills, CATEGORY_SKILLS)
+
+    assert plan["request_id"].is_unique
+    assert plan["technician_id"].is_unique
+    assert len(plan) == 3
+
+
+def test_urgent_request_wins_over_older_low_priority_one():
+    requests = make_requests(
+        (1, 1, "low", "2023-01-01", 100, "Pune"),
+        (2, 1, "urgent", "2024-06-01", 100, "Pune"),
+    )
+    technicians = make_technicians((10, 5, 100, "Pune"))
+    skills = make_skills((10, "Plumbing"))
+
+    plan = dispatch.plan_dispatch(requests, technicians, skills, CATEGORY_SKILLS)
+
+    assert pairs(plan) == {2: 10}
+    assert plan.loc[0, "priority_level"] == "urgent"
+
+
+def test_oldest_request_gets_most_experienced_technician():
+    requests = make_requests(
+        (1, 1, "medium", "2024-02-01", 100, "Pune"),
+        (2, 1, "medium", "2024-01-01", 100, "Pune"),
+    )
+    technicians = make_technicians((10, 2, 100, "Pune"), (11, 8, 100, "Pune"))
+    skills = make_skills((10, "Plumbing"), (11, "Plumbing"))
+
+    plan = dispatch.plan_dispatch(requests, technicians, skills, CATEGORY_SKILLS)
+
+    assert pairs(plan) == {2: 11, 1: 10}
+
+
+def test_same_area_beats_same_city():
+    requests = make_requests(
+        (1, 1, "medium", "2024-01-01", 100, "Pune"),
+        (2, 1, "medium", "2024-01-02", 200, "Pune"),
+    )
+    # The more experienced technician is in the other area of the same city
+    technicians = make_technicians((10, 9, 200, "Pune"), (11, 1, 100, "Pune"))
+    skills = make_skills((10, "Plumbing"), (11, "Plumbing"))
+
+    plan = dispatch.plan_dispatch(requests, technicians, skills, CATEGORY_SKILLS)
+
+    assert pairs(plan) == {1: 11, 2: 10}
+    assert set(plan["tier"]) == {"specialised, same area"}
+
+
+def test_falls_back_to_same_city():
+    requests = make_requests((1, 1, "medium", "2024-01-01", 100, "Pune"))
+    technicians = make_technicians((10, 3, 200, "Pune"), (11, 9, 300, "Mumbai"))
+    skills = make_skills((10, "Plumbing"), (11, "Plumbing"))
+
+    plan = dispatch.plan_dispatch(requests, technicians, skills, CATEGORY_SKILLS)
+
+    assert pairs(plan) == {1: 10}
+    assert plan.loc[0, "tier"] == "specialised, same city"
+
+
+def test_unspecialised_tier_only_when_enabled():
+    requests = make_requests((1, 1, "medium", "2024-01-01", 100, "Pune"))
+    technicians = make_technicians((10, 3, 100, "Pune"))
+    skills = make_skills((10, "Electrical"))
+
+    plan = dispatch.plan_dispatch(requests, technicians, skills, CATEGORY_SKILLS, tiers=WITHOUT_UNSPECIALISED)
+    assert plan.empty
+
+    plan = dispatch.plan_dispatch(requests, technicians, skills, CATEGORY_SKILLS)
+    assert pairs(plan) == {1: 10}
+    assert plan.loc[0, "tier"] == "unspecialised, same area"
+
+
+def test_empty_inputs_return_the_documented_columns():
+    requests = make_requests((1, 1, "medium", "2024-01-01", 100, "Pune"))
+    technicians = make_technicians((10, 3, 100, "Pune"))
+    skills = make_skills((10, "Plumbing"))
+
+    for plan in (
+        dispatch.plan_dispatch(requests.iloc[0:0], technicians, skills, CATEGORY_SKILLS),
+        dispatch.plan_dispatch(requests, technicians.iloc[0:0], skills, CATEGORY_SKILLS),
+        dispatch.plan_dispatch(requests, make_technicians((11, 3, 900, "Delhi")), skills, CATEGORY_SKILLS),
+    ):
+        assert plan.empty
+        assert list(plan.columns) == COLUMNS
@@ -0,0 +1,184 @@
+import io
+from contextlib import contextmanager
+from datetime import date
+
+import mysql.connector
+import pandas as pd
+import pytest
+
+import db
+import importer
+
+LOCATIONS = {1, 2}
+CUSTOMERS = {10}
+CATEGORIES = {5}
+REGISTERED_EMAILS = {"taken@example.com"}
+
+USER_HEADER = "first_name,last_name,email,phone_number,user_type,location_id,registration_date\n"
+
+
+class FakeDatabase:
+    """Answers the importer's key lookups from the sets above and records the INSERTs"""
+
+    def __init__(self, fail_insert=False):
+        self.fail_insert = fail_insert
+        self.inserted = []
+        self.lookups = []
+
+    def run_query(self, pool, query, params=None, fetch=True):
+        self.lookups.append(query)
+        if "FROM Location" in query:
+            return [{"location_id": key} for key in params if key in LOCATIONS]
+        if "FROM Service_Category" in query:
+            return [{"category_id": key} for key in params if key in CATEGORIES]
+        if "FROM User WHERE email" in query:
+            return [{"email": key} for key in params if key in REGISTERED_EMAILS]
+        if "FROM User WHERE user_id" in query:
+            assert "user_type = 'customer'" in query
+            return [{"user_id": key} for key in params if key in CUSTOMERS]
+        raise AssertionError(f"unexpected query: {query}")
+
+    @contextmanager
+    def transaction(self, pool):
+        database = self
+
+        class Cursor:
+            def executemany(self, sql, values):
+                if database.fail_insert:
+                    raise mysql.connector.errors.IntegrityError("Duplicate entry")
+                database.inserted.append((sql, values))
+
+        yield Cursor()
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    fake = FakeDatabase()
+    monkeypatch.setattr(db, "run_query", fake.run_query)
+    monkeypatch.setattr(db, "transaction", fake.transaction)
+    return fake
+
+
+def run_import(entity, text, filename="upload.csv", chunk_rows=importer.IMPORT_CHUNK_ROWS):
+    return importer.import_file(None, entity, io.BytesIO(text.encode()), filename, chunk_rows)
+
+
+def reasons(rejects):
+    return dict(zip(rejects["row"], rejects["reason"]))
+
+
+def test_valid_users_are_inserted_with_typed_values(fake_db):
+    loaded, rejects = run_import("Users", USER_HEADER + "Asha,Rao,ASHA@Example.com,98200,Customer,1,2024-03-05\n")
+
+    assert loaded == 1
+    assert rejects.empty
+    sql, values = fake_db.inserted[0]
+    assert sql.startswith("INSERT INTO User (first_name, last_name, email, phone_number,")
+    columns = sql[sql.index("(") + 1:sql.index(")")].split(", ")
+    row = dict(zip(columns, values[0]))
+    assert row["email"] == "asha@example.com"
+    assert row["user_type"] == "customer"
+    assert row["location_id"] == 1
+    assert row["registration_date"] == date(2024, 3, 5)
+
+
+def test_required_values_and_enums(fake_db):
+    loaded, rejects = run_import("Users", USER_HEADER + ",Rao,a@example.com,1,admin,1,\n")
+
+    assert loaded == 0
+    reason = reasons(rejects)[2]
+    assert "first_name is required" in reason
+    assert "user_type must be one of customer, technician" in reason
+
+
+def test_numbers_dates_and_emails_are_checked(fake_db):
+    loaded, rejects = run_import("Users", USER_HEADER + (
+        "A,B,not-an-email,1,customer,one,2024-13-45\n"
+        "C,D,c@example.com,1,customer,1.5,\n"
+    ))
+
+    assert loaded == 0
+    by_row = reasons(rejects)
+    assert "email is not an email address" in by_row[2]
+    assert "location_id is not a number" in by_row[2]
+    assert "registration_date is not a valid date" in by_row[2]
+    assert "location_id is not a whole number" in by_row[3]
+
+
+def test_decimal_bounds(fake_db):
+    header = "category_name,base_service_charge,estimated_time_hours,popularity_score\n"
+    loaded, rejects = run_import("Service Categories", header + "Plumbing,-1,0,12\nWiring,150.50,2,4.5\n")
+
+    assert loaded == 1
+    reason = reasons(rejects)[2]
+    assert "base_service_charge is below 0" in reason
+    assert "estimated_time_hours is below 1" in reason
+    assert "popularity_score is above 9.99" in reason
+
+
+def test_foreign_keys_are_looked_up_once_per_chunk(fake_db):
+    header = "customer_id,category_id,item_description,issue_description\n"
+    loaded, rejects = run_import("Repair Requests", header + (
+        "10,5,Fridge,Not cooling\n"
+        "11,5,Fan,Noisy\n"
+        "10,6,TV,No picture\n"
+    ))
+
+    assert loaded == 1
+    by_row = reasons(rejects)
+    assert by_row[3] == "customer_id does not match any customer"
+    assert by_row[4] == "category_id does not match any Service_Category"
+    assert len([query for query in fake_db.lookups if "FROM User" in query]) == 1
+    assert len([query for query in fake_db.lookups if "FROM Service_Category" in query]) == 1
+
+
+def test_duplicate_emails_in_file_and_database(fake_db):
+    loaded, rejects = run_import("Users", USER_HEADER + (
+        "A,B,new@example.com,1,customer,1,\n"
+        "C,D,taken@example.com,1,customer,1,\n"
+        "E,F,New@Example.com,1,customer,2,\n"
+    ), chunk_rows=2)
+
+    assert loaded == 1
+    by_row = reasons(rejects)
+    assert by_row[3] == "email is already registered"
+    # Repeated across chunks: the first chunk's emails are remembered
+    assert by_row[4] == "email is repeated in the file"
+
+
+def test_rows_are_numbered_as_in_a_spreadsheet(fake_db):
+    lines = "".join(f"U{n},X,u{n}@example.com,1,customer,{3 if n == 4 else 1},\n" for n in range(5))
+    loaded, rejects = run_import("Users", USER_HEADER + lines, chunk_rows=2)
+
+    assert loaded == 4
+    # The fifth data row is line 6 of the CSV, after the header
+    assert list(rejects["row"]) == [6]
+
+
+def test_failed_chunk_is_rejected_as_a_whole(fake_db):
+    fake_db.fail_insert = True
+    loaded, rejects = run_import("Users", USER_HEADER + "A,B,a@example.com,1,customer,1,\n")
+
+    assert loaded == 0
+    assert reasons(rejects)[2].startswith("chunk rolled back: ")
+
+
+def test_header_must_fit_the_entity(fake_db):
+    with pytest.raises(importer.ImportFileError, match="unknown columns: nickname"):
+        run_import("Users", USER_HEADER.strip() + ",nickname\nA,B,a@example.com,1,customer,1,,x\n")
+    with pytest.raises(importer.ImportFileError, match="missing required columns: email"):
+        run_import("Users", "first_name,last_name,phone_number,user_type,location_id\nA,B,1,customer,1\n")
+
+
+@pytest.mark.parametrize("text", ["", USER_HEADER])
+def test_empty_or_header_only_csv(fake_db, text):
+    with pytest.raises(importer.ImportFileError):
+        run_import("Users", text)
+
+
+def test_empty_parquet(fake_db):
+    buffer = io.BytesIO()
+    pd.DataFrame({"area_name": pd.Series([], dtype=str)}).to_parquet(buffer)
+    buffer.seek(0)
+    with pytest.raises(importer.ImportFileError, match="no data rows"):
+        importer.import_file(None, "Locations", buffer, "locations.parquet")
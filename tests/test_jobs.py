@@ -0,0 +1,134 @@
+import os
+import tempfile
+import threading
+import time
+
+import pytest
+
+import exporter
+import jobs
+
+
+class FakeExport:
+    """Stands in for exporter.export_query; holds every job until `release` is set"""
+
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, pool, query, params=None, file_format="CSV"):
+        self.calls.append((query, params, file_format))
+        self.release.wait(5)
+        fd, path = tempfile.mkstemp(suffix=exporter.FORMATS[file_format]["suffix"])
+        with os.fdopen(fd, "w") as f:
+            f.write("n\n1\n2\n")
+        return {"path": path, "rows": 2}
+
+
+@pytest.fixture
+def export(monkeypatch):
+    fake = FakeExport()
+    monkeypatch.setattr(exporter, "export_query", fake)
+    return fake
+
+
+@pytest.fixture
+def queue(tmp_path, export):
+    return jobs.JobQueue(None, path=str(tmp_path / "jobs.sqlite3"), result_dir=str(tmp_path / "results"))
+
+
+def wait(queue, job_id):
+    deadline = time.monotonic() + 5
+    while queue.get(job_id)["status"] in jobs.ACTIVE:
+        assert time.monotonic() < deadline, "job did not finish"
+        time.sleep(0.01)
+    return queue.get(job_id)
+
+
+def test_job_key_ignores_dict_order_and_tells_runs_apart():
+    assert jobs.job_key("R", {"a": 1, "b": 2}, "CSV") == jobs.job_key("R", {"b": 2, "a": 1}, "CSV")
+    keys = {
+        jobs.job_key("R", ["2024-01-01"], "CSV"),
+        jobs.job_key("R", ["2024-02-01"], "CSV"),
+        jobs.job_key("R", ["2024-01-01"], "Parquet"),
+        jobs.job_key("R", ["2024-01-01"], "CSV", "duckdb"),
+        jobs.job_key("S", ["2024-01-01"], "CSV"),
+    }
+    assert len(keys) == 5
+
+
+def test_identical_job_in_flight_is_reused(queue, export):
+    export.release.clear()
+    first = queue.submit("R", "SELECT 1", ["2024-01-01"])
+    second = queue.submit("R", "SELECT 1", ["2024-01-01"])
+    other = queue.submit("R", "SELECT 1", ["2024-02-01"])
+    export.release.set()
+
+    assert first == second
+    assert other != first
+    assert wait(queue, first)["status"] == "done"
+    assert wait(queue, other)["status"] == "done"
+    assert len(export.calls) == 2
+
+
+def test_fresh_result_is_reused_until_it_expires(queue, export):
+    first = queue.submit("R", "SELECT 1")
+    job = wait(queue, first)
+    assert job["row_count"] == 2
+    assert len(queue.preview(job)) == 2
+
+    assert queue.submit("R", "SELECT 1") == first
+    assert len(export.calls) == 1
+
+    # Finished longer than JOB_RESULT_TTL_SECONDS ago
+    queue._update(first, finished_at="2000-01-01T00:00:00")
+    second = queue.submit("R", "SELECT 1")
+    assert second != first
+    wait(queue, second)
+    assert len(export.calls) == 2
+
+
+def test_result_whose_file_is_gone_runs_again(queue, export):
+    first = queue.submit("R", "SELECT 1")
+    os.remove(wait(queue, first)["result_path"])
+
+    second = queue.submit("R", "SELECT 1")
+    assert second != first
+    assert wait(queue, second)["status"] == "done"
+
+
+def test_failed_job_records_the_error(queue, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(exporter, "export_query", fail)
+    job = wait(queue, queue.submit("R", "SELECT 1"))
+    assert job["status"] == "failed"
+    assert job["error"] == "boom"
+    # A failed job is not reused
+    assert queue.submit("R", "SELECT 1") != job["job_id"]
+
+
+def test_purge_deletes_old_jobs_and_their_files(queue):
+    job = wait(queue, queue.submit("R", "SELECT 1"))
+    queue._update(job["job_id"], submitted_at="2000-01-01T00:00:00")
+
+    queue.purge()
+    assert queue.get(job["job_id"]) is None
+    assert not os.path.exists(job["result_path"])
+
+
+def test_restart_marks_unfinished_jobs_failed(tmp_path, export):
+    path, results = str(tmp_path / "jobs.sqlite3"), str(tmp_path / "results")
+    queue = jobs.JobQueue(None, path=path, result_dir=results)
+    export.release.clear()
+    job_id = queue.submit("R", "SELECT 1")
+    while queue.get(job_id)["status"] != "running":
+        time.sleep(0.01)
+
+    restarted = jobs.JobQueue(None, path=path, result_dir=results)
+    job = restarted.get(job_id)
+    export.release.set()
+    assert job["status"] == "failed"
+    assert job["error"] == "interrupted by a server restart"
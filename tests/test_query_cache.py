@@ -0,0 +1,119 @@
+import pytest
+
+import db
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(db.time, "monotonic", clock)
+    return clock
+
+
+class Loader:
+    """Counts how often the cache falls through to the database"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.rows
+
+
+def test_hit_until_the_ttl_lapses(clock):
+    cache = db.QueryCache(ttl=60)
+    load = Loader([{"location_id": 1}])
+
+    assert cache.get_or_load("SELECT * FROM Location", None, load) == [{"location_id": 1}]
+    assert cache.get_or_load("SELECT * FROM Location", None, load) == [{"location_id": 1}]
+    assert load.calls == 1
+
+    clock.now += 61
+    cache.get_or_load("SELECT * FROM Location", None, load)
+    assert load.calls == 2
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_params_are_part_of_the_key(clock):
+    cache = db.QueryCache()
+    query = "SELECT * FROM User WHERE user_id = %s"
+
+    assert cache.get_or_load(query, (1,), Loader(["one"])) == ["one"]
+    assert cache.get_or_load(query, (2,), Loader(["two"])) == ["two"]
+    assert cache.get_or_load(query, [1], Loader(["changed"])) == ["one"]
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = db.QueryCache(max_entries=2)
+    cache.get_or_load("SELECT 1 FROM Location", None, Loader([1]))
+    cache.get_or_load("SELECT 2 FROM Location", None, Loader([2]))
+    # Reading the first entry makes the second the oldest
+    cache.get_or_load("SELECT 1 FROM Location", None, Loader(["reloaded"]))
+    cache.get_or_load("SELECT 3 FROM Location", None, Loader([3]))
+
+    assert cache.get_or_load("SELECT 1 FROM Location", None, Loader(["reloaded"])) == [1]
+    assert cache.get_or_load("SELECT 2 FROM Location", None, Loader(["reloaded"])) == ["reloaded"]
+    assert cache.stats()["evictions"] >= 1
+
+
+def test_byte_cap(clock):
+    rows = [{"name": "x" * 1000}]
+    size = db._estimate_size(rows)
+    cache = db.QueryCache(max_bytes=size * 2 + size // 2)
+    for n in range(3):
+        cache.get_or_load(f"SELECT {n} FROM User", None, Loader(rows))
+
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["bytes"] <= stats["max_bytes"]
+
+    # A result bigger than the whole cache is returned but not stored
+    big = [{"name": "x" * (size * 3)}]
+    assert cache.get_or_load("SELECT big FROM User", None, Loader(big)) == big
+    assert cache.stats()["entries"] == 2
+
+
+def test_writes_invalidate_the_tables_they_affect(clock):
+    cache = db.QueryCache()
+    users = Loader(["users"])
+    categories = Loader(["categories"])
+    cache.get_or_load("SELECT * FROM User u JOIN Location l ON u.location_id = l.location_id", None, users)
+    cache.get_or_load("SELECT * FROM Service_Category", None, categories)
+
+    # Deleting a user cascades to requests and the summary tables, not to categories
+    cache.invalidate(db.affected_tables(db.referenced_tables("DELETE FROM user WHERE user_id = %s")))
+    cache.get_or_load("SELECT * FROM User u JOIN Location l ON u.location_id = l.location_id", None, users)
+    cache.get_or_load("SELECT * FROM Service_Category", None, categories)
+
+    assert users.calls == 2
+    assert categories.calls == 1
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_result_read_during_a_write_is_not_stored(clock):
+    cache = db.QueryCache()
+
+    def load_while_writing():
+        cache.invalidate({"Technician"})
+        return ["stale"]
+
+    assert cache.get_or_load("SELECT * FROM Technician", None, load_while_writing) == ["stale"]
+    assert cache.get_or_load("SELECT * FROM Technician", None, Loader(["fresh"])) == ["fresh"]
+
+
+def test_procedure_tables():
+    assert "repair_request" in db.procedure_tables("AssignTechnicianToRequest")
+    assert "revenue_monthly" in db.procedure_tables("CompleteServiceAndPayment")
+    assert db.procedure_tables("GetSystemDashboard") == set()
+    assert db.procedure_tables("SomethingNew") is None